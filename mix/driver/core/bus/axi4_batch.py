@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+import time
+import ctypes
+from axi4_lite_bus import AXI4LiteBusException
+
+
+class AXI4BatchDef:
+    OP_READ = 0
+    OP_WRITE = 1
+    OP_POLL = 2
+
+    # ctypes element type of each access width
+    CTYPES = {
+        8: ctypes.c_ubyte,
+        16: ctypes.c_ushort,
+        32: ctypes.c_uint
+    }
+    ACCESS_WIDTHS = [8, 16, 32]
+    ACCESS_MODES = ['fix', 'inc']
+
+
+class AXI4BatchException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class AXI4Batch(object):
+    '''
+    AXI4Batch records a fixed sequence of register reads, writes and bounded
+    poll-until operations on one AXI4 lite bus and executes them in one call.
+
+    The sequence is compiled when it is recorded: native library entries are
+    resolved and the ctypes transfer buffers are allocated once, so execute()
+    only runs a tight loop over prepared calls. Write data can be replaced in
+    place with update() between executions, which lets a driver build its hot
+    register choreography once and replay it for every transaction.
+
+    If the bus is an emulator without a native library handle, the batch falls
+    back to calling the bus read/write methods in the same loop.
+
+    Args:
+        axi4_bus:   instance(AXI4LiteBus)/instance(AXI4LiteSubBus)/instance(AXI4LiteBusEmulator),
+                    the bus the sequence runs on.
+
+    Examples:
+        batch = AXI4Batch(axi4_bus)
+        req = batch.write_8bit_inc(0x23, [0x00])
+        batch.write_8bit_inc(0x11, [0x01])
+        batch.poll(0x14, 0xFF, 0x00, 1.0, equal=False)
+        batch.read_32bit_fix(0x28, 1)
+        batch.update(req, [0xA5])
+        rd_data = batch.execute()
+        print(rd_data)      # [[0x12345678]], one item per recorded read
+
+    '''
+
+    def __init__(self, axi4_bus):
+        self.axi4_bus = axi4_bus
+        self._dev_name = getattr(axi4_bus, '_dev_name', 'axi4_batch')
+        self._native = hasattr(axi4_bus, 'base_lib') and hasattr(axi4_bus, '_axi4_bus')
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+    def _entry(self, direction, width, mode):
+        '''
+        Resolve the callable of one access, native library function or bus method.
+        '''
+        assert width in AXI4BatchDef.ACCESS_WIDTHS
+        assert mode in AXI4BatchDef.ACCESS_MODES
+        name = '%s_%dbit_%s' % (direction, width, mode)
+        if self._native:
+            return getattr(self.axi4_bus.base_lib, 'axi4_lite_' + name)
+        return getattr(self.axi4_bus, name)
+
+    def _check_range(self, addr, length, width, mode):
+        reg_size = self.axi4_bus._reg_size
+        if mode == 'fix':
+            assert addr >= 0 and addr < reg_size
+        else:
+            assert addr >= 0 and (addr + length * width // 8) <= reg_size
+
+    def _add_read(self, width, mode, addr, rd_len):
+        assert rd_len > 0
+        self._check_range(addr, rd_len, width, mode)
+        buf = (AXI4BatchDef.CTYPES[width] * rd_len)() if self._native else None
+        self._ops.append([AXI4BatchDef.OP_READ, self._entry('read', width, mode), addr, buf, rd_len])
+        return len(self._ops) - 1
+
+    def _add_write(self, width, mode, addr, data):
+        assert len(data) > 0
+        self._check_range(addr, len(data), width, mode)
+        if self._native:
+            buf = (AXI4BatchDef.CTYPES[width] * len(data))(*data)
+        else:
+            buf = list(data)
+        self._ops.append([AXI4BatchDef.OP_WRITE, self._entry('write', width, mode), addr, buf, len(data)])
+        return len(self._ops) - 1
+
+    def read_8bit_fix(self, addr, rd_len):
+        '''
+        Record 8bit width read from a fix address.
+
+        Args:
+            addr:    hexmial, [0~0xFFFF], Read datas from this address.
+            rd_len:  int, [0~1024],       Length of datas to read.
+
+        Returns:
+            int, index of the recorded operation.
+
+        '''
+        return self._add_read(8, 'fix', addr, rd_len)
+
+    def write_8bit_fix(self, addr, data):
+        '''
+        Record 8bit width write to a fix address.
+
+        Args:
+            addr:    hexmial, [0~0xFFFF], Write datas to this address.
+            data:    list,                Datas to be write.
+
+        Returns:
+            int, index of the recorded operation.
+
+        '''
+        return self._add_write(8, 'fix', addr, data)
+
+    def read_16bit_fix(self, addr, rd_len):
+        '''
+        Record 16bit width read from a fix address.
+        '''
+        return self._add_read(16, 'fix', addr, rd_len)
+
+    def write_16bit_fix(self, addr, data):
+        '''
+        Record 16bit width write to a fix address.
+        '''
+        return self._add_write(16, 'fix', addr, data)
+
+    def read_32bit_fix(self, addr, rd_len):
+        '''
+        Record 32bit width read from a fix address.
+        '''
+        return self._add_read(32, 'fix', addr, rd_len)
+
+    def write_32bit_fix(self, addr, data):
+        '''
+        Record 32bit width write to a fix address.
+        '''
+        return self._add_write(32, 'fix', addr, data)
+
+    def read_8bit_inc(self, addr, rd_len):
+        '''
+        Record 8bit width read from an increment address.
+        '''
+        return self._add_read(8, 'inc', addr, rd_len)
+
+    def write_8bit_inc(self, addr, data):
+        '''
+        Record 8bit width write to an increment address.
+        '''
+        return self._add_write(8, 'inc', addr, data)
+
+    def read_16bit_inc(self, addr, rd_len):
+        '''
+        Record 16bit width read from an increment address.
+        '''
+        return self._add_read(16, 'inc', addr, rd_len)
+
+    def write_16bit_inc(self, addr, data):
+        '''
+        Record 16bit width write to an increment address.
+        '''
+        return self._add_write(16, 'inc', addr, data)
+
+    def read_32bit_inc(self, addr, rd_len):
+        '''
+        Record 32bit width read from an increment address.
+        '''
+        return self._add_read(32, 'inc', addr, rd_len)
+
+    def write_32bit_inc(self, addr, data):
+        '''
+        Record 32bit width write to an increment address.
+        '''
+        return self._add_write(32, 'inc', addr, data)
+
+    def poll(self, addr, mask, value, timeout, width=8, equal=True, interval=0):
+        '''
+        Record a bounded poll which reads one register until (reg & mask) matches value.
+
+        Args:
+            addr:       hexmial, [0~0xFFFF], register address to poll.
+            mask:       int, bit mask applied to the register value.
+            value:      int, expected value after masking.
+            timeout:    float, unit second, AXI4BatchException is raised when it expires.
+            width:      int, [8, 16, 32], default 8, register access width.
+            equal:      boolean, [True, False], default True, False waits until masked value differs.
+            interval:   float, unit second, default 0, sleep between two reads, 0 is busy polling.
+
+        Returns:
+            int, index of the recorded operation.
+
+        '''
+        assert timeout > 0
+        assert interval >= 0
+        self._check_range(addr, 1, width, 'inc')
+        buf = (AXI4BatchDef.CTYPES[width] * 1)() if self._native else None
+        self._ops.append([AXI4BatchDef.OP_POLL, self._entry('read', width, 'inc'), addr, buf,
+                          (mask, value, equal, timeout, interval)])
+        return len(self._ops) - 1
+
+    def update(self, index, data):
+        '''
+        Replace the data of a recorded write without recompiling the batch.
+
+        Args:
+            index:   int, index returned when the write was recorded.
+            data:    list, new datas, length must equal the recorded one.
+
+        '''
+        op = self._ops[index]
+        assert op[0] == AXI4BatchDef.OP_WRITE
+        assert len(data) == op[4]
+        op[3][:] = data
+
+    def execute(self):
+        '''
+        Execute all recorded operations in order.
+
+        Returns:
+            list, one list of read datas for each recorded read, in record order.
+
+        Raises:
+            AXI4LiteBusException:  native access failed.
+            AXI4BatchException:    a poll operation timed out.
+
+        '''
+        results = []
+        if self._native:
+            handle = self.axi4_bus._axi4_bus
+            for op_type, func, addr, buf, arg in self._ops:
+                if op_type == AXI4BatchDef.OP_POLL:
+                    self._native_poll(func, handle, addr, buf, *arg)
+                    continue
+                result = func(handle, addr, buf, arg)
+                if result != 0:
+                    raise AXI4LiteBusException(self._dev_name, result)
+                if op_type == AXI4BatchDef.OP_READ:
+                    results.append(buf[:])
+                elif self.axi4_bus._shadow is not None:
+                    # native writes bypass the bus shadow, drop what they overwrote
+                    self.axi4_bus.invalidate_shadow(addr, ctypes.sizeof(buf))
+        else:
+            for op_type, func, addr, buf, arg in self._ops:
+                if op_type == AXI4BatchDef.OP_READ:
+                    results.append(func(addr, arg))
+                elif op_type == AXI4BatchDef.OP_WRITE:
+                    func(addr, buf)
+                else:
+                    self._method_poll(func, addr, *arg)
+        return results
+
+    def _native_poll(self, func, handle, addr, buf, mask, value, equal, timeout, interval):
+        deadline = time.time() + timeout
+        while True:
+            result = func(handle, addr, buf, 1)
+            if result != 0:
+                raise AXI4LiteBusException(self._dev_name, result)
+            if ((buf[0] & mask) == value) == equal:
+                return
+            if time.time() > deadline:
+                break
+            if interval:
+                time.sleep(interval)
+        raise AXI4BatchException('[%s]: poll register 0x%02x timeout.' % (self._dev_name, addr))
+
+    def _method_poll(self, func, addr, mask, value, equal, timeout, interval):
+        deadline = time.time() + timeout
+        while True:
+            if ((func(addr, 1)[0] & mask) == value) == equal:
+                return
+            if time.time() > deadline:
+                break
+            if interval:
+                time.sleep(interval)
+        raise AXI4BatchException('[%s]: poll register 0x%02x timeout.' % (self._dev_name, addr))
@@ -3,14 +3,16 @@ import ctypes
 import struct
 from axi4_lite_def import AXI4Def
 from axi4_lite_bus_lib_emulator import AXI4LiteBusLibEmulator
+from native_lib import NativeLibDef, NativeBuffers, SMALL_ARRAYS, load_library, get_error_reason
 
 
 class AXI4LiteBusException(Exception):
     def __init__(self, dev_name, err_code):
-        reason = (128 * ctypes.c_char)()
-        base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
-        base_lib.get_error_reason(err_code, reason, len(reason))
-        self._err_reason = '[%s]: %s.' % (dev_name, ctypes.string_at(reason, -1).decode('utf-8'))
+        if isinstance(err_code, basestring):
+            reason = err_code
+        else:
+            reason = get_error_reason(err_code)
+        self._err_reason = '[%s]: %s.' % (dev_name, reason)
 
     def __str__(self):
         return self._err_reason
@@ -40,6 +42,95 @@ class AXI4LiteBusBase(object):
     def __init__(self, base_lib, _axi4_bus):
         self.base_lib = base_lib
         self._axi4_bus = _axi4_bus
+        self._buffers = NativeBuffers(isinstance(base_lib, ctypes.CDLL))
+        # byte address -> byte value of host-owned registers, None when shadow is not used.
+        self._shadow = None
+        self._shadow_owned = set()
+        self._shadow_hit = 0
+        self._shadow_miss = 0
+
+    def add_shadow_register(self, addr, size=4):
+        '''
+        AXI4LiteBus declare a host-owned register range which can be served from shadow.
+
+        Registers are volatile by default and always hit the bus. A host-owned
+        register only changes when the host writes it, so after the first read
+        its value is kept in a per-bus shadow map: increment reads are served
+        from the shadow and increment writes update it after hitting the bus.
+        Read-modify-write of such a register then costs only the write.
+
+        Args:
+            addr:   hexmial, [0~0xFFFF], start address of the register.
+            size:   int, default 4,       byte size of the register range.
+
+        Examples:
+            axi4_bus.add_shadow_register(0x26, 1)
+
+        '''
+        assert addr >= 0 and (addr + size <= self._reg_size)
+        assert size > 0
+        if self._shadow is None:
+            self._shadow = {}
+        self._shadow_owned.update(range(addr, addr + size))
+
+    def invalidate_shadow(self, addr=None, size=1):
+        '''
+        AXI4LiteBus drop shadow values, the next read of them hits the bus again.
+
+        Args:
+            addr:   hexmial, [0~0xFFFF], default None, start address, None drops the whole shadow.
+            size:   int, default 1,       byte size of the range to drop.
+
+        Examples:
+            axi4_bus.invalidate_shadow()
+
+        '''
+        if self._shadow is None:
+            return
+        if addr is None:
+            self._shadow.clear()
+        else:
+            for byte_addr in range(addr, addr + size):
+                self._shadow.pop(byte_addr, None)
+
+    def get_shadow_statistics(self):
+        '''
+        AXI4LiteBus get shadow read statistics of host-owned registers.
+
+        Returns:
+            dict, {'hit': int, 'miss': int}, hit is the number of bus reads saved.
+
+        Examples:
+            print(axi4_bus.get_shadow_statistics())
+
+        '''
+        return {'hit': self._shadow_hit, 'miss': self._shadow_miss}
+
+    def _shadow_read(self, addr, fmt, count):
+        '''
+        Get register values from shadow, None if the range is not host-owned or not cached yet.
+        '''
+        size = count * struct.calcsize(fmt)
+        byte_addrs = range(addr, addr + size)
+        if not self._shadow_owned.issuperset(byte_addrs):
+            return None
+        shadow = self._shadow
+        if not all(byte_addr in shadow for byte_addr in byte_addrs):
+            self._shadow_miss += 1
+            return None
+        self._shadow_hit += 1
+        raw = bytearray(shadow[byte_addr] for byte_addr in byte_addrs)
+        return list(struct.unpack('<%d%s' % (count, fmt), bytes(raw)))
+
+    def _shadow_store(self, addr, fmt, data):
+        '''
+        Keep host-owned bytes of a read or written register range in shadow.
+        '''
+        raw = bytearray(struct.pack('<%d%s' % (len(data), fmt), *data))
+        owned = self._shadow_owned
+        for offset, value in enumerate(raw):
+            if addr + offset in owned:
+                self._shadow[addr + offset] = value
 
     def get_ipcore_id(self):
         '''
@@ -134,11 +225,12 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert rd_len > 0
-        rd_data = (ctypes.c_ubyte * rd_len)()
+        array_type = SMALL_ARRAYS.get((ctypes.c_ubyte, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_ubyte, rd_len)
         result = self.base_lib.axi4_lite_read_8bit_fix(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dB' % rd_len, rd_data))
+        return list(struct.unpack_from('%dB' % rd_len, rd_data))
 
     def write_8bit_fix(self, addr, data):
         '''
@@ -154,10 +246,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert len(data) > 0
-        wr_data = (ctypes.c_ubyte * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_ubyte, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_ubyte, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_8bit_fix(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self.invalidate_shadow(addr, 1)
 
     def read_16bit_fix(self, addr, rd_len):
         '''
@@ -174,11 +273,12 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert rd_len > 0
-        rd_data = (ctypes.c_ushort * rd_len)()
+        array_type = SMALL_ARRAYS.get((ctypes.c_ushort, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_ushort, rd_len)
         result = self.base_lib.axi4_lite_read_16bit_fix(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dH' % rd_len, rd_data))
+        return list(struct.unpack_from('%dH' % rd_len, rd_data))
 
     def write_16bit_fix(self, addr, data):
         '''
@@ -194,10 +294,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert len(data) > 0
-        wr_data = (ctypes.c_ushort * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_ushort, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_ushort, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_16bit_fix(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self.invalidate_shadow(addr, 2)
 
     def read_32bit_fix(self, addr, rd_len):
         '''
@@ -214,11 +321,12 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert rd_len > 0
-        rd_data = (ctypes.c_uint * rd_len)()
+        array_type = SMALL_ARRAYS.get((ctypes.c_uint, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_uint, rd_len)
         result = self.base_lib.axi4_lite_read_32bit_fix(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dI' % rd_len, rd_data))
+        return list(struct.unpack_from('%dI' % rd_len, rd_data))
 
     def write_32bit_fix(self, addr, data):
         '''
@@ -234,10 +342,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and addr < self._reg_size
         assert len(data) > 0
-        wr_data = (ctypes.c_uint * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_uint, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_uint, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_32bit_fix(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self.invalidate_shadow(addr, 4)
 
     def read_8bit_inc(self, addr, rd_len):
         '''
@@ -254,11 +369,19 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + rd_len <= self._reg_size)
         assert rd_len > 0
-        rd_data = (ctypes.c_ubyte * rd_len)()
+        if self._shadow is not None:
+            shadow_data = self._shadow_read(addr, 'B', rd_len)
+            if shadow_data is not None:
+                return shadow_data
+        array_type = SMALL_ARRAYS.get((ctypes.c_ubyte, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_ubyte, rd_len)
         result = self.base_lib.axi4_lite_read_8bit_inc(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dB' % rd_len, rd_data))
+        rd_data = list(struct.unpack_from('%dB' % rd_len, rd_data))
+        if self._shadow is not None:
+            self._shadow_store(addr, 'B', rd_data)
+        return rd_data
 
     def write_8bit_inc(self, addr, data):
         '''
@@ -274,10 +397,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + len(data)) <= self._reg_size
         assert len(data) > 0
-        wr_data = (ctypes.c_ubyte * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_ubyte, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_ubyte, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_8bit_inc(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self._shadow_store(addr, 'B', data)
 
     def read_16bit_inc(self, addr, rd_len):
         '''
@@ -294,11 +424,19 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + rd_len * 2 <= self._reg_size)
         assert rd_len > 0
-        rd_data = (ctypes.c_ushort * rd_len)()
+        if self._shadow is not None:
+            shadow_data = self._shadow_read(addr, 'H', rd_len)
+            if shadow_data is not None:
+                return shadow_data
+        array_type = SMALL_ARRAYS.get((ctypes.c_ushort, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_ushort, rd_len)
         result = self.base_lib.axi4_lite_read_16bit_inc(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dH' % rd_len, rd_data))
+        rd_data = list(struct.unpack_from('%dH' % rd_len, rd_data))
+        if self._shadow is not None:
+            self._shadow_store(addr, 'H', rd_data)
+        return rd_data
 
     def write_16bit_inc(self, addr, data):
         '''
@@ -314,10 +452,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + len(data) * 2 <= self._reg_size)
         assert len(data) > 0
-        wr_data = (ctypes.c_ushort * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_ushort, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_ushort, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_16bit_inc(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self._shadow_store(addr, 'H', data)
 
     def read_32bit_inc(self, addr, rd_len):
         '''
@@ -334,11 +479,19 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + rd_len * 4 <= self._reg_size)
         assert rd_len > 0
-        rd_data = (ctypes.c_uint * rd_len)()
+        if self._shadow is not None:
+            shadow_data = self._shadow_read(addr, 'I', rd_len)
+            if shadow_data is not None:
+                return shadow_data
+        array_type = SMALL_ARRAYS.get((ctypes.c_uint, rd_len))
+        rd_data = array_type() if array_type is not None else self._buffers.get(ctypes.c_uint, rd_len)
         result = self.base_lib.axi4_lite_read_32bit_inc(self._axi4_bus, addr, rd_data, rd_len)
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
-        return list(struct.unpack('%dI' % rd_len, rd_data))
+        rd_data = list(struct.unpack_from('%dI' % rd_len, rd_data))
+        if self._shadow is not None:
+            self._shadow_store(addr, 'I', rd_data)
+        return rd_data
 
     def write_32bit_inc(self, addr, data):
         '''
@@ -354,10 +507,17 @@ class AXI4LiteBusBase(object):
         '''
         assert addr >= 0 and (addr + len(data) * 4) <= self._reg_size
         assert len(data) > 0
-        wr_data = (ctypes.c_uint * len(data))(*data)
+        array_type = SMALL_ARRAYS.get((ctypes.c_uint, len(data)))
+        if array_type is not None:
+            wr_data = array_type(*data)
+        else:
+            wr_data = self._buffers.get(ctypes.c_uint, len(data))
+            wr_data[:len(data)] = data
         result = self.base_lib.axi4_lite_write_32bit_inc(self._axi4_bus, addr, wr_data, len(data))
         if result != 0:
             raise AXI4LiteBusException(self._dev_name, result)
+        if self._shadow is not None:
+            self._shadow_store(addr, 'I', data)
 
     def get_ipcore_ver(self):
         '''
@@ -432,12 +592,12 @@ class _AXI4LiteBus(AXI4LiteBusBase):
         self._dev_name = dev_name
         self._reg_size = reg_size
         if dev_name is not None:
-            base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+            base_lib = load_library(NativeLibDef.CORE_DRIVER_LIB)
         else:
             base_lib = AXI4LiteBusLibEmulator()
 
         _axi4_bus = base_lib.axi4_lite_open(self._dev_name, self._reg_size)
-        if _axi4_bus == 0:
+        if not _axi4_bus:
             raise AXI4LiteBusRunTimeException('Open AXI4 lite device %s failue.' % (self._dev_name))
         super(_AXI4LiteBus, self).__init__(base_lib, _axi4_bus)
 
@@ -479,11 +639,11 @@ class AXI4LiteSubBus(AXI4LiteBusBase):
         self._dev_name = axi4_bus._dev_name
         self._offset_addr = offset_addr
         self._reg_size = reg_size
-        base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+        base_lib = load_library(NativeLibDef.CORE_DRIVER_LIB)
 
         _axi4_bus = base_lib.axi4_lite_submodule_create(self.axi4_bus._axi4_bus,
                                                         self._offset_addr, self._reg_size)
-        if _axi4_bus == 0:
+        if not _axi4_bus:
             msg = 'Open AXI4 lite sub device %s failue.' % (self._axi4_bus)
             raise AXI4LiteBusRunTimeException(msg)
 
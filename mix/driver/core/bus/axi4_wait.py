@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import select
+import struct
+import threading
+from axi4_lite_def import AXI4Def
+
+
+class AXI4WaitDef:
+    # busy polling window after the wait started
+    SPIN_TIME_S = 0.0001
+    # window in which the cpu is only yielded between two reads
+    YIELD_TIME_S = 0.001
+    # first sleep after the yield window, doubled up to the max interval
+    SLEEP_MIN_S = 0.0001
+    BACKOFF_FACTOR = 2
+    READ_FUNCTIONS = {
+        8: 'read_8bit_inc',
+        16: 'read_16bit_inc',
+        32: 'read_32bit_inc'
+    }
+    UIO_IRQ_ENABLE = 1
+
+
+class AXI4WaitTimeoutException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class UIOInterrupt(object):
+    '''
+    UIO interrupt wait backend of wait_for
+
+    The ipcore interrupt is exported by the uio driver, writing 1 to the device
+    unmasks the interrupt and the device becomes readable when it fires.
+
+    Args:
+        dev_name:   string, uio char device path, like '/dev/uio0'.
+
+    Examples:
+        irq = UIOInterrupt('/dev/uio0')
+        wait_for(axi4_bus, 0x14, 0x01, 0x01, 1.0, irq=irq)
+
+    '''
+
+    def __init__(self, dev_name):
+        self._dev_name = dev_name
+        self._fd = os.open(dev_name, os.O_RDWR)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if getattr(self, '_fd', None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def enable(self):
+        '''
+        Unmask the interrupt, must be called before the condition is checked.
+        '''
+        os.write(self._fd, struct.pack('I', AXI4WaitDef.UIO_IRQ_ENABLE))
+
+    def wait(self, timeout):
+        '''
+        Block until the interrupt fires or timeout.
+
+        Args:
+            timeout:    float, unit second.
+
+        Returns:
+            boolean, [True, False], True if the interrupt fired.
+
+        '''
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            # interrupt counter, the value itself is not used
+            os.read(self._fd, 4)
+            return True
+        return False
+
+
+_wait_statistics = {}
+_wait_statistics_lock = threading.Lock()
+
+
+def _record_wait(name, elapsed, reads, timed_out):
+    with _wait_statistics_lock:
+        item = _wait_statistics.get(name)
+        if item is None:
+            item = {'count': 0, 'timeout': 0, 'reads': 0, 'total_s': 0.0, 'max_s': 0.0}
+            _wait_statistics[name] = item
+        item['count'] += 1
+        item['reads'] += reads
+        item['total_s'] += elapsed
+        if elapsed > item['max_s']:
+            item['max_s'] = elapsed
+        if timed_out:
+            item['timeout'] += 1
+
+
+def get_wait_statistics():
+    '''
+    Get wait time statistics of every wait_for callsite.
+
+    Returns:
+        dict, {callsite: {'count': int, 'timeout': int, 'reads': int, 'total_s': float, 'max_s': float}}.
+
+    Examples:
+        for name, item in get_wait_statistics().items():
+            print(name, item['total_s'] / item['count'])
+
+    '''
+    with _wait_statistics_lock:
+        return dict((name, dict(item)) for name, item in _wait_statistics.items())
+
+
+def reset_wait_statistics():
+    '''
+    Clear wait time statistics of all callsites.
+    '''
+    with _wait_statistics_lock:
+        _wait_statistics.clear()
+
+
+def wait_for(bus, addr, mask, value, timeout, width=8, equal=True,
+             max_interval=AXI4Def.AXI4_DELAY, irq=None, name=None):
+    '''
+    Wait until (register & mask) matches value, with adaptive backoff.
+
+    The register is read back to back for a short time first, then the cpu
+    is only yielded between reads, then the interval between reads grows
+    exponentially up to max_interval. Fast hardware is caught with minimal
+    latency and long operations do not burn cpu. If an interrupt backend is
+    given, it is waited on instead of sleeping.
+
+    Wait time of every call is recorded per callsite, see get_wait_statistics().
+
+    Args:
+        bus:            instance(AXI4LiteBus)/instance(AXI4LiteBusEmulator), bus of the register.
+        addr:           hexmial, [0~0xFFFF], register address.
+        mask:           int, bit mask applied to the register value.
+        value:          int, expected value after masking.
+        timeout:        float, unit second.
+        width:          int, [8, 16, 32], default 8, register access width.
+        equal:          boolean, [True, False], default True, False waits until masked value differs.
+        max_interval:   float, unit second, default AXI4Def.AXI4_DELAY, upper bound of the sleep interval.
+        irq:            instance(UIOInterrupt)/None, default None, interrupt wait backend.
+        name:           string/None, default None, statistics key, the caller function if None.
+
+    Returns:
+        int, value, the register value which matched.
+
+    Raises:
+        AXI4WaitTimeoutException:   condition not met within timeout.
+
+    Examples:
+        # wait fft state register bit0 to be 1
+        wait_for(axi4_bus, 0x14, 0x01, 0x01, 3)
+
+    '''
+    assert width in AXI4WaitDef.READ_FUNCTIONS
+    assert timeout >= 0
+    if name is None:
+        caller = sys._getframe(1).f_code
+        name = '%s:%s' % (os.path.basename(caller.co_filename), caller.co_name)
+
+    read = getattr(bus, AXI4WaitDef.READ_FUNCTIONS[width])
+    interval = AXI4WaitDef.SLEEP_MIN_S
+    reads = 0
+    start = time.time()
+    while True:
+        if irq is not None:
+            irq.enable()
+        reg_value = read(addr, 1)[0]
+        reads += 1
+        elapsed = time.time() - start
+        if ((reg_value & mask) == value) == equal:
+            _record_wait(name, elapsed, reads, False)
+            return reg_value
+        if elapsed >= timeout:
+            break
+
+        if irq is not None:
+            irq.wait(timeout - elapsed)
+        elif elapsed < AXI4WaitDef.SPIN_TIME_S:
+            continue
+        elif elapsed < AXI4WaitDef.YIELD_TIME_S:
+            time.sleep(0)
+        else:
+            time.sleep(min(interval, max_interval, timeout - elapsed))
+            interval *= AXI4WaitDef.BACKOFF_FACTOR
+
+    _record_wait(name, elapsed, reads, True)
+    raise AXI4WaitTimeoutException('[%s]: wait for register 0x%02x timeout, value 0x%x.' %
+                                   (getattr(bus, '_dev_name', ''), addr, reg_value))
@@ -2,14 +2,12 @@
 import ctypes
 import struct
 import mmap
+from native_lib import NativeLibDef, NativeBuffers, load_library, get_error_reason
 
 
 class I2CException(Exception):
     def __init__(self, dev_name, err_code):
-        reason = (128 * ctypes.c_char)()
-        base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
-        base_lib.get_error_reason(err_code, reason, len(reason))
-        self._err_reason = '[%s]: %s.' % (dev_name, ctypes.string_at(reason, -1).decode("utf-8"))
+        self._err_reason = '[%s]: %s.' % (dev_name, get_error_reason(err_code))
 
     def __str__(self):
         return self._err_reason
@@ -92,7 +90,8 @@ class _I2C(object):
         self._dev_name = dev_name
         self.mm = None
         self.i2c_type = I2CDef.CDNS_I2C_TYPE
-        self.base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+        self.base_lib = load_library(NativeLibDef.CORE_DRIVER_LIB)
+        self._buffers = NativeBuffers()
 
         self.open()
         # the retry_times is temporary for fix i2c read/write failed.
@@ -110,7 +109,7 @@ class _I2C(object):
 
         '''
         self._i2c = self.base_lib.i2c_open(self._dev_name)
-        if self._i2c == 0:
+        if not self._i2c:
             raise RuntimeError('Open I2C device {} failure.'.format(self._dev_name))
 
         i2c_name = self._dev_name.split("/")[-1]
@@ -157,7 +156,7 @@ class _I2C(object):
         assert addr >= 0 and addr <= 0xFF
         assert data_len > 0
 
-        rd_data = (ctypes.c_ubyte * data_len)()
+        rd_data = self._buffers.get(ctypes.c_ubyte, data_len)
 
         for x in range(self.retry_times):
             result = self.base_lib.i2c_read(self._i2c, addr, rd_data, data_len)
@@ -172,7 +171,7 @@ class _I2C(object):
             else:
                 continue
 
-        return list(struct.unpack('%dB' % data_len, rd_data))
+        return list(struct.unpack_from('%dB' % data_len, rd_data))
 
     def write(self, addr, data):
         '''
@@ -184,7 +183,8 @@ class _I2C(object):
         '''
         assert addr >= 0 and addr <= 0xFF
         assert len(data) > 0
-        wr_data = (ctypes.c_ubyte * len(data))(*data)
+        wr_data = self._buffers.get(ctypes.c_ubyte, len(data))
+        wr_data[:len(data)] = data
 
         for x in range(self.retry_times):
             result = self.base_lib.i2c_write(self._i2c, addr, wr_data, len(data))
@@ -212,11 +212,13 @@ class _I2C(object):
         assert len(wr_data) > 0
         assert rd_len > 0
 
-        wr_data = (ctypes.c_ubyte * len(wr_data))(*wr_data)
-        rd_data = (ctypes.c_ubyte * rd_len)()
+        wr_len = len(wr_data)
+        wr_buf = self._buffers.get(ctypes.c_ubyte, wr_len)
+        wr_buf[:wr_len] = wr_data
+        rd_data = self._buffers.get(ctypes.c_ubyte, rd_len, 1)
 
         for x in range(self.retry_times):
-            result = self.base_lib.i2c_write_and_read(self._i2c, addr, wr_data, len(wr_data), rd_data, rd_len)
+            result = self.base_lib.i2c_write_and_read(self._i2c, addr, wr_buf, wr_len, rd_data, rd_len)
             if result == 0:
                 break
             elif (result != 0) and (x == self.retry_times - 1):
@@ -228,7 +230,7 @@ class _I2C(object):
             else:
                 continue
 
-        return list(struct.unpack('%dB' % rd_len, rd_data))
+        return list(struct.unpack_from('%dB' % rd_len, rd_data))
 
     def _read_32bit_fix(self, reg_offset, rd_len):
         assert self.mm
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from contextlib import contextmanager
+from i2c_ds_bus import I2CDownstreamBus
+
+
+class I2CArbiterDef:
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+    # a session holding the bus longer than this yields to waiters between transactions, s
+    MAX_HOLD_TIME = 0.05
+    # a waiter is raised one priority level for each aging time it waits, s
+    AGING_TIME = 0.2
+
+
+class _I2CRequest(object):
+    def __init__(self, priority, origin, seq):
+        self.priority = priority
+        self.origin = origin
+        self.seq = seq
+        self.thread = threading.current_thread()
+        self.request_time = time.time()
+
+
+class I2CArbiter(object):
+    '''
+    Arbiter of one physical i2c bus shared by threads, such as DUT RPC servers.
+
+    Waiting transactions are granted by priority, a lower number is served first.
+    A waiter is raised one priority level for every AGING_TIME it waits, so low
+    priority traffic is delayed but not starved. Within the same level the origin
+    served least recently goes first, and requests of one origin keep their order,
+    so one slot can not take the bus from the others with a long queue.
+
+    A transaction is never interrupted. A session that holds the bus for many
+    transactions gives the bus to the waiters between two transactions once it
+    held it for max_hold_time, then continues when it is granted again.
+
+    Args:
+        name:           string, bus name used in statistics.
+        max_hold_time:  float, (>0), default 0.05, unit s, max time a session holds the bus
+                        while others wait.
+        aging_time:     float, (>0), default 0.2, unit s, wait time to raise one priority level.
+
+    Examples:
+        arbiter = I2CArbiter.get(i2c)
+        with arbiter.transaction(I2CArbiterDef.PRIORITY_HIGH, 'dut1'):
+            i2c.write(0x20, [0x02, 0x00])
+
+    '''
+    # class variable to host the arbiter of each physical bus
+    arbiters = {}
+    LOCK = threading.Lock()
+
+    @classmethod
+    def get(cls, bus):
+        '''
+        Get the arbiter of the physical bus of bus, created the first time.
+
+        Args:
+            bus:    instance(I2C)/instance(MIXI2CSG)/instance(I2CDownstreamBus), i2c bus,
+                    downstream buses share the arbiter of their root bus.
+
+        Returns:
+            instance(I2CArbiter).
+
+        '''
+        while isinstance(bus, I2CDownstreamBus):
+            bus = bus.i2c
+        with cls.LOCK:
+            if bus not in cls.arbiters:
+                cls.arbiters[bus] = I2CArbiter(getattr(bus, '_dev_name', str(bus)))
+            return cls.arbiters[bus]
+
+    def __init__(self, name, max_hold_time=I2CArbiterDef.MAX_HOLD_TIME, aging_time=I2CArbiterDef.AGING_TIME):
+        assert max_hold_time > 0
+        assert aging_time > 0
+        self.name = name
+        self.max_hold_time = max_hold_time
+        self.aging_time = aging_time
+
+        self._cond = threading.Condition(threading.Lock())
+        self._waiters = []
+        self._owner = None
+        self._grant_time = 0
+        self._session_depth = 0
+        self._transaction_depth = 0
+        self._seq = 0
+        # {origin: grant seq}, to serve the origin least recently served first
+        self._last_served = {}
+        self._grant_seq = 0
+        self.reset_statistics()
+
+    def _pick(self, now):
+        def key(request):
+            level = request.priority - int((now - request.request_time) / self.aging_time)
+            return (level, self._last_served.get(request.origin, -1), request.seq)
+        return min(self._waiters, key=key)
+
+    def _grant_next(self):
+        self._owner = None
+        if self._waiters:
+            now = time.time()
+            request = self._pick(now)
+            self._waiters.remove(request)
+            self._grant(request, now)
+            self._cond.notify_all()
+
+    def _grant(self, request, now):
+        self._owner = request
+        self._grant_time = now
+        self._grant_seq += 1
+        self._last_served[request.origin] = self._grant_seq
+
+        wait = now - request.request_time
+        self._grants += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        origin = self._origins.setdefault(request.origin, {'grants': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        origin['grants'] += 1
+        origin['wait_total'] += wait
+        origin['wait_max'] = max(origin['wait_max'], wait)
+
+    def _wait_grant(self, request):
+        self._waiters.append(request)
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        if self._owner is None:
+            self._grant_next()
+        while self._owner is not request:
+            self._cond.wait()
+
+    def _end_hold(self, now):
+        hold = now - self._grant_time
+        self._hold_max = max(self._hold_max, hold)
+        if hold > self.max_hold_time:
+            self._hold_overruns += 1
+
+    def _acquire(self, priority, origin, session):
+        with self._cond:
+            owner = self._owner
+            if owner is not None and owner.thread is threading.current_thread():
+                # in a session of this thread, yield between transactions when held too long
+                if not session and self._transaction_depth == 0 and self._waiters and \
+                        time.time() - self._grant_time > self.max_hold_time:
+                    session_depth = self._session_depth
+                    self._end_hold(time.time())
+                    self._yields += 1
+                    request = _I2CRequest(owner.priority, owner.origin, self._next_seq())
+                    self._grant_next()
+                    self._wait_grant(request)
+                    self._session_depth = session_depth
+                    self._transaction_depth = 0
+            else:
+                self._wait_grant(_I2CRequest(priority, origin, self._next_seq()))
+                self._session_depth = 0
+                self._transaction_depth = 0
+            if session:
+                self._session_depth += 1
+            else:
+                self._transaction_depth += 1
+
+    def _release(self, session):
+        with self._cond:
+            if session:
+                self._session_depth -= 1
+            else:
+                self._transaction_depth -= 1
+            if self._session_depth == 0 and self._transaction_depth == 0:
+                self._end_hold(time.time())
+                self._grant_next()
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    @contextmanager
+    def transaction(self, priority=I2CArbiterDef.PRIORITY_NORMAL, origin=None):
+        '''
+        Hold the bus for one transaction.
+
+        Args:
+            priority:   int, [0, 1, 2], default 1, 0 is the highest priority.
+            origin:     string/None, default None, DUT or slot the transaction is for,
+                        None for the name of the current thread.
+
+        Examples:
+            with arbiter.transaction(I2CArbiterDef.PRIORITY_HIGH, 'dut1'):
+                i2c.write(0x20, [0x02, 0x00])
+
+        '''
+        origin = origin if origin is not None else threading.current_thread().name
+        self._acquire(priority, origin, False)
+        try:
+            yield
+        finally:
+            self._release(False)
+
+    @contextmanager
+    def session(self, priority=I2CArbiterDef.PRIORITY_NORMAL, origin=None):
+        '''
+        Hold the bus for many transactions of the current thread.
+
+        Other threads wait until the session ends, or until it held the bus for
+        max_hold_time, then they are served between two transactions of the session.
+
+        Args:
+            priority:   int, [0, 1, 2], default 1, 0 is the highest priority.
+            origin:     string/None, default None, DUT or slot the session is for,
+                        None for the name of the current thread.
+
+        Examples:
+            with arbiter.session(I2CArbiterDef.PRIORITY_LOW, 'dut2'):
+                data = eeprom.read(0, 4096)
+
+        '''
+        origin = origin if origin is not None else threading.current_thread().name
+        self._acquire(priority, origin, True)
+        try:
+            yield
+        finally:
+            self._release(True)
+
+    def reset_statistics(self):
+        '''
+        Clear statistics.
+        '''
+        self._grants = 0
+        self._yields = 0
+        self._hold_overruns = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_max = 0.0
+        self._max_queue_depth = 0
+        self._origins = {}
+
+    def statistics(self):
+        '''
+        Get arbiter statistics.
+
+        Returns:
+            dict, {'name': string, 'queue_depth': int, 'queue_depth_by_priority': {priority: int},
+                   'max_queue_depth': int, 'grants': int, 'yields': int, 'hold_overruns': int,
+                   'wait_mean': float, 'wait_max': float, 'hold_max': float,
+                   'origins': {origin: {'grants': int, 'wait_mean': float, 'wait_max': float}}},
+                  times are in s.
+
+        '''
+        with self._cond:
+            depth_by_priority = {}
+            for request in self._waiters:
+                depth_by_priority[str(request.priority)] = depth_by_priority.get(str(request.priority), 0) + 1
+            origins = {}
+            for origin, info in self._origins.items():
+                origins[str(origin)] = {
+                    'grants': info['grants'],
+                    'wait_mean': info['wait_total'] / info['grants'],
+                    'wait_max': info['wait_max']
+                }
+            return {
+                'name': self.name,
+                'queue_depth': len(self._waiters),
+                'queue_depth_by_priority': depth_by_priority,
+                'max_queue_depth': self._max_queue_depth,
+                'grants': self._grants,
+                'yields': self._yields,
+                'hold_overruns': self._hold_overruns,
+                'wait_mean': self._wait_total / self._grants if self._grants else 0.0,
+                'wait_max': self._wait_max,
+                'hold_max': self._hold_max,
+                'origins': origins
+            }
+
+
+class I2CArbitratedBus(object):
+    '''
+    I2C bus driver which runs every transaction of the wrapped bus through its arbiter.
+
+    ClassType = I2C
+
+    It can be used in place of the wrapped MIXI2CSG, I2C or I2CDownstreamBus. Buses and
+    downstream buses of the same physical bus share one arbiter, other attributes are
+    those of the wrapped bus.
+
+    Args:
+        i2c_bus:    instance(I2C)/instance(MIXI2CSG)/instance(I2CDownstreamBus), bus to wrap.
+        priority:   int, [0, 1, 2], default 1, priority of the transactions, 0 is the highest.
+        origin:     string/None, default None, DUT or slot of the transactions,
+                    None for the name of the calling thread.
+        arbiter:    instance(I2CArbiter)/None, default None, None to use the arbiter of the bus.
+
+    Examples:
+        i2c = I2CArbitratedBus(MIXI2CSG(axi4_bus), I2CArbiterDef.PRIORITY_HIGH, 'dut1')
+        io_exp = CAT9555(0x20, i2c)
+
+    '''
+    rpc_public_api = ['read', 'write', 'write_and_read', 'get_arbiter_statistics']
+
+    def __init__(self, i2c_bus, priority=I2CArbiterDef.PRIORITY_NORMAL, origin=None, arbiter=None):
+        self.i2c_bus = i2c_bus
+        self.priority = priority
+        self.origin = origin
+        self.arbiter = arbiter if arbiter is not None else I2CArbiter.get(i2c_bus)
+
+    def __getattr__(self, name):
+        # _dev_name and other attributes of the wrapped bus
+        if name == 'i2c_bus':
+            raise AttributeError(name)
+        return getattr(self.i2c_bus, name)
+
+    def session(self):
+        '''
+        Hold the bus for many transactions, see I2CArbiter.session.
+
+        Examples:
+            with i2c.session():
+                i2c.write(0x50, [0x00])
+                data = i2c.read(0x50, 16)
+
+        '''
+        return self.arbiter.session(self.priority, self.origin)
+
+    def read(self, addr, data_len):
+        '''
+        I2C bus read through the arbiter.
+
+        Args:
+            addr:       hexmial, [0~0xFF], read data from this address.
+            data_len:   int, length of data to be read.
+
+        Returns:
+            list, data of i2c bus read.
+
+        '''
+        with self.arbiter.transaction(self.priority, self.origin):
+            return self.i2c_bus.read(addr, data_len)
+
+    def write(self, addr, data):
+        '''
+        I2C bus write through the arbiter.
+
+        Args:
+            addr:   hexmial, [0~0xFF], write datas to this address.
+            data:   list, datas to be write.
+
+        '''
+        with self.arbiter.transaction(self.priority, self.origin):
+            return self.i2c_bus.write(addr, data)
+
+    def write_and_read(self, addr, wr_data, rd_len):
+        '''
+        I2C bus write and read through the arbiter.
+
+        Args:
+            addr:       hexmial, [0~0xFF], write to and read from this address.
+            wr_data:    list, datas to be write.
+            rd_len:     int, length of data to be read.
+
+        Returns:
+            list, data of i2c bus read.
+
+        '''
+        with self.arbiter.transaction(self.priority, self.origin):
+            return self.i2c_bus.write_and_read(addr, wr_data, rd_len)
+
+    def batch_transfer(self, messages):
+        '''
+        MIXI2CSG batch transfer through the arbiter, the batch is one transaction.
+
+        Args:
+            messages:   list, see MIXI2CSG.batch_transfer.
+
+        Returns:
+            list, see MIXI2CSG.batch_transfer.
+
+        '''
+        with self.arbiter.transaction(self.priority, self.origin):
+            return self.i2c_bus.batch_transfer(messages)
+
+    def get_arbiter_statistics(self):
+        '''
+        Get queue depth and wait time statistics of the bus arbiter.
+
+        Returns:
+            dict, see I2CArbiter.statistics.
+
+        '''
+        return self.arbiter.statistics()
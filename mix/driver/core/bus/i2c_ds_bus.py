@@ -12,16 +12,79 @@ def lock_i2c_mux(f):
     '''
     def wrapper(self, *args, **kwargs):
         with self.mux.mux_lock:
-            self.mux.set_channel_state([[self.channel, 1]])
+            manager = self.mux.mux_manager
+            manager.select(self.channel)
             try:
                 ret = f(self, *args, **kwargs)
+            except Exception:
+                # mux may be reset or half programmed after a bus error
+                manager.invalidate()
+                raise
             finally:
-                self.mux.set_channel_state([[self.channel, 0]])
+                if not self.sticky:
+                    manager.release(self.channel)
         return ret
 
     return wrapper
 
 
+class I2CMuxManager(object):
+    '''
+    Channel selection of one i2c mux, shared by all downstream buses of the mux.
+
+    The mux is only written when the channel to select is not the one already selected.
+    After any error the selection is unknown and the next access programs the mux again.
+    Callers must hold the mux_lock of the mux.
+
+    Args:
+        mux: instance, a i2c mux instance that has set channel action.
+
+    '''
+    # no channel enabled
+    NO_CHANNEL = -1
+
+    def __init__(self, mux):
+        self.mux = mux
+        # None is unknown
+        self.channel = None
+        self.switch_count = 0
+
+    def select(self, channel):
+        '''
+        Enable channel, the mux is not written if channel is selected already.
+
+        Args:
+            channel: int, (>=0), channel number to select.
+
+        '''
+        if self.channel == channel:
+            return
+        self.channel = None
+        self.mux.set_channel_state([[channel, 1]])
+        self.channel = channel
+        self.switch_count += 1
+
+    def release(self, channel):
+        '''
+        Disable channel, the mux is not written if channel is not selected.
+
+        Args:
+            channel: int, (>=0), channel number to release.
+
+        '''
+        if self.channel is not None and self.channel != channel:
+            return
+        self.channel = None
+        self.mux.set_channel_state([[channel, 0]])
+        self.channel = I2CMuxManager.NO_CHANNEL
+
+    def invalidate(self):
+        '''
+        Forget the selected channel, used when the mux is written by anything else.
+        '''
+        self.channel = None
+
+
 class I2CDownstreamBus(object):
     '''
     I2C Downstream bus driverz
@@ -48,6 +111,10 @@ class I2CDownstreamBus(object):
             mux.disable_channel(0)
     Step 3 is required for avoid address conflict on different i2c-mux channels.
 
+    A sticky bus keeps its channel enabled after the access, so a loop on the same
+    bus does not write the mux again; the mux is only written when a bus of another
+    channel is accessed. Use release() when the channel must be isolated.
+
     With this driver, this could be done by less steps:
         0. Create instance:
             i2c = I2C('/dev/i2c-0')
@@ -64,6 +131,7 @@ class I2CDownstreamBus(object):
                                Could be a I2CDownstreamBus instance if it is a cascading
                                i2c-mux: mux connecting to another i2c-mux's downstream channel.
         channel: int, (>0), channel number of i2c mux that this bus is coming from.
+        sticky:  boolean, [True, False], default False, keep channel enabled after each access.
 
     Examples:
         # creating instance
@@ -78,11 +146,11 @@ class I2CDownstreamBus(object):
         io_exp.get_pin(0)
 
     '''
-    rpc_public_api = ['read', 'write', 'write_and_read']
+    rpc_public_api = ['read', 'write', 'write_and_read', 'release']
     # class lock to control lock creating action for i2c_mux;
     LOCK = Lock()
 
-    def __init__(self, mux, channel):
+    def __init__(self, mux, channel, sticky=False):
         # channel must be specified int and >= 0.
         assert type(channel) is int
         assert channel >= 0
@@ -96,6 +164,7 @@ class I2CDownstreamBus(object):
         self.i2c = self.mux._i2c_bus
         self._dev_name = self.i2c._dev_name
         self.channel = channel
+        self.sticky = sticky
 
         # mux instance may not have a lock; create one if not.
         # use LOCK here to ensure only 1 lock created for the same mux.
@@ -105,6 +174,9 @@ class I2CDownstreamBus(object):
             else:
                 # already has a lock; just use it.
                 pass
+            # channel selection is shared by all downstream buses of the mux.
+            if not hasattr(self.mux, 'mux_manager'):
+                self.mux.mux_manager = I2CMuxManager(self.mux)
 
     # no open() because open() is called once during i2c init.
     def close(self):
@@ -113,6 +185,18 @@ class I2CDownstreamBus(object):
         '''
         self.i2c.close()
 
+    def release(self):
+        '''
+        Disable the mux channel of this bus if it is enabled, for sticky bus
+        when the devices on it must be isolated.
+
+        Returns:
+            string, "done", api execution successful.
+        '''
+        with self.mux.mux_lock:
+            self.mux.mux_manager.release(self.channel)
+        return "done"
+
     @lock_i2c_mux
     def read(self, addr, data_len):
         '''
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import ctypes
+import threading
+
+
+class NativeLibDef:
+    CORE_DRIVER_LIB = 'liblynx-core-driver.so'
+    DMA_DRIVER_LIB = 'libmix-dma-sg-driver.so'
+    ERROR_REASON_LEN = 128
+
+    # transfer buffers are reused by power of 2 size class,
+    # longer transfers get a one-shot buffer of exact size.
+    MIN_SIZE_CLASS = 16
+    MAX_SIZE_CLASS = 65536
+    # transfers of at most this many bytes get a new array of exact size,
+    # which costs less than the per-thread buffer lookup.
+    SMALL_TRANSFER_SIZE = 4
+
+
+class NativeHandle(ctypes.c_void_p):
+    '''
+    Opaque handle returned by the native libraries.
+
+    Being a subclass, ctypes does not convert it to a python int, so the handle
+    is passed back untruncated on 64 bit platforms without argtypes.
+    '''
+    pass
+
+
+_handle = NativeHandle
+_uint = ctypes.c_uint
+_ushort_p = ctypes.POINTER(ctypes.c_ushort)
+_uint_p = ctypes.POINTER(ctypes.c_uint)
+_char_p = ctypes.POINTER(ctypes.c_char)
+
+
+def _axi4_prototypes():
+    prototypes = {}
+    for width in (8, 16, 32):
+        for direction in ('read', 'write'):
+            for mode in ('fix', 'inc'):
+                name = 'axi4_lite_%s_%dbit_%s' % (direction, width, mode)
+                prototypes[name] = (ctypes.c_int, None)
+    return prototypes
+
+
+# function name: (restype, argtypes), declared once when the library is loaded.
+# Transfer functions leave argtypes None: ctypes converts declared arguments with
+# from_param() on every call, which costs more than the transfer call itself,
+# and their arguments are already a handle, ints and ctypes arrays.
+PROTOTYPES = {
+    NativeLibDef.CORE_DRIVER_LIB: dict(_axi4_prototypes(), **{
+        'get_error_reason': (ctypes.c_int, [ctypes.c_int, _char_p, _uint]),
+        'axi4_lite_open': (_handle, [ctypes.c_char_p, _uint]),
+        'axi4_lite_close': (None, [_handle]),
+        'axi4_lite_submodule_create': (_handle, [_handle, _uint, _uint]),
+        'axi4_lite_submodule_destroy': (None, [_handle]),
+        'axi4_lite_get_ipcore_version': (ctypes.c_int, [_handle, _char_p, _uint]),
+        'i2c_open': (_handle, [ctypes.c_char_p]),
+        'i2c_close': (None, [_handle]),
+        'i2c_read': (ctypes.c_int, None),
+        'i2c_write': (ctypes.c_int, None),
+        'i2c_write_and_read': (ctypes.c_int, None),
+        'spi_open': (_handle, [ctypes.c_char_p]),
+        'spi_close': (None, [_handle]),
+        'spi_get_wait_us': (ctypes.c_int, [_handle, _ushort_p]),
+        'spi_set_wait_us': (ctypes.c_int, [_handle, _uint]),
+        'spi_get_mode': (ctypes.c_int, [_handle, _uint_p]),
+        'spi_set_mode': (ctypes.c_int, [_handle, _uint]),
+        'spi_get_frequency': (ctypes.c_int, [_handle, _uint_p]),
+        'spi_set_frequency': (ctypes.c_int, [_handle, _uint]),
+        'spi_write': (ctypes.c_int, None),
+        'spi_read': (ctypes.c_int, None),
+        'spi_sync_transfer': (ctypes.c_int, None),
+        'spi_async_transfer': (ctypes.c_int, None)
+    }),
+    NativeLibDef.DMA_DRIVER_LIB: {
+        'sg_axis_init': (_handle, [ctypes.c_char_p]),
+        'sg_axis_exit': (None, [_handle]),
+        'sg_axis_get_err_reason': (ctypes.c_char_p, [ctypes.c_int]),
+        'sg_axis_config_channel': (ctypes.c_int, [_handle, _uint, _uint, _uint]),
+        'sg_axis_enable_channel': (ctypes.c_int, [_handle, _uint]),
+        'sg_axis_disable_channel': (ctypes.c_int, [_handle, _uint]),
+        'sg_axis_reset_channel': (ctypes.c_int, [_handle, _uint]),
+        'sg_axis_read_data': (ctypes.c_int, None),
+        'sg_axis_read_all_data': (ctypes.c_int, None),
+        'sg_axis_read_done': (ctypes.c_int, None)
+    }
+}
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def load_library(lib_name):
+    '''
+    Load a native driver library once per process and declare its function prototypes.
+
+    Args:
+        lib_name:   string, shared library name, like 'liblynx-core-driver.so'.
+
+    Returns:
+        instance(ctypes.CDLL), the shared library handle.
+
+    Examples:
+        base_lib = load_library(NativeLibDef.CORE_DRIVER_LIB)
+
+    '''
+    lib = _libraries.get(lib_name)
+    if lib is not None:
+        return lib
+    with _libraries_lock:
+        if lib_name not in _libraries:
+            lib = ctypes.cdll.LoadLibrary(lib_name)
+            for func_name, (restype, argtypes) in PROTOTYPES.get(lib_name, {}).items():
+                try:
+                    func = getattr(lib, func_name)
+                except AttributeError:
+                    # older library without this function
+                    continue
+                func.restype = restype
+                if argtypes is not None:
+                    func.argtypes = argtypes
+            _libraries[lib_name] = lib
+    return _libraries[lib_name]
+
+
+def get_error_reason(err_code):
+    '''
+    Get error string of a liblynx-core-driver error code.
+
+    Args:
+        err_code:   int, error code returned by the library.
+
+    Returns:
+        string, error reason.
+
+    '''
+    reason = ctypes.create_string_buffer(NativeLibDef.ERROR_REASON_LEN)
+    load_library(NativeLibDef.CORE_DRIVER_LIB).get_error_reason(err_code, reason, len(reason))
+    return reason.value.decode('utf-8')
+
+
+# (ctype, length): array type of the transfers up to SMALL_TRANSFER_SIZE bytes.
+# Hot callers look it up inline, a python call costs as much as the allocation.
+SMALL_ARRAYS = dict(((ctype, length), ctype * length)
+                    for ctype in (ctypes.c_ubyte, ctypes.c_ushort, ctypes.c_uint)
+                    for length in range(1, NativeLibDef.SMALL_TRANSFER_SIZE // ctypes.sizeof(ctype) + 1))
+
+
+class NativeBuffers(threading.local):
+    '''
+    Reusable ctypes transfer buffers of one bus, one set per thread.
+
+    Bus instances are shared by DUT threads, so every thread gets its own
+    buffers. Several buffers of the same type used by one call are told
+    apart by slot. Transfers in SMALL_ARRAYS get a new array instead, like
+    the one word register accesses.
+
+    Args:
+        size_class:     boolean, default True, round lengths up to a power of 2 size class.
+                        False keeps exact lengths, emulated libraries check the buffer type.
+
+    Examples:
+        buffers = NativeBuffers()
+        rd_data = buffers.get(ctypes.c_ubyte, 3)
+        base_lib.i2c_read(i2c, 0x50, rd_data, 3)
+        print(rd_data[:3])
+
+    '''
+
+    def __init__(self, size_class=True):
+        self._size_class = size_class
+        self._buffers = {}
+
+    def get(self, ctype, length, slot=0):
+        '''
+        Get a buffer which holds at least length items of ctype.
+
+        Args:
+            ctype:      ctypes type, item type, like ctypes.c_ubyte.
+            length:     int, item count needed.
+            slot:       int, default 0, buffer index for calls using several buffers.
+
+        Returns:
+            instance(ctypes.Array), buffer content is not cleared.
+
+        '''
+        array_type = SMALL_ARRAYS.get((ctype, length))
+        if array_type is not None:
+            return array_type()
+        if length > NativeLibDef.MAX_SIZE_CLASS:
+            return (ctype * length)()
+
+        if not self._size_class:
+            size = length
+        elif length > NativeLibDef.MIN_SIZE_CLASS:
+            size = 1 << (length - 1).bit_length()
+        else:
+            size = NativeLibDef.MIN_SIZE_CLASS
+        key = (ctype, size, slot)
+        try:
+            return self._buffers[key]
+        except KeyError:
+            buf = (ctype * size)()
+            self._buffers[key] = buf
+            return buf
@@ -2,6 +2,7 @@
 import ctypes
 import struct
 from spi_emulator import SpiEmuLib
+from native_lib import NativeLibDef, NativeBuffers, load_library, get_error_reason
 
 
 class SPIDef:
@@ -28,10 +29,7 @@ class SPIDef:
 
 class SPIException(Exception):
     def __init__(self, dev_name, err_code):
-        reason = (128 * ctypes.c_char)()
-        base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
-        base_lib.get_error_reason(err_code, reason, len(reason))
-        self._err_reason = '[%s]: %s.' % (dev_name, ctypes.string_at(reason, -1).decode("utf-8"))
+        self._err_reason = '[%s]: %s.' % (dev_name, get_error_reason(err_code))
 
     def __str__(self):
         return self._err_reason
@@ -62,7 +60,8 @@ class SPI(object):
         if not dev_name:
             self.base_lib = SpiEmuLib()
         else:
-            self.base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+            self.base_lib = load_library(NativeLibDef.CORE_DRIVER_LIB)
+        self._buffers = NativeBuffers(isinstance(self.base_lib, ctypes.CDLL))
         self.open()
 
     def __del__(self):
@@ -77,7 +76,7 @@ class SPI(object):
 
         '''
         self._spi = self.base_lib.spi_open(self._dev_name)
-        if self._spi == 0:
+        if not self._spi:
             raise RuntimeError('Open SPI device %s failure.' % (self._dev_name))
 
     def close(self):
@@ -234,7 +233,8 @@ class SPI(object):
             spi.write([1, 2, 3])
 
         '''
-        data = (ctypes.c_ubyte * len(wr_data))(*wr_data)
+        data = self._buffers.get(ctypes.c_ubyte, len(wr_data))
+        data[:len(wr_data)] = wr_data
         result = self.base_lib.spi_write(self._spi, data, len(wr_data))
         if result != 0:
             raise SPIException(self._dev_name, result)
@@ -253,12 +253,12 @@ class SPI(object):
         '''
         rd_len = int(rd_len)
         assert rd_len > 0
-        rd_data = (ctypes.c_ubyte * rd_len)()
+        rd_data = self._buffers.get(ctypes.c_ubyte, rd_len)
         result = self.base_lib.spi_read(self._spi, rd_data, rd_len)
         if result != 0:
             raise SPIException(self._dev_name, result)
 
-        return list(struct.unpack('%dB' % rd_len, rd_data))
+        return list(struct.unpack_from('%dB' % rd_len, rd_data))
 
     def transfer(self, wr_data, rd_len=0, sync=True):
         '''
@@ -276,22 +276,23 @@ class SPI(object):
 
         '''
         rd_len = int(rd_len)
+        wr_len = len(wr_data)
+        cwr_data = self._buffers.get(ctypes.c_ubyte, wr_len)
+        cwr_data[:wr_len] = wr_data
 
         if sync:
-            crd_data = (ctypes.c_ubyte * len(wr_data))()
-            cwr_data = (ctypes.c_ubyte * len(wr_data))(*wr_data)
+            crd_data = self._buffers.get(ctypes.c_ubyte, wr_len, 1)
 
-            result = self.base_lib.spi_sync_transfer(self._spi, cwr_data, crd_data, len(wr_data))
+            result = self.base_lib.spi_sync_transfer(self._spi, cwr_data, crd_data, wr_len)
             if result != 0:
                 raise SPIException(self._dev_name, result)
 
-            return list(struct.unpack('%dB' % (len(wr_data)), crd_data))
+            return list(struct.unpack_from('%dB' % wr_len, crd_data))
         else:
-            crd_data = (ctypes.c_ubyte * rd_len)()
-            cwr_data = (ctypes.c_ubyte * len(wr_data))(*wr_data)
+            crd_data = self._buffers.get(ctypes.c_ubyte, rd_len, 1)
 
-            result = self.base_lib.spi_async_transfer(self._spi, cwr_data, len(wr_data), crd_data, rd_len)
+            result = self.base_lib.spi_async_transfer(self._spi, cwr_data, wr_len, crd_data, rd_len)
             if result != 0:
                 raise SPIException(self._dev_name, result)
 
-            return list(struct.unpack('%dB' % (rd_len), crd_data))
+            return list(struct.unpack_from('%dB' % rd_len, crd_data))
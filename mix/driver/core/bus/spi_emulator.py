@@ -3,6 +3,8 @@ from ..tracer.recorder import *
 import struct
 import ctypes
 
+_MAGIC_NUM = 1
+
 
 class SPIException(Exception):
     pass
@@ -20,6 +22,7 @@ class SpiEmuLib(object):
     def spi_open(self, dev_name):
         self._dev_name = dev_name
         self._recorder.record("open")
+        return _MAGIC_NUM  # just used for emulator
 
     def spi_close(self, ptr):
         self._recorder.record("close")
@@ -181,6 +181,30 @@ class _UART(object):
         read_datas = self._serial.read(size)
         return [ord(x) for x in read_datas]
 
+    def read_available(self, timeout_s=0):
+        '''
+        Uart wait at most timeout_s for data and read all bytes received, return as soon as
+        there is any data, used by UARTReader.
+
+        Args:
+            timeout_s:   float, default 0, max wait time for the first byte.
+
+        Returns:
+            list, list read from the port, empty if no data arrived.
+
+        Examples:
+            data = uart_bus.read_available(0.05)
+
+        '''
+        assert timeout_s >= 0
+        self._serial.timeout = timeout_s
+        read_datas = self._serial.read(1)
+        if read_datas and hasattr(self._serial, 'inWaiting'):
+            count = self._serial.inWaiting()
+            if count > 0:
+                read_datas += self._serial.read(count)
+        return [ord(x) for x in read_datas]
+
     def write_hex(self, data, timeout_s=None):
         '''
         Uart write the bytes data to the port.
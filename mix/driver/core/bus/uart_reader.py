@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import re
+import time
+import threading
+import collections
+
+
+class UARTReaderDef:
+    BUFFER_SIZE = 65536
+    # longest wait of one device read, also how fast stop() is noticed
+    POLL_TIMEOUT = 0.05
+    THREAD_JOIN_TIMEOUT = 1
+
+
+class UARTReaderException(Exception):
+    def __init__(self, err_str):
+        self._err_reason = '%s.' % (err_str)
+
+    def __str__(self):
+        return self._err_reason
+
+
+class UARTReader(object):
+    '''
+    Background reader of a UART, keeps what the UART receives in a bounded ring buffer.
+
+    ClassType = UART
+
+    A thread drains the UART with read_available() into the buffer and wakes up the callers
+    of read, read_exact, read_until and expect as soon as data arrives, so test functions
+    waiting for a prompt do not loop on read_hex with sleeps. When the buffer is full the
+    oldest bytes are dropped and counted in statistics(). Every chunk drained from the UART
+    keeps the time it arrived, read_chunks() returns them.
+
+    The UART should not be read by anything else while the reader is running.
+
+    Args:
+        uart:           instance(UART/MIXUARTSG), uart with read_available(timeout) or read_hex(size, timeout).
+        buffer_size:    int, (>0), default 65536, max bytes kept, older bytes are dropped.
+        poll_timeout:   float, (>0), default 0.05, unit Second, max wait of one uart read.
+
+    Examples:
+        reader = UARTReader(UART('/dev/ttyPS1'))
+        reader.start()
+        uart.write_hex([ord(c) for c in 'version\\r\\n'])
+        data = reader.read_until('] ', 3)
+        index, data = reader.expect(['PASS', 'FAIL'], 10)
+        reader.stop()
+
+    '''
+    rpc_public_api = ['start', 'stop', 'read', 'read_exact', 'read_until', 'expect',
+                      'read_chunks', 'flush', 'statistics']
+
+    def __init__(self, uart, buffer_size=UARTReaderDef.BUFFER_SIZE,
+                 poll_timeout=UARTReaderDef.POLL_TIMEOUT):
+        assert buffer_size > 0
+        assert poll_timeout > 0
+        self.uart = uart
+        self.buffer_size = buffer_size
+        self.poll_timeout = poll_timeout
+        self._buffer = bytearray()
+        # absolute position of self._buffer[0] in the received stream
+        self._head = 0
+        # [absolute position, timestamp] of each chunk start still in the buffer
+        self._chunks = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+        self._running = False
+        self._error = None
+        self._received = 0
+        self._chunk_count = 0
+        self._overflows = 0
+        self._overflow_bytes = 0
+
+    def _read_device(self):
+        if hasattr(self.uart, 'read_available'):
+            return self.uart.read_available(self.poll_timeout)
+        return self.uart.read_hex(1, self.poll_timeout)
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self._read_device()
+            except Exception as e:
+                with self._cond:
+                    self._error = str(e)
+                    self._running = False
+                    self._cond.notify_all()
+                return
+            if data:
+                self._push(bytearray(data), time.time())
+
+    def _push(self, data, timestamp):
+        with self._cond:
+            self._chunks.append([self._head + len(self._buffer), timestamp])
+            self._buffer += data
+            self._received += len(data)
+            self._chunk_count += 1
+            overflow = len(self._buffer) - self.buffer_size
+            if overflow > 0:
+                self._overflows += 1
+                self._overflow_bytes += overflow
+                self._consume(overflow)
+            self._cond.notify_all()
+
+    def _consume(self, size):
+        # called with the lock held, drop size bytes from the buffer and return them
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._head += size
+        # keep the chunk the new head is in
+        while len(self._chunks) > 1 and self._chunks[1][0] <= self._head:
+            self._chunks.popleft()
+        if self._chunks:
+            if self._buffer:
+                self._chunks[0][0] = self._head
+            else:
+                self._chunks.clear()
+        return data
+
+    def _wait(self, match, timeout_s):
+        # called with the lock held, wait until match() returns not None or timeout
+        deadline = None if timeout_s is None else time.time() + timeout_s
+        while True:
+            result = match()
+            if result is not None:
+                return result
+            if self._error is not None:
+                raise UARTReaderException('UART reader stopped: %s' % self._error)
+            if not self._running:
+                raise UARTReaderException('UART reader is not running')
+            if deadline is None:
+                self._cond.wait()
+            else:
+                remain = deadline - time.time()
+                if remain <= 0:
+                    return None
+                self._cond.wait(remain)
+
+    def _find(self, patterns, start):
+        # earliest match of any pattern in the buffer from start, (index, match end)
+        found = None
+        for index, pattern in enumerate(patterns):
+            if hasattr(pattern, 'search'):
+                m = pattern.search(self._buffer, start)
+                if m is None:
+                    continue
+                pos, end = m.start(), m.end()
+            else:
+                pos = self._buffer.find(pattern, start)
+                if pos < 0:
+                    continue
+                end = pos + len(pattern)
+            if found is None or pos < found[0]:
+                found = (pos, index, end)
+        return None if found is None else found[1:]
+
+    def start(self):
+        '''
+        Start the reader thread, bytes received before are left in the uart.
+
+        Returns:
+            string, "done", api execution successful.
+
+        '''
+        with self._cond:
+            if self._running:
+                return 'done'
+            self._running = True
+            self._error = None
+        self._thread = threading.Thread(target=self._run, name='uart_reader')
+        self._thread.daemon = True
+        self._thread.start()
+        return 'done'
+
+    def stop(self):
+        '''
+        Stop the reader thread, the buffer can still be read.
+
+        Returns:
+            string, "done", api execution successful.
+
+        '''
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(UARTReaderDef.THREAD_JOIN_TIMEOUT)
+            self._thread = None
+        return 'done'
+
+    def is_running(self):
+        '''
+        Get whether the reader thread is running.
+
+        Returns:
+            boolean, [True, False].
+
+        '''
+        return self._running
+
+    def read(self, size=0, timeout_s=0):
+        '''
+        Read what is in the buffer, wait at most timeout_s for the first byte.
+
+        Args:
+            size:       int, (>=0), default 0, max bytes to read, 0 for all.
+            timeout_s:  float/None, default 0, unit Second, None to wait forever.
+
+        Returns:
+            string, data read, empty if nothing arrived.
+
+        Examples:
+            data = reader.read(0, 0.5)
+
+        '''
+        assert size >= 0
+        with self._cond:
+            if timeout_s != 0 and not self._buffer:
+                self._wait(lambda: True if self._buffer else None, timeout_s)
+            return self._consume(size if 0 < size < len(self._buffer) else len(self._buffer))
+
+    def read_exact(self, size, timeout_s=None):
+        '''
+        Read exactly size bytes.
+
+        Args:
+            size:       int, (>0), bytes to read.
+            timeout_s:  float/None, default None, unit Second, None to wait forever.
+
+        Returns:
+            string, data read.
+
+        Raises:
+            UARTReaderException:    size bytes did not arrive in time, nothing is read then.
+
+        Examples:
+            header = reader.read_exact(4, 1)
+
+        '''
+        assert 0 < size <= self.buffer_size
+        with self._cond:
+            if self._wait(lambda: True if len(self._buffer) >= size else None, timeout_s) is None:
+                raise UARTReaderException('read %d bytes timeout, %d bytes received' %
+                                          (size, len(self._buffer)))
+            return self._consume(size)
+
+    def read_until(self, pattern, timeout_s=None):
+        '''
+        Read until pattern is received, the pattern is included in the data read.
+
+        Args:
+            pattern:    string/regex, string to find or compiled regular expression.
+            timeout_s:  float/None, default None, unit Second, None to wait forever.
+
+        Returns:
+            string, data read.
+
+        Raises:
+            UARTReaderException:    pattern did not arrive in time, nothing is read then.
+
+        Examples:
+            data = reader.read_until('] ', 3)
+            data = reader.read_until(re.compile(r'\\d+% done'), 60)
+
+        '''
+        return self.expect([pattern], timeout_s)[1]
+
+    def expect(self, patterns, timeout_s=None):
+        '''
+        Read until one of the patterns is received, the earliest one in the data wins.
+
+        Args:
+            patterns:   list, [string/regex, ...], strings to find or compiled regular expressions,
+                              string items which look like '/.../' are taken as regular expressions,
+                              unicode strings are matched as utf-8.
+            timeout_s:  float/None, default None, unit Second, None to wait forever.
+
+        Returns:
+            list, [index, data], index of the pattern found and data read until the end of it.
+
+        Raises:
+            UARTReaderException:    no pattern arrived in time, nothing is read then.
+
+        Examples:
+            index, data = reader.expect(['PASS', 'FAIL', '/ERR\\d+/'], 10)
+
+        '''
+        assert isinstance(patterns, (list, tuple)) and patterns
+        compiled = []
+        for pattern in patterns:
+            # strings from rpc are unicode, the buffer holds utf-8 bytes
+            if isinstance(pattern, unicode):
+                pattern = pattern.encode('utf-8')
+            if isinstance(pattern, basestring) and len(pattern) > 2 and \
+                    pattern.startswith('/') and pattern.endswith('/'):
+                pattern = re.compile(pattern[1:-1])
+            assert hasattr(pattern, 'search') or len(pattern) > 0
+            compiled.append(pattern)
+        # strings are only searched again from where they could start in new data
+        longest = max(len(p) if not hasattr(p, 'search') else 0 for p in compiled)
+        regex = any(hasattr(p, 'search') for p in compiled)
+        state = {'head': self._head, 'searched': 0}
+
+        def match():
+            start = 0
+            if not regex and state['head'] == self._head:
+                start = max(0, state['searched'] - longest + 1)
+            state['head'] = self._head
+            state['searched'] = len(self._buffer)
+            return self._find(compiled, start)
+
+        with self._cond:
+            found = self._wait(match, timeout_s)
+            if found is None:
+                raise UARTReaderException('expect %s timeout, %d bytes received' %
+                                          (str(patterns), len(self._buffer)))
+            index, end = found
+            return [index, self._consume(end)]
+
+    def read_chunks(self, timeout_s=0):
+        '''
+        Read all data in the buffer as the chunks they arrived in, wait at most timeout_s for data.
+
+        Args:
+            timeout_s:  float/None, default 0, unit Second, None to wait forever.
+
+        Returns:
+            list, [[timestamp, data], ...], timestamp is time.time() when the chunk arrived.
+
+        Examples:
+            for timestamp, data in reader.read_chunks(0.5):
+                print(timestamp, data)
+
+        '''
+        with self._cond:
+            if timeout_s != 0 and not self._buffer:
+                self._wait(lambda: True if self._buffer else None, timeout_s)
+            chunks = []
+            positions = [chunk[0] for chunk in self._chunks] + [self._head + len(self._buffer)]
+            for i, (start, timestamp) in enumerate(self._chunks):
+                chunks.append([timestamp, bytes(self._buffer[start - self._head:positions[i + 1] - self._head])])
+            self._consume(len(self._buffer))
+            return chunks
+
+    def flush(self):
+        '''
+        Drop all data in the buffer.
+
+        Returns:
+            string, "done", api execution successful.
+
+        '''
+        with self._cond:
+            self._consume(len(self._buffer))
+        return 'done'
+
+    def statistics(self):
+        '''
+        Get reader statistics.
+
+        Returns:
+            dict, {'running': boolean, 'received': int, 'chunks': int, 'buffered': int,
+                   'overflows': int, 'overflow_bytes': int, 'error': string/None},
+                  overflow_bytes is the count of bytes dropped because the buffer was full.
+
+        '''
+        with self._cond:
+            return {
+                'running': self._running,
+                'received': self._received,
+                'chunks': self._chunk_count,
+                'buffered': len(self._buffer),
+                'overflows': self._overflows,
+                'overflow_bytes': self._overflow_bytes,
+                'error': self._error
+            }
@@ -5,7 +5,9 @@ from ..bus.axi4_lite_def import PLI2CDef
 
 
 class CAT24CXXDef:
-    WRITE_CYCLE_TIME = 0.015
+    # write cycle is detected by ACK polling, tWR of CAT24Cxx is 5 ms max
+    ACK_POLL_TIMEOUT = 0.05
+    ACK_POLL_INTERVAL = 0.0005
     FPGA_BUFSZ = 32
     ADDRESS_BIT = 0X07
     ADDR_ENABLE = 0x50
@@ -74,7 +76,7 @@ class CAT24CXX(object):
        eeprom = CAT24CXX(0x50, i2c)
 
     '''
-    rpc_public_api = ['read', 'write']
+    rpc_public_api = ['read', 'write', 'write_bulk']
 
     def __init__(self, dev_addr, i2c_bus):
         if i2c_bus is None:
@@ -135,13 +137,7 @@ class CAT24CXX(object):
 
         result = []
         while read_len > 0:
-            if self.device_type == "CAT24C04"\
-                    or self.device_type == "CAT24C08"\
-                    or self.device_type == "CAT24C16":
-                device_addr = self.device_addr |\
-                    ((read_addr >> 8) & self.mask)
-            else:
-                device_addr = self.device_addr
+            device_addr = self._get_device_addr(read_addr)
             mem_addr = self.address_to_byte_list(read_addr)
             '''FPGA i2c bus a frame max size is 32 bytes data.'''
             if read_bytes > (CAT24CXXDef.FPGA_BUFSZ - 1 - len(mem_addr)):
@@ -159,6 +155,38 @@ class CAT24CXX(object):
 
         return result
 
+    def _get_device_addr(self, mem_addr):
+        if self.device_type == "CAT24C04" \
+                or self.device_type == "CAT24C08" \
+                or self.device_type == "CAT24C16":
+            return self.device_addr | ((mem_addr >> 8) & self.mask)
+        return self.device_addr
+
+    def _wait_write_complete(self, device_addr, mem_addr):
+        '''
+        CAT24CXX wait for the internal write cycle by ACK polling
+
+        The device does not ACK its address until the write cycle is done, so the memory
+        address is written until it is ACKed. This only sets the address pointer.
+
+        Args:
+            device_addr:    hexmial, I2C device address of the page written.
+            mem_addr:       list,    memory address bytes of the page written.
+
+        Raises:
+            CAT24CXXException:  write cycle is not done in ACK_POLL_TIMEOUT.
+
+        '''
+        start = time.time()
+        while True:
+            try:
+                self.iic_bus.write(device_addr, mem_addr)
+                return
+            except Exception as e:
+                if time.time() - start >= CAT24CXXDef.ACK_POLL_TIMEOUT:
+                    raise CAT24CXXException("wait write cycle complete timeout, %s" % (str(e)))
+            time.sleep(CAT24CXXDef.ACK_POLL_INTERVAL)
+
     def write(self, addr, data):
         '''
         CAT24CXX write datas to address, support cross pages writing operation
@@ -187,13 +215,7 @@ class CAT24CXX(object):
             write_bytes = write_len
 
         while write_len > 0:
-            if self.device_type == "CAT24C04" \
-                    or self.device_type == "CAT24C08" \
-                    or self.device_type == "CAT24C16":
-                device_addr = self.device_addr | (
-                    (write_addr >> 8) & self.mask)
-            else:
-                device_addr = self.device_addr
+            device_addr = self._get_device_addr(write_addr)
 
             mem_addr = self.address_to_byte_list(write_addr)
             '''FPGA i2c bus a frame max size is 32 bytes data.'''
@@ -208,7 +230,53 @@ class CAT24CXX(object):
                 write_bytes = self.page_size - (write_addr & (self.page_size - 1))
             else:
                 write_bytes = write_len
-            time.sleep(CAT24CXXDef.WRITE_CYCLE_TIME)
+            self._wait_write_complete(device_addr, mem_addr)
+
+    def write_bulk(self, blocks):
+        '''
+        CAT24CXX write many scattered blocks with the minimum page writes
+
+        Blocks are merged by page, later blocks overwrite earlier ones. The bytes
+        between two blocks in the same page are read back and written with them,
+        so each touched page takes one page write (more only when the page is larger
+        than an FPGA i2c frame).
+
+        Args:
+            blocks:     list, [[addr, [value, ...]], ...], data to write to each address.
+
+        Returns:
+            int, count of pages written.
+
+        Raises:
+            CAT24CXXException:  block is over chip size.
+
+        Examples:
+            cat24cxx.write_bulk([[0x100, [0x01, 0x02]], [0x10A, [0x03]], [0x200, [0x04] * 16]])
+
+        '''
+        pending = {}
+        for addr, data in blocks:
+            if addr < 0 or addr + len(data) > self.chip_size:
+                raise CAT24CXXException("write data len over chip size")
+            for i, value in enumerate(data):
+                pending[addr + i] = value
+
+        pages = {}
+        for addr in pending:
+            pages.setdefault(addr // self.page_size, []).append(addr)
+
+        for page in sorted(pages):
+            addrs = pages[page]
+            start = min(addrs)
+            length = max(addrs) + 1 - start
+            if length != len(addrs):
+                data = self.read(start, length)
+            else:
+                data = [0] * length
+            for addr in addrs:
+                data[addr - start] = pending[addr]
+            self.write(start, data)
+        return len(pages)
 
 
 class CAT24C01(CAT24CXX):
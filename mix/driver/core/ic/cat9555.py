@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from ..bus.i2c_bus_emulator import I2CBusEmulator
-from threading import Lock
 from io_expander_base import IOExpanderBase
 
 
@@ -33,6 +32,10 @@ class CAT9555(IOExpanderBase):
         cat9555 = CAT9555(0x20,'/dev/MIX_I2C_0')
 
     '''
+    _port_count = 2
+    _pin_count = 16
+    _output_register = CAT9555Def.OUTPUT_PORT_0_REGISTER
+    _dir_register = CAT9555Def.DIR_CONFIG_PORT_0_REGISTER
 
     def __init__(self, dev_addr, i2c_bus=None, lock=None):
         assert (dev_addr & (~0x07)) == 0x20
@@ -41,7 +44,6 @@ class CAT9555(IOExpanderBase):
         else:
             self.i2c_bus = i2c_bus
         self.lock = lock
-        self.lock_set_pin = Lock()
         self.dev_addr = dev_addr
         super(CAT9555, self).__init__()
 
@@ -91,18 +93,19 @@ class CAT9555(IOExpanderBase):
         wr_data = []
         wr_data.append(reg_addr)
         wr_data.extend(write_data)
-        if self.lock is not None:
-            self.lock.acquire()
+        with self._register_write(reg_addr, len(write_data)):
+            if self.lock is not None:
+                self.lock.acquire()
+
+            try:
+                self.i2c_bus.write(self.dev_addr, wr_data)
+            except Exception as error:
+                if self.lock is not None:
+                    self.lock.release()
+                raise error
 
-        try:
-            self.i2c_bus.write(self.dev_addr, wr_data)
-        except Exception as error:
             if self.lock is not None:
                 self.lock.release()
-            raise error
-
-        if self.lock is not None:
-            self.lock.release()
 
     def set_pin_dir(self, pin_id, dir):
         '''
@@ -119,12 +122,8 @@ class CAT9555(IOExpanderBase):
         assert pin_id >= 0 and pin_id <= 15
         assert dir in [CAT9555Def.PIN_DIR_INPUT, CAT9555Def.PIN_DIR_OUTPUT]
 
-        rd_data = self.get_pins_dir()
-        dir_config = rd_data[0] | (rd_data[1] << 8)
-        dir_config &= ~(1 << pin_id)
-        if dir == CAT9555Def.PIN_DIR_INPUT:
-            dir_config |= (1 << pin_id)
-        self.set_pins_dir([dir_config & 0xFF, (dir_config >> 8) & 0xFF])
+        is_input = 1 if dir == CAT9555Def.PIN_DIR_INPUT else 0
+        self._update_ports(CAT9555Def.DIR_CONFIG_PORT_0_REGISTER, 1 << pin_id, is_input << pin_id)
 
     def get_pin_dir(self, pin_id):
         '''
@@ -164,13 +163,7 @@ class CAT9555(IOExpanderBase):
         '''
         assert pin_id >= 0 and pin_id <= 15
 
-        with self.lock_set_pin:
-            rd_data = self.get_ports_state()
-            port_config = rd_data[0] | (rd_data[1] << 8)
-            port_config &= ~(1 << pin_id)
-            if level == 1:
-                port_config |= (1 << pin_id)
-            self.set_ports([port_config & 0xFF, (port_config >> 8) & 0xFF])
+        self.set_pins({pin_id: level})
 
     def get_pin(self, pin_id):
         '''
@@ -276,8 +269,7 @@ class CAT9555(IOExpanderBase):
 
         '''
         assert (len(pins_dir_mask) == 1) or (len(pins_dir_mask) == 2)
-        self.write_register(
-            CAT9555Def.DIR_CONFIG_PORT_0_REGISTER, pins_dir_mask)
+        self._write_ports(CAT9555Def.DIR_CONFIG_PORT_0_REGISTER, pins_dir_mask)
 
     def get_pins_dir(self):
         '''
@@ -307,21 +299,28 @@ class CAT9555(IOExpanderBase):
         '''
         return self.read_register(CAT9555Def.INPUT_PORT_0_REGISTER, 2)
 
-    def set_ports(self, ports_level_mask):
+    def set_ports(self, ports_level_mask, value=None):
         '''
-        Set the value of input port register.
+        Set the value of output port register.
 
         Args:
-            ports_level_mask:   list, Element takes one byte.
-                                      eg:[0x12,0x13].
+            ports_level_mask:   list/int, Element takes one byte.
+                                          eg:[0x12,0x13],
+                                          or mask of the pins to set when value is given,
+                                          bit n is pin n, eg:0x1213.
+            value:              int/None, default None, level of the pins in mask,
+                                          only the port registers which change are written.
 
         Examples:
             cat9555.set_ports([0x12,0x13])
+            cat9555.set_ports(0x0101, 0x0100)
 
         '''
+        if value is not None:
+            self._update_ports(CAT9555Def.OUTPUT_PORT_0_REGISTER, ports_level_mask, value)
+            return
         assert (len(ports_level_mask) == 1) or (len(ports_level_mask) == 2)
-        self.write_register(
-            CAT9555Def.OUTPUT_PORT_0_REGISTER, ports_level_mask)
+        self._write_ports(CAT9555Def.OUTPUT_PORT_0_REGISTER, ports_level_mask)
 
     def get_ports_state(self):
         '''
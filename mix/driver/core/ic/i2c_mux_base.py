@@ -39,6 +39,14 @@ class I2CMUXBase(object):
 
         return self.downstream_buses[channel]
 
+    def _invalidate_channel_selection(self):
+        '''
+        Channels are written directly, downstream buses program the mux again on next access.
+        '''
+        manager = getattr(self, 'mux_manager', None)
+        if manager is not None:
+            manager.invalidate()
+
     def set_channel_state(self, channel):
         '''
         To be overriden by sub class.
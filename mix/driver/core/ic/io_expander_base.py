@@ -1,22 +1,39 @@
 # -*- coding: UTF-8 -*-
+import threading
+from contextlib import contextmanager
 from ..bus.pin import Pin
 
 
 class IOExpanderBase(object):
     '''
     Base Class for all IO Expander like CAT9555
+
+    Drivers which set _output_register and _dir_register keep shadow copies of the output
+    and direction registers. set_pin, set_pin_dir, set_pins and set_ports(mask, value) compute
+    the new port values from the shadows and write the changed port registers with one write,
+    the chip is only read the first time a register is used. Call resync() after the chip was
+    power cycled or reset, or after its registers were written other than by this instance.
     '''
     rpc_public_api = [
         'read_register', 'write_register', 'set_pin_dir', 'get_pin_dir',
         'set_pin', 'get_pin', 'get_pin_state',
         'set_pin_inversion', 'get_pin_inversion', 'set_pins_dir', 'get_pins_dir',
         'get_ports', 'set_ports', 'get_ports_state',
-        'set_ports_inversion', 'get_ports_inversion'
+        'set_ports_inversion', 'get_ports_inversion', 'set_pins', 'resync'
     ]
 
+    # 8 bit ports, registers of the same kind are next to each other with address auto increment
+    _port_count = 1
+    _pin_count = 8
+    _output_register = None
+    _dir_register = None
+
     def __init__(self):
         # list of downstream buses created.
         self.ports = {}
+        # register address --> [port value, ...]
+        self._shadow = {}
+        self._shadow_lock = threading.RLock()
 
     def __getitem__(self, index):
         '''
@@ -38,3 +55,96 @@ class IOExpanderBase(object):
             self.ports[port] = pin
 
         return self.ports[port]
+
+    def _shadow_ports(self, register):
+        if register not in self._shadow:
+            self._shadow[register] = list(self.read_register(register, self._port_count))
+        return self._shadow[register]
+
+    @contextmanager
+    def _register_write(self, register_addr, count):
+        # a write_register of count registers from register_addr, the shadows it touches are
+        # dropped and read again on the next use, the lock keeps shadow updates out meanwhile
+        with self._shadow_lock:
+            for register in list(self._shadow):
+                if register < register_addr + count and register_addr < register + self._port_count:
+                    del self._shadow[register]
+            yield
+
+    def _write_ports(self, register, ports, first=0):
+        # write ports from port first and keep the shadow of them, the shadow
+        # is dropped if the write fails, so it is read again on the next use
+        with self._shadow_lock:
+            shadow = self._shadow.pop(register, None)
+            self.write_register(register + first, list(ports))
+            if shadow is None and first == 0 and len(ports) == self._port_count:
+                shadow = [0] * self._port_count
+            if shadow is not None:
+                shadow[first:first + len(ports)] = ports
+                self._shadow[register] = shadow
+
+    def _update_ports(self, register, mask, value):
+        # set the bits in mask to value, only ports which change are written
+        assert register is not None
+        assert 0 <= mask < (1 << self._pin_count)
+        with self._shadow_lock:
+            old = self._shadow_ports(register)
+            new = []
+            for i in range(self._port_count):
+                port_mask = (mask >> (i * 8)) & 0xFF
+                port_value = (value >> (i * 8)) & port_mask
+                new.append((old[i] & ~port_mask) | port_value)
+            changed = [i for i in range(self._port_count) if new[i] != old[i]]
+            if changed:
+                self._write_ports(register, new[changed[0]:changed[-1] + 1], changed[0])
+
+    def _pins_to_mask(self, pins):
+        mask = 0
+        value = 0
+        for pin_id, level in pins:
+            pin_id = int(pin_id)
+            assert pin_id >= 0 and pin_id < self._pin_count
+            assert level in [0, 1]
+            mask |= 1 << pin_id
+            value |= level << pin_id
+        return mask, value
+
+    def set_pins(self, pins):
+        '''
+        Set the level of many pins, each port register which changes is written once
+
+        Args:
+            pins:     dict, {pin_id: level, ...}, level is 0 or 1.
+
+        Examples:
+            cat9555.set_pins({0: 1, 1: 1, 12: 0})
+
+        '''
+        assert isinstance(pins, dict)
+        mask, value = self._pins_to_mask(pins.items())
+        self._update_ports(self._output_register, mask, value)
+
+    def resync(self, restore=True):
+        '''
+        Bring the shadow output and direction registers and the chip back in step
+
+        Args:
+            restore:  boolean, [True, False], default True, True to write the shadow registers
+                                              back to the chip after it was power cycled or
+                                              reset, False to drop the shadows and read the chip.
+
+        Examples:
+            cat9555.resync()
+
+        '''
+        registers = [r for r in [self._output_register, self._dir_register] if r is not None]
+        with self._shadow_lock:
+            if restore:
+                # outputs first, so pins turned to output start at the shadow level
+                for register in registers:
+                    if register in self._shadow:
+                        self._write_ports(register, list(self._shadow[register]))
+            else:
+                self._shadow = {}
+                for register in registers:
+                    self._shadow_ports(register)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import threading
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class NVMemCacheDef:
+    BLOCK_SIZE = 16
+    # max bytes of one device read when missing blocks are read together
+    MAX_READ_LEN = 1024
+
+
+class NVMemCacheException(Exception):
+    def __init__(self, err_str):
+        self._err_reason = '%s.' % (err_str)
+
+    def __str__(self):
+        return self._err_reason
+
+
+class NVMemCache(object):
+    '''
+    Read-through, block granular cache in front of an EEPROM/NVMEM device
+
+    Reads are served from memory by blocks of block_size bytes, missing blocks next to each
+    other are read from the device in one read. Writes go to the device and invalidate the
+    blocks they touch, so the device is read again only after it is written through this
+    cache. Only one cache should be used for a device, writes from anything else are not seen.
+
+    ClassType = EEPROM
+
+    Args:
+        device:         instance(EEPROM), device with read(addr, length) and write(addr, data),
+                                          such as CAT24CXX.
+        block_size:     int, (>0), default 16, cache block size in bytes.
+        regions:        list/None, default None, [[start, stop], ...], address regions which are
+                                   cached, stop is excluded, None to cache the whole device.
+
+    Examples:
+        eeprom = NVMemCache(CAT24C32(0x50, i2c))
+        sn = eeprom.read(0x03, 17)
+        print(eeprom.statistics())
+
+    '''
+    rpc_public_api = ['read', 'write', 'invalidate', 'statistics']
+
+    def __init__(self, device, block_size=NVMemCacheDef.BLOCK_SIZE, regions=None):
+        assert block_size > 0
+        self.device = device
+        self.block_size = block_size
+        self.regions = [(start, stop) for start, stop in regions] if regions is not None else None
+        self._blocks = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._device_reads = 0
+
+    def __getattr__(self, name):
+        # page_size, chip_size and other device attributes
+        if name == 'device':
+            raise AttributeError(name)
+        return getattr(self.device, name)
+
+    def _is_cached(self, addr, length):
+        if self.regions is None:
+            return True
+        return any(start <= addr and addr + length <= stop for start, stop in self.regions)
+
+    def _read_device(self, addr, length):
+        data = []
+        while length > 0:
+            read_len = min(length, NVMemCacheDef.MAX_READ_LEN)
+            data += list(self.device.read(addr, read_len))
+            self._device_reads += 1
+            addr += read_len
+            length -= read_len
+        return data
+
+    def _fill(self, first, last):
+        # read the missing blocks in [first, last], consecutive ones in one device read
+        chip_size = getattr(self.device, 'chip_size', None)
+        block = first
+        while block <= last:
+            if block in self._blocks:
+                self._hits += 1
+                block += 1
+                continue
+            start = block
+            while block <= last and block not in self._blocks:
+                block += 1
+            self._misses += block - start
+            addr = start * self.block_size
+            stop = block * self.block_size
+            if chip_size is not None:
+                stop = min(stop, chip_size)
+            data = self._read_device(addr, stop - addr)
+            for i in range(start, block):
+                offset = (i - start) * self.block_size
+                self._blocks[i] = data[offset:offset + self.block_size]
+
+    def read(self, addr, length):
+        '''
+        NVMemCache read specific length datas from address
+
+        Args:
+            addr:      hexmial, (>=0), Read datas from this address.
+            length:    int, (>0),      Length to read.
+
+        Returns:
+            list, [value, ...].
+
+        Examples:
+            result = eeprom.read(0x00, 10)
+
+        '''
+        if not self._is_cached(addr, length):
+            with self._lock:
+                self._device_reads += 1
+            return list(self.device.read(addr, length))
+
+        with self._lock:
+            first = addr // self.block_size
+            last = (addr + length - 1) // self.block_size
+            self._fill(first, last)
+            data = []
+            for block in range(first, last + 1):
+                data += self._blocks[block]
+        offset = addr - first * self.block_size
+        result = data[offset:offset + length]
+        if len(result) != length:
+            raise NVMemCacheException('read 0x%x with %d bytes over device size' % (addr, length))
+        return result
+
+    def write(self, addr, data):
+        '''
+        NVMemCache write datas to address, the blocks written are invalidated
+
+        Args:
+            addr:       hexmial, (>=0), Write datas to this address.
+            data:       list,           Datas to be write.
+
+        Examples:
+            eeprom.write(0x00, [0x01, 0x02, 0x03])
+
+        '''
+        with self._lock:
+            self.invalidate(addr, len(data))
+            return self.device.write(addr, data)
+
+    def write_bulk(self, blocks):
+        '''
+        NVMemCache write many blocks with the device write_bulk, the blocks written are invalidated
+
+        Args:
+            blocks:     list, [[addr, [value, ...]], ...], data to write to each address.
+
+        Returns:
+            the result of device write_bulk.
+
+        '''
+        with self._lock:
+            for addr, data in blocks:
+                self.invalidate(addr, len(data))
+            return self.device.write_bulk(blocks)
+
+    def set_regions(self, regions):
+        '''
+        NVMemCache change the cached address regions, cached blocks outside of them are dropped
+
+        Args:
+            regions:    list/None, [[start, stop], ...], address regions which are cached,
+                                   stop is excluded, None to cache the whole device.
+
+        Examples:
+            eeprom.set_regions([[0x00, 0x100]])
+
+        '''
+        with self._lock:
+            self.regions = [(start, stop) for start, stop in regions] if regions is not None else None
+            for block in list(self._blocks):
+                if not self._is_cached(block * self.block_size, self.block_size):
+                    del self._blocks[block]
+
+    def invalidate(self, addr=None, length=None):
+        '''
+        NVMemCache drop cached data, the next read of it reads the device
+
+        Args:
+            addr:       hexmial/None, default None, first address, None to drop all.
+            length:     int/None, default None, length to drop, None to drop all.
+
+        Examples:
+            eeprom.invalidate()
+
+        '''
+        with self._lock:
+            if addr is None or length is None:
+                self._blocks = {}
+                return
+            if length <= 0:
+                return
+            first = addr // self.block_size
+            last = (addr + length - 1) // self.block_size
+            for block in range(first, last + 1):
+                self._blocks.pop(block, None)
+
+    def statistics(self):
+        '''
+        NVMemCache get hit statistics, hits and misses are counted by block
+
+        Returns:
+            dict, {'hits': int, 'misses': int, 'hit_rate': float, 'device_reads': int,
+                   'cached_bytes': int}.
+
+        Examples:
+            print(eeprom.statistics())
+
+        '''
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': float(self._hits) / total if total else 0.0,
+                'device_reads': self._device_reads,
+                'cached_bytes': len(self._blocks) * self.block_size
+            }
+
+
+class NVMemCacheMixin(object):
+    '''
+    Cache RPCs of module drivers whose _eeprom_device may be a NVMemCache.
+    '''
+
+    def get_nvmem_cache_statistics(self):
+        '''
+        Get hit statistics of the eeprom read cache.
+
+        Returns:
+            dict, {'hits': int, 'misses': int, 'hit_rate': float, 'device_reads': int, 'cached_bytes': int},
+                  {} if the cache is not used.
+
+        '''
+        if not isinstance(self._eeprom_device, NVMemCache):
+            return {}
+        return self._eeprom_device.statistics()
+
+    def invalidate_nvmem_cache(self):
+        '''
+        Drop the eeprom read cache, use it after the eeprom is written by another program.
+
+        '''
+        if isinstance(self._eeprom_device, NVMemCache):
+            self._eeprom_device.invalidate()
+        return "done"
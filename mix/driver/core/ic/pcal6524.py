@@ -66,8 +66,12 @@ class PCAL6524(IOExpanderBase):
         'set_pin', 'get_pin', 'get_ports', 'set_ports', 'reset_chip',
         'get_pins_state', 'set_pins_state', 'set_pins_dir', 'get_pins_dir',
         'set_pull_up_or_down', 'get_pull_up_or_down_state',
-        'set_pins_mode', 'get_pins_mode'
+        'set_pins_mode', 'get_pins_mode', 'set_pins', 'resync'
     ]
+    _port_count = 3
+    _pin_count = 24
+    _output_register = PCAL6524Def.OUTPUT_PORT_0_REGISTER
+    _dir_register = PCAL6524Def.CONFIG_PORT_0_REGISTER
 
     def __init__(self, dev_addr, i2c_bus=None):
         # 7-bit address, excluding read/write bits, lower two bits are variable
@@ -117,8 +121,8 @@ class PCAL6524(IOExpanderBase):
         assert register_address >= 0
         assert isinstance(write_data, list)
 
-        write_data = [register_address] + write_data
-        self.i2c_bus.write(self.dev_addr, write_data)
+        with self._register_write(register_address, len(write_data)):
+            self.i2c_bus.write(self.dev_addr, [register_address] + write_data)
 
     def set_pin_dir(self, pin_id, dir):
         '''
@@ -212,20 +216,28 @@ class PCAL6524(IOExpanderBase):
         '''
         return self.read_register(PCAL6524Def.INPUT_PORT_0_REGISTER, 3)
 
-    def set_ports(self, ports_list):
+    def set_ports(self, ports_list, value=None):
         '''
-        Set the value of input port register.
+        Set the value of output port register.
 
         Args:
-            ports_list:    list,    Element takes one byte.
-                                    eg:[0x12,0x13].
+            ports_list:    list/int, Element takes one byte.
+                                     eg:[0x12,0x13],
+                                     or mask of the pins to set when value is given,
+                                     bit n is pin n, eg:0x010001.
+            value:         int/None, default None, level of the pins in mask,
+                                     only the port registers which change are written.
 
         Examples:
             pcal6524.set_ports([0x12,0x13])
+            pcal6524.set_ports(0x010001, 0x010000)
 
         '''
+        if value is not None:
+            self._update_ports(PCAL6524Def.OUTPUT_PORT_0_REGISTER, ports_list, value)
+            return
         assert (len(ports_list) == 1) or (len(ports_list) == 2)
-        self.write_register(PCAL6524Def.OUTPUT_PORT_0_REGISTER, ports_list)
+        self._write_ports(PCAL6524Def.OUTPUT_PORT_0_REGISTER, ports_list)
 
     def reset_chip(self):
         '''
@@ -235,7 +247,10 @@ class PCAL6524(IOExpanderBase):
             pcal6524.reset()
 
         '''
-        self.i2c_bus.write(PCAL6524Def.RESET_ADDR, PCAL6524Def.RESET_VALUE)
+        with self._shadow_lock:
+            self.i2c_bus.write(PCAL6524Def.RESET_ADDR, PCAL6524Def.RESET_VALUE)
+            # registers are back to their power on values
+            self._shadow = {}
 
     def get_pins_state(self, pins_list):
         '''
@@ -281,19 +296,8 @@ class PCAL6524(IOExpanderBase):
         assert isinstance(pins_configure, list) and pins_configure
         assert all(0 <= x[0] < 24 and x[1] in (0, 1) for x in pins_configure)
 
-        all_pin_conf_list = self.read_register(
-            PCAL6524Def.OUTPUT_PORT_0_REGISTER, 3)
-
-        for pin in pins_configure:
-            group = pin[0] / 8
-            index = pin[0] % 8
-            if pin[1] == 1:
-                all_pin_conf_list[group] |= (1 << index)
-            else:
-                all_pin_conf_list[group] &= ~(1 << index)
-        self.write_register(
-            PCAL6524Def.OUTPUT_PORT_0_REGISTER,
-            all_pin_conf_list)
+        mask, value = self._pins_to_mask(pins_configure)
+        self._update_ports(PCAL6524Def.OUTPUT_PORT_0_REGISTER, mask, value)
 
     def set_pins_dir(self, pins_dir_configure):
         '''
@@ -312,17 +316,8 @@ class PCAL6524(IOExpanderBase):
         assert all(0 <= x[0] < 24 and x[1] in (0, 1)
                    for x in pins_dir_configure)
 
-        dir_conf_list = self.read_register(
-            PCAL6524Def.CONFIG_PORT_0_REGISTER, 3)
-
-        for pin in pins_dir_configure:
-            group = pin[0] / 8
-            index = pin[0] % 8
-            if pin[1] == 1:
-                dir_conf_list[group] |= (1 << index)
-            else:
-                dir_conf_list[group] &= ~(1 << index)
-        self.write_register(PCAL6524Def.CONFIG_PORT_0_REGISTER, dir_conf_list)
+        mask, value = self._pins_to_mask(pins_dir_configure)
+        self._update_ports(PCAL6524Def.CONFIG_PORT_0_REGISTER, mask, value)
 
     def get_pins_dir(self, pins_dir_list):
         '''
@@ -30,6 +30,8 @@ class TCA9538(IOExpanderBase):
         tca9538 = TCA9538(0x70,'/dev/MIX_I2C_0')
 
     '''
+    _output_register = TCA9538Def.OUTPUT_PORT_REGISTERS
+    _dir_register = TCA9538Def.DIR_CONFIGURATION_REGISTERS
 
     def __init__(self, dev_addr, i2c_bus=None):
         assert dev_addr & (~0x03) == 0x70
@@ -75,7 +77,8 @@ class TCA9538(IOExpanderBase):
         wr_data = []
         wr_data.append(register_addr)
         wr_data.extend(write_data)
-        self._i2c_bus.write(self._dev_addr, wr_data)
+        with self._register_write(register_addr, len(write_data)):
+            self._i2c_bus.write(self._dev_addr, wr_data)
 
     def set_pin_dir(self, pin_id, dir):
         '''
@@ -92,12 +95,8 @@ class TCA9538(IOExpanderBase):
         assert pin_id >= TCA9538Def.PIN_ID_MIN and pin_id <= TCA9538Def.PIN_ID_MAX
         assert dir in [TCA9538Def.PIN_DIR_INPUT, TCA9538Def.PIN_DIR_OUTPUT]
 
-        rd_data = self.get_pins_dir()
-        dir_config = rd_data[0]
-        dir_config &= ~(1 << pin_id)
-        if dir == TCA9538Def.PIN_DIR_INPUT:
-            dir_config |= (1 << pin_id)
-        self.set_pins_dir([dir_config & 0xFF])
+        is_input = 1 if dir == TCA9538Def.PIN_DIR_INPUT else 0
+        self._update_ports(TCA9538Def.DIR_CONFIGURATION_REGISTERS, 1 << pin_id, is_input << pin_id)
 
     def get_pin_dir(self, pin_id):
         '''
@@ -136,12 +135,7 @@ class TCA9538(IOExpanderBase):
 
         '''
         assert pin_id >= TCA9538Def.PIN_ID_MIN and pin_id <= TCA9538Def.PIN_ID_MAX
-        rd_data = self.get_ports_state()
-        port_config = rd_data[0]
-        port_config &= ~(1 << pin_id)
-        if level == 1:
-            port_config |= (1 << pin_id)
-        self.set_ports([port_config & 0xFF])
+        self.set_pins({pin_id: level})
 
     def get_pin(self, pin_id):
         '''
@@ -243,7 +237,7 @@ class TCA9538(IOExpanderBase):
 
         '''
         assert len(ports_pins_mask) == 1
-        self.write_register(TCA9538Def.DIR_CONFIGURATION_REGISTERS, ports_pins_mask)
+        self._write_ports(TCA9538Def.DIR_CONFIGURATION_REGISTERS, ports_pins_mask)
 
     def get_pins_dir(self):
         '''
@@ -273,20 +267,27 @@ class TCA9538(IOExpanderBase):
         '''
         return self.read_register(TCA9538Def.INTPUT_PORT_REGISTERS, 1)
 
-    def set_ports(self, ports_level_mask):
+    def set_ports(self, ports_level_mask, value=None):
         '''
-        Set the value of input port register.
+        Set the value of output port register.
 
         Args:
-            ports_level_mask:   list, Element takes one byte.
-                                      eg:[0x02].
+            ports_level_mask:   list/int, Element takes one byte, eg:[0x12],
+                                          or mask of the pins to set when value is given,
+                                          bit n is pin n, eg:0x03.
+            value:              int/None, default None, level of the pins in mask,
+                                          the port register is written only if it changes.
 
         Examples:
             tca9538.set_ports([0x12])
+            tca9538.set_ports(0x03, 0x01)
 
         '''
+        if value is not None:
+            self._update_ports(TCA9538Def.OUTPUT_PORT_REGISTERS, ports_level_mask, value)
+            return
         assert len(ports_level_mask) == 1
-        self.write_register(TCA9538Def.OUTPUT_PORT_REGISTERS, ports_level_mask)
+        self._write_ports(TCA9538Def.OUTPUT_PORT_REGISTERS, ports_level_mask)
 
     def get_ports_state(self):
         '''
@@ -24,6 +24,7 @@ from mix.driver.smartgiant.common.ipcore.mix_xadc_sg_emulator import MIXXADCSGEm
 
 from mix.driver.smartgiant.common.module.mix_board import MIXBoard
 from mix.driver.smartgiant.common.module.mix_board import BoardArgCheckError
+from mix.driver.smartgiant.common.utility.sample_codec import SampleCodec
 from mix.driver.core.ipcore.iioxadc import _IIOXADC
 
 
@@ -337,6 +338,9 @@ class BladeDef:
     ADC_OPTIONS = ['AVG', 'RMS']
     ADC_5V_CALC_RATIO = (1000 * 5)
     ADC_10V_CALC_RATIO = (1000 * 10)
+    # upload data of AD7608, 32bit each data: bit[0-2] channel number, bit[14-31] 18bit adc code.
+    UPLOAD_CODEC = SampleCodec(4, 14, 18, True, 0, 3)
+    UPLOAD_FULL_SCALE = 1 << 17
 
     # MIXXADCSG sample rate
     XADC_SAMPLING_RATE = 1000000
@@ -1019,7 +1023,7 @@ class BladeBase(MIXBoard):
 
         It's not necessary enable upload when doing measurement.
         Note that data transfered into DMA is 32bit each data,
-        formate: bit[0-17] adc_value; bit[29-31] channel number; bit[18-28] unused.
+        formate: bit[0-2] channel number; bit[14-31] adc_value; decode it with adc_upload_decode().
 
         Args:
             adc_range:       string, ['10V','5V'], measure range.
@@ -1039,6 +1043,34 @@ class BladeBase(MIXBoard):
         self.adc.enable_continuous_sampling(BladeDef.ADC_OVER_SAMPLING, adc_range, sampling_rate)
         return 'done'
 
+    def adc_upload_decode(self, adc_range, data, length=None):
+        '''
+        Blade decode adc upload data read from DMA to voltage of every channel.
+
+        All data are decoded in one pass, values are numpy arrays if numpy is available else lists.
+
+        Args:
+            adc_range:   string, ['10V','5V'], range used when upload was enabled.
+            data:        ctypes array/bytearray/memoryview/list, dma data, list items are byte.
+            length:      int/None, default None, unit byte, valid data length, whole data if None.
+
+        Returns:
+            dict, {'ch0': values, ...}, voltage in mV of every channel found in the data.
+
+        Examples:
+            result, data, data_num, overflow = dma.read_channel_all_data(0)
+            volts = blade.adc_upload_decode('10V', data, data_num)
+            print(volts['ch0'])
+
+        '''
+        adc_range = self._check_adc_range(adc_range)
+        if adc_range == '5V':
+            ratio = BladeDef.ADC_5V_CALC_RATIO
+        else:
+            ratio = BladeDef.ADC_10V_CALC_RATIO
+        codec = BladeDef.UPLOAD_CODEC.scaled(float(ratio) / BladeDef.UPLOAD_FULL_SCALE)
+        return dict(('ch%d' % channel, values) for channel, values in codec.decode_channels(data, length).items())
+
     def adc_measure_upload_disable(self):
         '''
         Blade upoad mode close. Close data upload doesn't influence to measure.
@@ -1265,21 +1297,32 @@ class Blade(BladeBase):
             blade.adc_measure_upload_enable('10V', 2000)
             time.sleep(1)
             result, data, data_num, overflow = dma.read_channel_all_data(dma_channel)
+            if result == 0:
+                # decode before read_done, data maps the dma memory
+                volts = blade.adc_upload_decode('10V', data, data_num)
+                for channel, value in volts.items():
+                    print("channel:%s, count:%d, first:%f mV" % (channel, len(value), value[0]))
+            else:
+                print('error_code: %d' % (result))
             dma.read_done(dma_channel, data_num)
             dma.disable_channel(dma_channel)
             blade.adc_measure_upload_disable()
 
-            if result == 0:
-                _len = 0
-                    while data_num >= _len + 3:
-                    code = data[_len + 0] | data[_len + 1] << 8 |
-                            data[_len+2] << 16 | data[_len + 3] << 24
-                    channel = code & 0x7
-                    value = float((code>>14) & 0x3FFFF) / pow(2,17) * 10
-                    print("chanel:%d, data:%f " % (channel, value))
-                    _len = _len + 4
-            else:
-                print('error_code: %d' % (result))
+        Example for continuous data upload:
+            dma = DMA("/dev/MIX_DMA_0")
+            dma_channel = 0
+            dma.config_channel(dma_channel, 0x1000000)
+            dma.enable_channel(dma_channel)
+            dma.reset_channel(dma_channel)
+            blade.adc_measure_upload_enable('10V', 2000)
+            # read_done, wrap around and overflow are handled by the stream
+            with DMAStream(dma, dma_channel) as stream:
+                for chunk in stream:
+                    volts = blade.adc_upload_decode('10V', chunk)
+                    if stream.get_statistics()['bytes'] >= 0x1000000:
+                        break
+            dma.disable_channel(dma_channel)
+            blade.adc_measure_upload_disable()
 
     '''
     # launcher will use this to match driver compatible string and load driver if matched.
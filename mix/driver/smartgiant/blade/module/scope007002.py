@@ -137,21 +137,16 @@ class SCOPE007002(BladeBase):
             blade.adc_measure_upload_enable('10V', 2000)
             time.sleep(1)
             result, data, data_num, overflow = dma.read_channel_all_data(dma_channel)
-            dma.read_done(dma_channel, data_num)
-            dma.disable_channel(dma_channel)
-            blade.adc_measure_upload_disable()
-
             if result == 0:
-                _len = 0
-                    while data_num >= _len + 3:
-                    code = data[_len + 0] | data[_len + 1] << 8 |
-                            data[_len+2] << 16 | data[_len + 3] << 24
-                    channel = code & 0x7
-                    value = float((code>>14) & 0x3FFFF) / pow(2,17) * 10
-                    print("chanel:%d, data:%f " % (channel, value))
-                    _len = _len + 4
+                # decode before read_done, data maps the dma memory
+                volts = blade.adc_upload_decode('10V', data, data_num)
+                for channel, value in volts.items():
+                    print("channel:%s, count:%d, first:%f mV" % (channel, len(value), value[0]))
             else:
                 print('error_code: %d' % (result))
+            dma.read_done(dma_channel, data_num)
+            dma.disable_channel(dma_channel)
+            blade.adc_measure_upload_disable()
 
     '''
     # launcher will use this to match driver compatible string and load driver if matched.
@@ -40,6 +40,9 @@ class PCA9536(IOExpanderBase):
         pca9536 = PCA9536(0x41, i2c)
 
     '''
+    _pin_count = 4
+    _output_register = PCA9536Def.OUTPUT_PORT_REGISTER
+    _dir_register = PCA9536Def.CONFIGURATION_REGISTER
 
     def __init__(self, dev_addr, i2c_bus=None):
         # 7-bit address, excluding read/write bits, lower two bits are variable
@@ -88,8 +91,8 @@ class PCA9536(IOExpanderBase):
         assert register_address >= 0
         assert isinstance(write_data, list)
 
-        write_data = [register_address] + write_data
-        self.i2c_bus.write(self.dev_addr, write_data)
+        with self._register_write(register_address, len(write_data)):
+            self.i2c_bus.write(self.dev_addr, [register_address] + write_data)
 
     def set_pin_dir(self, pin_id, dir):
         '''
@@ -106,12 +109,8 @@ class PCA9536(IOExpanderBase):
         assert pin_id >= PCA9536Def.PIN_MIN_NUM and pin_id <= PCA9536Def.PIN_MAX_NUM
         assert dir in [PCA9536Def.PIN_DIR_INPUT, PCA9536Def.PIN_DIR_OUTPUT]
 
-        rd_data = self.get_pins_dir()
-        dir_config = rd_data[0]
-        dir_config &= ~(1 << pin_id)
-        if dir == PCA9536Def.PIN_DIR_INPUT:
-            dir_config |= (1 << pin_id)
-        self.set_pins_dir([dir_config & 0xFF])
+        is_input = 1 if dir == PCA9536Def.PIN_DIR_INPUT else 0
+        self._update_ports(PCA9536Def.CONFIGURATION_REGISTER, 1 << pin_id, is_input << pin_id)
 
     def get_pin_dir(self, pin_id):
         '''
@@ -149,12 +148,7 @@ class PCA9536(IOExpanderBase):
         '''
         assert pin_id >= PCA9536Def.PIN_MIN_NUM and pin_id <= PCA9536Def.PIN_MAX_NUM
 
-        rd_data = self.get_ports_state()
-        port_config = rd_data[0]
-        port_config &= ~(1 << pin_id)
-        if level == 1:
-            port_config |= (1 << pin_id)
-        self.set_ports([port_config & 0xFF])
+        self.set_pins({pin_id: level})
 
     def get_pin(self, pin_id):
         '''
@@ -255,7 +249,7 @@ class PCA9536(IOExpanderBase):
             pca9536.set_pins_dir([0x12])
         '''
         assert len(ports_pins_mask) == 1
-        self.write_register(PCA9536Def.CONFIGURATION_REGISTER, ports_pins_mask)
+        self._write_ports(PCA9536Def.CONFIGURATION_REGISTER, ports_pins_mask)
 
     def get_pins_dir(self):
         '''
@@ -283,18 +277,27 @@ class PCA9536(IOExpanderBase):
         '''
         return self.read_register(PCA9536Def.INPUT_PORT_REGISTER, 1)
 
-    def set_ports(self, ports_level_mask):
+    def set_ports(self, ports_level_mask, value=None):
         '''
-        Set the value of input port register.
+        Set the value of output port register.
 
         Args:
-            ports_level_mask:   list, Element takes one byte. eg:[0x12].
+            ports_level_mask:   list/int, Element takes one byte, eg:[0x12],
+                                          or mask of the pins to set when value is given,
+                                          bit n is pin n, eg:0x03.
+            value:              int/None, default None, level of the pins in mask,
+                                          the port register is written only if it changes.
 
         Examples:
             pca9536.set_ports([0x12])
+            pca9536.set_ports(0x03, 0x01)
+
         '''
+        if value is not None:
+            self._update_ports(PCA9536Def.OUTPUT_PORT_REGISTER, ports_level_mask, value)
+            return
         assert len(ports_level_mask) == 1
-        self.write_register(PCA9536Def.OUTPUT_PORT_REGISTER, ports_level_mask)
+        self._write_ports(PCA9536Def.OUTPUT_PORT_REGISTER, ports_level_mask)
 
     def get_ports_state(self):
         '''
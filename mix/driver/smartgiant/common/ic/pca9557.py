@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-from threading import Lock
 from mix.driver.core.ic.io_expander_base import IOExpanderBase
 
 
@@ -32,12 +31,14 @@ class PCA9557(IOExpanderBase):
         pca9557 = PCA9557(0x3c, '/dev/MIX_I2C_0')
 
     '''
+    _output_register = PCA9557Def.OUTPUT_PORT_REGISTERS
+    _dir_register = PCA9557Def.DIR_CONFIGURATION_REGISTERS
+
     def __init__(self, dev_addr, i2c_bus=None, lock=None):
         assert (dev_addr & (~0x07)) == 0x18
 
         self.i2c_bus = i2c_bus
         self.lock = lock
-        self.lock_set_pin = Lock()
         self.dev_addr = dev_addr
         super(PCA9557, self).__init__()
 
@@ -80,11 +81,12 @@ class PCA9557(IOExpanderBase):
         wr_data = []
         wr_data.append(reg_addr)
         wr_data.extend(write_data)
-        if self.lock is not None:
-            self.lock.acquire()
-        self.i2c_bus.write(self.dev_addr, wr_data)
-        if self.lock is not None:
-            self.lock.release()
+        with self._register_write(reg_addr, len(write_data)):
+            if self.lock is not None:
+                self.lock.acquire()
+            self.i2c_bus.write(self.dev_addr, wr_data)
+            if self.lock is not None:
+                self.lock.release()
 
     def set_pin_dir(self, pin_id, dir):
         '''
@@ -101,12 +103,8 @@ class PCA9557(IOExpanderBase):
         assert pin_id >= 0 and pin_id <= 7
         assert dir in [PCA9557Def.PIN_DIR_INPUT, PCA9557Def.PIN_DIR_OUTPUT]
 
-        rd_data = self.get_pins_dir()
-        dir_config = rd_data[0]
-        dir_config &= ~(1 << pin_id)
-        if dir == PCA9557Def.PIN_DIR_INPUT:
-            dir_config |= (1 << pin_id)
-        self.set_pins_dir([dir_config & 0xFF])
+        is_input = 1 if dir == PCA9557Def.PIN_DIR_INPUT else 0
+        self._update_ports(PCA9557Def.DIR_CONFIGURATION_REGISTERS, 1 << pin_id, is_input << pin_id)
 
     def get_pin_dir(self, pin_id):
         '''
@@ -146,13 +144,7 @@ class PCA9557(IOExpanderBase):
         '''
         assert pin_id >= 0 and pin_id <= 7
 
-        with self.lock_set_pin:
-            rd_data = self.get_ports_state()
-            port_config = rd_data[0]
-            port_config &= ~(1 << pin_id)
-            if level == 1:
-                port_config |= (1 << pin_id)
-            self.set_ports([port_config & 0xFF])
+        self.set_pins({pin_id: level})
 
     def get_pin(self, pin_id):
         '''
@@ -258,7 +250,7 @@ class PCA9557(IOExpanderBase):
 
         '''
         assert len(pins_dir_mask) == 1
-        self.write_register(PCA9557Def.DIR_CONFIGURATION_REGISTERS, pins_dir_mask)
+        self._write_ports(PCA9557Def.DIR_CONFIGURATION_REGISTERS, pins_dir_mask)
 
     def get_pins_dir(self):
         '''
@@ -288,19 +280,27 @@ class PCA9557(IOExpanderBase):
         '''
         return self.read_register(PCA9557Def.INTPUT_PORT_REGISTERS, 1)
 
-    def set_ports(self, ports_level_mask):
+    def set_ports(self, ports_level_mask, value=None):
         '''
-        Set the value of input port register.
+        Set the value of output port register.
 
         Args:
-            ports_level_mask:   list, Element takes one byte, eg:[0x12].
+            ports_level_mask:   list/int, Element takes one byte, eg:[0x12],
+                                          or mask of the pins to set when value is given,
+                                          bit n is pin n, eg:0x03.
+            value:              int/None, default None, level of the pins in mask,
+                                          the port register is written only if it changes.
 
         Examples:
             pca9557.set_ports([0x12])
+            pca9557.set_ports(0x03, 0x01)
 
         '''
+        if value is not None:
+            self._update_ports(PCA9557Def.OUTPUT_PORT_REGISTERS, ports_level_mask, value)
+            return
         assert len(ports_level_mask) == 1
-        self.write_register(PCA9557Def.OUTPUT_PORT_REGISTERS, ports_level_mask)
+        self._write_ports(PCA9557Def.OUTPUT_PORT_REGISTERS, ports_level_mask)
 
     def get_ports_state(self):
         '''
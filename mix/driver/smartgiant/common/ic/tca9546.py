@@ -52,6 +52,7 @@ class TCA9546(I2CMUXBase):
             data |= channel[index][1] << channel[index][0]
         write_data = []
         write_data.append(data)
+        self._invalidate_channel_selection()
         self._i2c_bus.write(self._dev_addr, write_data)
 
     def get_channel_state(self, channel):
@@ -86,6 +87,7 @@ class TCA9546(I2CMUXBase):
 
         '''
         write_data = [0x0f]
+        self._invalidate_channel_selection()
         self._i2c_bus.write(self._dev_addr, write_data)
 
     def close_all_channel(self):
@@ -97,4 +99,5 @@ class TCA9546(I2CMUXBase):
 
         '''
         write_data = [0x00]
+        self._invalidate_channel_selection()
         self._i2c_bus.write(self._dev_addr, write_data)
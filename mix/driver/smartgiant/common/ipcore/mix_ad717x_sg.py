@@ -1,6 +1,7 @@
 import time
 import functools
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.core.bus.axi4_wait import wait_for, AXI4WaitTimeoutException
 from mix.driver.smartgiant.common.bus.axi4_lite_bus_emulator import AXI4LiteBusEmulator
 from mix.driver.smartgiant.common.utility.data_operate import DataOperate
 
@@ -327,22 +328,25 @@ class MIXAd717xSG(object):
         wr_data = [com_data, 0x01]
 
         self.axi4_bus.write_8bit_inc(MIXAD717XSGDef.START_SPI_REGITSER, wr_data)
-        rd_data = [0x00]
-        last_time = time.time()
-
-        timeout_cnt = 0
-        while(rd_data[0] & 0x01 == 0x00) and \
-                (time.time() - last_time < AD717XDef.DEFAULT_TIMEOUT):
-            time.sleep(AD717XDef.DEFAULT_DELAY)
-            timeout_cnt = timeout_cnt + 1
-            rd_data = self.axi4_bus.read_8bit_inc(
-                MIXAD717XSGDef.BUSY_STAT_REGISTER, 1)
-        if time.time() - last_time >= AD717XDef.DEFAULT_TIMEOUT:
+        try:
+            self._wait_spi_ready()
+        except AXI4WaitTimeoutException:
             raise MIXAD717XSGException('MIXAD717XSG read register wait timeout')
         rd_data = self.axi4_bus.read_32bit_fix(
             MIXAD717XSGDef.READ_DATA_REGISTER, 1)
         return rd_data[0]
 
+    def _wait_spi_ready(self):
+        '''
+        Wait the spi state bit of busy state register to be ready.
+
+        Raises:
+            AXI4WaitTimeoutException:   not ready within AD717XDef.DEFAULT_TIMEOUT.
+
+        '''
+        wait_for(self.axi4_bus, MIXAD717XSGDef.BUSY_STAT_REGISTER, 0x01, 0x01,
+                 AD717XDef.DEFAULT_TIMEOUT, max_interval=AD717XDef.DEFAULT_DELAY)
+
     def write_register(self, reg_addr, reg_data, conti_mode=False):
         '''
         MIXAD717XSG write the register value
@@ -375,16 +379,9 @@ class MIXAd717xSG(object):
         if conti_mode is True:
             return True
 
-        rd_data = [0x00]
-
-        last_time = time.time()
-
-        while(rd_data[0] & 0x01 == 0x00) and (time.time() - last_time < AD717XDef.DEFAULT_TIMEOUT):
-            time.sleep(AD717XDef.DEFAULT_DELAY)
-            rd_data = self.axi4_bus.read_8bit_inc(
-                MIXAD717XSGDef.BUSY_STAT_REGISTER, 1)
-
-        if time.time() - last_time >= AD717XDef.DEFAULT_TIMEOUT:
+        try:
+            self._wait_spi_ready()
+        except AXI4WaitTimeoutException:
             raise MIXAD717XSGException('MIXAD717XSG write register wait timeout')
 
         return True
@@ -757,16 +754,9 @@ class MIXAd717xSG(object):
         wr_data = [0x44, 0x01]
         self.axi4_bus.write_8bit_inc(0x24, wr_data)
 
-        rd_data = [0x00]
-
-        last_time = time.time()
-
-        while(rd_data[0] & 0x01 == 0x00) and (time.time() - last_time < AD717XDef.DEFAULT_TIMEOUT):
-            time.sleep(AD717XDef.DEFAULT_DELAY)
-            rd_data = self.axi4_bus.read_8bit_inc(
-                MIXAD717XSGDef.BUSY_STAT_REGISTER, 1)
-
-        if time.time() - last_time >= AD717XDef.DEFAULT_TIMEOUT:
+        try:
+            self._wait_spi_ready()
+        except AXI4WaitTimeoutException:
             raise MIXAD717XSGException('MIXAD717XSG write register wait timeout')
 
     def _volt_2_channeldata(self, volt):
@@ -830,15 +820,11 @@ class MIXAd717xSG(object):
         self.axi4_bus.write_8bit_inc(MIXAD717XSGDef.DATA_READY_REGISTER, [0x00])
         self.axi4_bus.write_8bit_inc(MIXAD717XSGDef.DATA_READY_REGISTER, [0x01])
 
-        start_time = time.time()
-        while True:
-            rd_data = self.axi4_bus.read_8bit_inc(
-                MIXAD717XSGDef.DATA_READY_REGISTER, 1)
-            if rd_data[0] == 0x00:
-                break
-            if time.time() - start_time >= timeout:
-                raise MIXAD717XSGException('capture data time out')
-            time.sleep(0.001)
+        try:
+            wait_for(self.axi4_bus, MIXAD717XSGDef.DATA_READY_REGISTER, 0xFF, 0x00, timeout,
+                     max_interval=AD717XDef.DEFAULT_DELAY)
+        except AXI4WaitTimeoutException:
+            raise MIXAD717XSGException('capture data time out')
 
         get_data = self.axi4_bus.read_32bit_fix(
             MIXAD717XSGDef.DATA_CONTINUOS_REGISTER, count)
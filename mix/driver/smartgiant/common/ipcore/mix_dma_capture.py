@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import mmap
+import ctypes
+import struct
+import threading
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class DMACaptureDef:
+    MAGIC = 'MIXDMACP'
+    VERSION = 1
+    # data starts at HEADER_SIZE, page aligned
+    HEADER_SIZE = 4096
+    # magic, version, header size, sample rate, word size, value shift, value bits, signed,
+    # channel shift, channel bits, scale, offset, start time, last time, data length,
+    # file index, complete flag, overflow count of the file, overflow marker count
+    HEADER_FORMAT = '<8sHHI6B2xddddQIB3xII'
+    # data offset of the chunk which reported overflow, time
+    MARKER_FORMAT = '<Qd'
+    MAX_MARKERS = (HEADER_SIZE - struct.calcsize(HEADER_FORMAT)) // struct.calcsize(MARKER_FORMAT)
+
+    FILE_SIZE = 256 * 1024 * 1024
+    CHUNK_SIZE = 0x100000
+    READ_TIMEOUT_MS = 100
+    MAX_ERRORS = 10
+    ERROR_DELAY_S = 0.01
+
+    STATE_IDLE = 'idle'
+    STATE_RUNNING = 'running'
+    STATE_STOPPED = 'stopped'
+    STATE_ERROR = 'error'
+
+    # sample layout keys, same as SampleCodec arguments
+    LAYOUT_KEYS = ['word_size', 'value_shift', 'value_bits', 'signed', 'channel_shift', 'channel_bits',
+                   'scale', 'offset']
+    DEFAULT_LAYOUT = {'word_size': 4, 'value_shift': 0, 'value_bits': 32, 'signed': False,
+                      'channel_shift': 0, 'channel_bits': 0, 'scale': 1.0, 'offset': 0.0}
+
+
+class DMACaptureException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class DMACapture(object):
+    '''
+    Capture of one MIXDMASG channel straight into memory-mapped files.
+
+    A background thread reads the channel and copies every chunk from the dma
+    memory into a preallocated memory-mapped file with memmove, then releases
+    it with read_done. There is no python work per byte, so the record length
+    is only limited by the disk.
+
+    Every file starts with a DMACaptureDef.HEADER_SIZE bytes header: sample rate,
+    sample layout (see SampleCodec), start and last chunk time, data length and
+    the data offsets where the dma reported overflow. When a file is full the
+    capture continues in the next one, path_000.bin, path_001.bin, ...; with
+    max_files the oldest file is removed. A closed file is truncated to its data.
+
+    The channel must be configured and enabled before the capture is started.
+
+    Args:
+        dma:            instance(MIXDMASG)/instance(MIXDMASGEmulator), dma of the channel.
+        channel:        int, [0~15], dma channel id.
+        path:           string, capture file path prefix, like '/mix/capture/soak'.
+        sample_rate:    int, default 0, unit Hz, stored in header.
+        layout:         dict/None, default None, sample layout stored in header, keys are
+                        DMACaptureDef.LAYOUT_KEYS, missing keys use DMACaptureDef.DEFAULT_LAYOUT.
+        file_size:      int, default 256MB, unit byte, data size of one file.
+        max_files:      int, default 0, files to keep when rotating, 0 keeps all.
+        chunk_size:     int, default 0x100000, unit byte, max size of one dma read.
+
+    Examples:
+        capture = DMACapture(dma, 0, '/mix/capture/soak', 192000,
+                             {'value_shift': 12, 'value_bits': 20, 'signed': True})
+        capture.start()
+        time.sleep(3600)
+        capture.stop()
+        print(capture.get_progress())
+
+    '''
+
+    def __init__(self, dma, channel, path, sample_rate=0, layout=None,
+                 file_size=DMACaptureDef.FILE_SIZE, max_files=0, chunk_size=DMACaptureDef.CHUNK_SIZE):
+        assert channel < 16
+        assert file_size > 0 and chunk_size > 0
+        assert max_files >= 0
+        layout = dict(DMACaptureDef.DEFAULT_LAYOUT, **(layout or {}))
+        for key in layout:
+            if key not in DMACaptureDef.LAYOUT_KEYS:
+                raise DMACaptureException('unknown sample layout key %s' % key)
+
+        self._dma = dma
+        self._channel = channel
+        self._path = path
+        self._sample_rate = sample_rate
+        self._layout = layout
+        self._file_size = file_size
+        self._max_files = max_files
+        self._chunk_size = chunk_size
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._state = DMACaptureDef.STATE_IDLE
+        self._error = None
+        self._files = []
+        self._total_bytes = 0
+        self._overflow = 0
+        self._start_time = 0.0
+        self._stop_time = 0.0
+
+        self._file = None
+        self._file_index = -1
+        self._mm = None
+        self._mm_buf = None
+        self._data_len = 0
+        self._file_overflow = 0
+        self._markers = 0
+        self._file_start = 0.0
+        self._last_time = 0.0
+
+    def start(self):
+        '''
+        Start the capture thread, the first file is created right away.
+
+        Raises:
+            DMACaptureException:   capture is already running.
+
+        '''
+        with self._lock:
+            if self._running:
+                raise DMACaptureException('dma channel %d capture is already running' % self._channel)
+            self._files = []
+            self._file_index = -1
+            self._total_bytes = 0
+            self._overflow = 0
+            self._error = None
+            self._start_time = time.time()
+            self._stop_time = 0.0
+            self._open_file()
+            self._running = True
+            self._state = DMACaptureDef.STATE_RUNNING
+        self._thread = threading.Thread(target=self._capture_loop, name='dma_capture_%d' % self._channel)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop the capture and close the current file.
+
+        Returns:
+            dict, progress when stopped, see get_progress().
+
+        '''
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.get_progress()
+
+    def get_progress(self):
+        '''
+        Get the capture progress.
+
+        Returns:
+            dict, {'state': string, 'bytes': int, 'files': list, 'file_bytes': int, 'overflow': int,
+                   'elapsed_s': float, 'rate_bps': float, 'error': string/None},
+                  state is in ['idle', 'running', 'stopped', 'error'], files are the paths kept on disk,
+                  file_bytes is the data length of the current file, overflow is the count of the capture.
+
+        '''
+        with self._lock:
+            if self._state == DMACaptureDef.STATE_RUNNING:
+                elapsed = time.time() - self._start_time
+            else:
+                elapsed = self._stop_time - self._start_time
+            return {'state': self._state, 'bytes': self._total_bytes, 'files': list(self._files),
+                    'file_bytes': self._data_len, 'overflow': self._overflow,
+                    'elapsed_s': max(elapsed, 0.0),
+                    'rate_bps': self._total_bytes / elapsed if elapsed > 0 else 0.0,
+                    'error': self._error}
+
+    def _file_path(self, index):
+        return '%s_%03d.bin' % (self._path, index)
+
+    def _open_file(self):
+        index = self._file_index + 1
+        path = self._file_path(index)
+        size = DMACaptureDef.HEADER_SIZE + self._file_size
+        self._file = open(path, 'w+b')
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._mm_buf = (ctypes.c_char * size).from_buffer(self._mm)
+        self._data_len = 0
+        self._file_overflow = 0
+        self._markers = 0
+        self._file_start = time.time()
+        self._last_time = self._file_start
+        self._file_index = index
+        self._files.append(path)
+        self._write_header(False)
+
+        if self._max_files and len(self._files) > self._max_files:
+            os.remove(self._files.pop(0))
+
+    def _close_file(self):
+        if self._mm is None:
+            return
+        self._write_header(True)
+        self._mm_buf = None
+        self._mm.flush()
+        self._mm.close()
+        self._mm = None
+        self._file.truncate(DMACaptureDef.HEADER_SIZE + self._data_len)
+        self._file.close()
+        self._file = None
+
+    def _write_header(self, complete):
+        layout = self._layout
+        struct.pack_into(DMACaptureDef.HEADER_FORMAT, self._mm, 0,
+                         DMACaptureDef.MAGIC, DMACaptureDef.VERSION, DMACaptureDef.HEADER_SIZE,
+                         self._sample_rate, layout['word_size'], layout['value_shift'], layout['value_bits'],
+                         int(bool(layout['signed'])), layout['channel_shift'], layout['channel_bits'],
+                         layout['scale'], layout['offset'], self._file_start, self._last_time,
+                         self._data_len, self._file_index, int(complete), self._file_overflow, self._markers)
+
+    def _mark_overflow(self, offset, now):
+        self._overflow += 1
+        self._file_overflow += 1
+        if self._markers < DMACaptureDef.MAX_MARKERS:
+            struct.pack_into(DMACaptureDef.MARKER_FORMAT, self._mm,
+                             struct.calcsize(DMACaptureDef.HEADER_FORMAT) +
+                             self._markers * struct.calcsize(DMACaptureDef.MARKER_FORMAT), offset, now)
+            self._markers += 1
+
+    def _capture_loop(self):
+        errors = 0
+        try:
+            while self._running:
+                length = min(self._chunk_size, self._file_size - self._data_len)
+                start = time.time()
+                result, data, data_num, overflow = self._dma.read_channel_data(self._channel, length,
+                                                                               DMACaptureDef.READ_TIMEOUT_MS)
+                now = time.time()
+                if data_num > 0:
+                    offset = DMACaptureDef.HEADER_SIZE + self._data_len
+                    if isinstance(data, ctypes.Array):
+                        ctypes.memmove(ctypes.addressof(self._mm_buf) + offset, data, data_num)
+                    else:
+                        self._mm[offset:offset + data_num] = str(bytearray(data[:data_num]))
+                    self._dma.read_done(self._channel, data_num)
+
+                if result != 0 and data_num == 0 and (now - start) * 1000 < DMACaptureDef.READ_TIMEOUT_MS:
+                    # failed before its timeout, an idle channel just times out
+                    errors += 1
+                    if errors >= DMACaptureDef.MAX_ERRORS:
+                        raise DMACaptureException('dma channel %d read failed, result %s' %
+                                                  (self._channel, result))
+                    time.sleep(DMACaptureDef.ERROR_DELAY_S)
+                    continue
+                errors = 0
+
+                with self._lock:
+                    if overflow:
+                        self._mark_overflow(self._data_len, now)
+                    if data_num > 0:
+                        self._data_len += data_num
+                        self._total_bytes += data_num
+                        self._last_time = now
+                        self._write_header(False)
+                    if self._data_len >= self._file_size:
+                        self._close_file()
+                        self._open_file()
+            state = DMACaptureDef.STATE_STOPPED
+        except Exception as e:
+            self._error = str(e)
+            state = DMACaptureDef.STATE_ERROR
+        finally:
+            with self._lock:
+                self._running = False
+                self._close_file()
+                self._stop_time = time.time()
+                self._state = state
+
+
+def read_capture_header(path):
+    '''
+    Read the header of a capture file.
+
+    Args:
+        path:   string, capture file path.
+
+    Returns:
+        dict, header fields, 'layout' is the SampleCodec arguments, 'overflow' is the overflow
+              count of this file and 'overflow_markers' is a list of (data offset, time).
+
+    Examples:
+        header = read_capture_header('/mix/capture/soak_000.bin')
+        codec = SampleCodec(**header['layout'])
+
+    '''
+    with open(path, 'rb') as f:
+        data = f.read(DMACaptureDef.HEADER_SIZE)
+    fields = struct.unpack_from(DMACaptureDef.HEADER_FORMAT, data)
+    if fields[0] != DMACaptureDef.MAGIC:
+        raise DMACaptureException('%s is not a dma capture file' % path)
+    header = dict(zip(['magic', 'version', 'header_size', 'sample_rate'], fields[:4]))
+    layout = dict(zip(DMACaptureDef.LAYOUT_KEYS, fields[4:12]))
+    layout['signed'] = bool(layout['signed'])
+    header['layout'] = layout
+    header.update(zip(['start_time', 'last_time', 'data_len', 'file_index', 'complete', 'overflow'],
+                      fields[12:18]))
+    header['complete'] = bool(header['complete'])
+    markers = []
+    offset = struct.calcsize(DMACaptureDef.HEADER_FORMAT)
+    for i in range(fields[18]):
+        markers.append(struct.unpack_from(DMACaptureDef.MARKER_FORMAT, data,
+                                          offset + i * struct.calcsize(DMACaptureDef.MARKER_FORMAT)))
+    header['overflow_markers'] = markers
+    return header
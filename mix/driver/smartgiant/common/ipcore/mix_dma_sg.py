@@ -2,7 +2,9 @@
 import os
 import ctypes
 import time
-from ctypes import string_at
+import threading
+from mix.driver.core.bus.native_lib import NativeLibDef, load_library
+from mix.driver.smartgiant.common.ipcore.mix_dma_capture import DMACapture, DMACaptureDef, DMACaptureException
 
 __author__ = 'qinxiaojun@SmartGiant'
 __version__ = '0.1'
@@ -10,11 +12,9 @@ __version__ = '0.1'
 
 class MIXDMASGError(Exception):
     def __init__(self, dev_name, err_code):
-        reason = (128 * ctypes.c_char)()
-        base_lib = ctypes.cdll.LoadLibrary('libmix-dma-sg-driver.so')
-        reason = base_lib.sg_axis_get_err_reason(err_code)
+        reason = load_library(NativeLibDef.DMA_DRIVER_LIB).sg_axis_get_err_reason(err_code)
         self._err_reason = '[%s]: %s.' % \
-            (dev_name, string_at(reason, -1).decode("utf-8"))
+            (dev_name, (reason or '').decode("utf-8"))
 
     def __str__(self):
         return self._err_reason
@@ -68,7 +68,8 @@ class _MIXDMASG(object):
     '''
 
     rpc_public_api = ['config_channel', 'enable_channel', 'disable_channel', 'reset_channel',
-                      'read_channel_data', 'read_channel_all_data', 'read_done']
+                      'read_channel_data', 'read_channel_all_data', 'read_done',
+                      'start_capture', 'stop_capture', 'get_capture_progress']
 
     KERNEL_MODULE = os.path.join(os.path.dirname(__file__), 'axi4stream.ko')
 
@@ -76,13 +77,15 @@ class _MIXDMASG(object):
         self._dev_name = dev_name
         self.dma_size_byte = dma_size_mb * 1024 * 1024
         self.reload_dma_kernel_driver()
-        self.base_lib = ctypes.cdll.LoadLibrary('libmix-dma-sg-driver.so')
-        self.base_lib.sg_axis_init.restype = ctypes.c_void_p
+        self.base_lib = load_library(NativeLibDef.DMA_DRIVER_LIB)
+        # output parameters of the read functions, one set per thread
+        self._out = threading.local()
         dma_dev = self.base_lib.sg_axis_init(self._dev_name)
         if not dma_dev:
             return None
         self._dma_dev = dma_dev
         self._mem_offset = 0
+        self._captures = {}
 
     def __del__(self):
         self.base_lib.sg_axis_exit(self._dma_dev)
@@ -113,6 +116,25 @@ class _MIXDMASG(object):
         self.unload_dma_kernel_driver()
         self.load_dma_kernel_driver()
 
+    def _out_params(self):
+        out = self._out
+        if not hasattr(out, 'buf'):
+            out.buf = ctypes.c_void_p()
+            out.actual_len = ctypes.c_uint()
+            out.overflow = ctypes.c_uint()
+        out.buf.value = None
+        out.actual_len.value = 0
+        out.overflow.value = 0
+        return out
+
+    def _channel_data(self, out, length):
+        '''
+        Map the dma memory returned by the library, no data is copied.
+        '''
+        if not out.buf.value:
+            return None
+        return (ctypes.c_ubyte * length).from_address(out.buf.value)
+
     def config_channel(self, id, size):
         '''
         Config dma channel
@@ -211,16 +233,14 @@ class _MIXDMASG(object):
 
         '''
         assert id < 16
-        buf = ctypes.POINTER(ctypes.c_ubyte * length)()
-        actual_len = ctypes.c_uint(0)
-        overflow = ctypes.c_uint(0)
+        out = self._out_params()
         result = self.base_lib.sg_axis_read_data(self._dma_dev, id, length,
-                                                 ctypes.byref(buf),
-                                                 ctypes.byref(actual_len),
-                                                 ctypes.byref(overflow),
+                                                 ctypes.byref(out.buf),
+                                                 ctypes.byref(out.actual_len),
+                                                 ctypes.byref(out.overflow),
                                                  timeout)
 
-        return result, buf.contents, actual_len.value, overflow.value
+        return result, self._channel_data(out, length), out.actual_len.value, out.overflow.value
 
     def read_channel_all_data(self, id):
         '''
@@ -245,15 +265,13 @@ class _MIXDMASG(object):
         '''
         assert id < 16
         max_len = 0x20000000
-        buf = ctypes.POINTER(ctypes.c_ubyte * max_len)()
-        actual_len = ctypes.c_uint(0)
-        overflow = ctypes.c_uint(0)
+        out = self._out_params()
         result = self.base_lib.sg_axis_read_all_data(self._dma_dev, id,
-                                                     ctypes.byref(buf),
-                                                     ctypes.byref(actual_len),
-                                                     ctypes.byref(overflow))
+                                                     ctypes.byref(out.buf),
+                                                     ctypes.byref(out.actual_len),
+                                                     ctypes.byref(out.overflow))
 
-        return result, buf.contents, actual_len.value, overflow.value
+        return result, self._channel_data(out, max_len), out.actual_len.value, out.overflow.value
 
     def read_done(self, id, length):
         '''
@@ -275,3 +293,72 @@ class _MIXDMASG(object):
         '''
         assert id < 16
         self.base_lib.sg_axis_read_done(self._dma_dev, id, length)
+
+    def start_capture(self, id, path, sample_rate=0, layout=None,
+                      file_size=DMACaptureDef.FILE_SIZE, max_files=0):
+        '''
+        Start capturing dma channel data into memory-mapped files in background
+
+        The channel must be configured and enabled, see DMACapture for the file format.
+
+        Args:
+            id:             int, [0~15], Id of the channel to be captured.
+            path:           string, capture file path prefix, files are path_000.bin, path_001.bin, ...
+            sample_rate:    int, default 0, unit Hz, stored in file header.
+            layout:         dict/None, default None, sample layout stored in file header,
+                            like {'value_shift': 12, 'value_bits': 20, 'signed': True}.
+            file_size:      int, default 256MB, unit byte, data size of one file before rotating.
+            max_files:      int, default 0, files to keep when rotating, 0 keeps all.
+
+        Returns:
+            string, "done", api execution successful.
+
+        Examples:
+            dma = MIXDMASG("/dev/MIX_MIXDMASG_0")
+            dma.config_channel(0, 0x1000000)
+            dma.enable_channel(0)
+            dma.start_capture(0, '/mix/capture/soak', 192000)
+            print dma.get_capture_progress(0)
+            dma.stop_capture(0)
+
+        '''
+        assert id < 16
+        capture = self._captures.get(id)
+        if capture is not None and capture.get_progress()['state'] == DMACaptureDef.STATE_RUNNING:
+            raise DMACaptureException('[%s]: channel %d capture is already running.' % (self._dev_name, id))
+        capture = DMACapture(self, id, path, sample_rate, layout, file_size, max_files)
+        capture.start()
+        self._captures[id] = capture
+        return 'done'
+
+    def stop_capture(self, id):
+        '''
+        Stop capturing dma channel data
+
+        Args:
+            id:         int, [0~15], Id of the captured channel.
+
+        Returns:
+            dict, capture progress when stopped, see get_capture_progress().
+
+        '''
+        assert id < 16
+        assert id in self._captures
+        return self._captures[id].stop()
+
+    def get_capture_progress(self, id):
+        '''
+        Get dma channel capture progress
+
+        Args:
+            id:         int, [0~15], Id of the captured channel.
+
+        Returns:
+            dict, {'state': string, 'bytes': int, 'files': list, 'file_bytes': int, 'overflow': int,
+                   'elapsed_s': float, 'rate_bps': float, 'error': string/None},
+                  state is in ['idle', 'running', 'stopped', 'error'].
+
+        '''
+        assert id < 16
+        assert id in self._captures
+        return self._captures[id].get_progress()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import time
+import ctypes
+import threading
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class DMAStreamDef:
+    CHUNK_SIZE = 0x10000        # bytes
+    RING_CHUNKS = 64
+    READ_TIMEOUT_MS = 100
+    # the chunk reached the end of the channel memory, the rest follows from the start.
+    DATA_UNFINISHED = (-6, 'Data unfinished')
+    # consecutive read errors before the reader gives up
+    MAX_ERRORS = 10
+    ERROR_DELAY_S = 0.01
+
+
+class DMAStreamException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class DMAStream(object):
+    '''
+    Continuous reader of one MIXDMASG channel with ring buffer semantics.
+
+    A background thread reads the channel in chunks, copies every chunk into
+    a bounded in-memory ring and calls read_done right away, so the dma memory
+    is released as soon as possible and long acquisitions run without gaps.
+    Chunks are handed out in order as memoryview. A chunk stays valid until
+    the next chunk is requested, after that its ring slot is reused.
+
+    When the ring is full the reader waits for the consumer, data then stays in
+    the dma memory and a dma overflow is reported if it fills up too.
+
+    The channel must be configured and enabled before the stream is started.
+
+    Args:
+        dma:            instance(MIXDMASG)/instance(MIXDMASGEmulator), dma of the channel.
+        channel:        int, [0~15], dma channel id.
+        chunk_size:     int, default 0x10000, unit byte, max size of one chunk.
+        ring_chunks:    int, default 64, ring capacity in chunks.
+        timeout_ms:     int, default 100, unit ms, timeout of one dma read.
+
+    Examples:
+        dma = MIXDMASG('/dev/MIX_DMA_0')
+        dma.config_channel(0, 0x1000000)
+        dma.enable_channel(0)
+        with DMAStream(dma, 0) as stream:
+            for chunk in stream:
+                data_file.write(chunk)
+                if stream.get_statistics()['bytes'] >= 0x4000000:
+                    break
+        print(stream.get_statistics())
+
+    '''
+
+    def __init__(self, dma, channel, chunk_size=DMAStreamDef.CHUNK_SIZE,
+                 ring_chunks=DMAStreamDef.RING_CHUNKS, timeout_ms=DMAStreamDef.READ_TIMEOUT_MS):
+        assert channel < 16
+        assert chunk_size > 0
+        assert ring_chunks > 1
+        self._dma = dma
+        self._channel = channel
+        self._chunk_size = chunk_size
+        self._timeout_ms = timeout_ms
+
+        self._ring = [bytearray(chunk_size) for i in range(ring_chunks)]
+        # ctypes views of the slots, dma data is copied with memmove
+        self._ring_buf = [(ctypes.c_char * chunk_size).from_buffer(slot) for slot in self._ring]
+        self._lengths = [0] * ring_chunks
+        self._head = 0      # next slot written by the reader
+        self._tail = 0      # next slot handed out
+        self._count = 0     # slots filled, including the one held by the consumer
+        self._held = False
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._error = None
+        self._statistics = {}
+        self.reset_statistics()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        chunk = self.read()
+        if chunk is None:
+            raise StopIteration
+        return chunk
+
+    __next__ = next
+
+    def reset_statistics(self):
+        '''
+        Clear the stream statistics, backlog is kept.
+        '''
+        with self._cond:
+            self._statistics = {'chunks': 0, 'bytes': 0, 'overflow': 0, 'unfinished': 0,
+                                'errors': 0, 'max_backlog': 0, 'full_wait_s': 0.0}
+
+    def get_statistics(self):
+        '''
+        Get the stream statistics.
+
+        Returns:
+            dict, {'chunks': int, 'bytes': int, 'overflow': int, 'unfinished': int, 'errors': int,
+                   'backlog': int, 'max_backlog': int, 'full_wait_s': float},
+                  overflow counts reads which reported dma overflow, backlog is the chunks
+                  waiting in the ring, full_wait_s is the time the reader waited for ring space.
+
+        '''
+        with self._cond:
+            statistics = dict(self._statistics)
+            statistics['backlog'] = self._backlog()
+        return statistics
+
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        '''
+        Start the background reader.
+        '''
+        with self._cond:
+            if self._running:
+                return
+            self._head = self._tail = self._count = 0
+            self._held = False
+            self._error = None
+            self._running = True
+        self._thread = threading.Thread(target=self._read_loop,
+                                        name='dma_stream_%d' % self._channel)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop the background reader, chunks already in the ring can still be read.
+        '''
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def read(self, timeout=None):
+        '''
+        Get the next chunk in order, the previous chunk becomes invalid.
+
+        Args:
+            timeout:    float/None, unit second, default None, wait forever.
+
+        Returns:
+            memoryview/None, chunk data, None if timeout or the stream is stopped and drained.
+
+        Raises:
+            DMAStreamException:   the reader stopped on dma read errors.
+
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._release()
+            while self._backlog() == 0:
+                if self._error is not None:
+                    raise DMAStreamException(self._error)
+                if not self._running:
+                    return None
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            slot = self._tail
+            self._tail = (self._tail + 1) % len(self._ring)
+            self._held = True
+            return memoryview(self._ring[slot])[:self._lengths[slot]]
+
+    def _backlog(self):
+        return self._count - 1 if self._held else self._count
+
+    def _release(self):
+        if self._held:
+            self._held = False
+            self._count -= 1
+            self._cond.notify_all()
+
+    def _read_loop(self):
+        errors = 0
+        while self._running:
+            with self._cond:
+                if self._count == len(self._ring):
+                    start = time.time()
+                    while self._count == len(self._ring) and self._running:
+                        self._cond.wait()
+                    self._statistics['full_wait_s'] += time.time() - start
+                    continue
+                slot = self._head
+
+            start = time.time()
+            try:
+                result, data, data_num, overflow = self._dma.read_channel_data(self._channel, self._chunk_size,
+                                                                               self._timeout_ms)
+                elapsed_ms = (time.time() - start) * 1000
+                if data_num > 0:
+                    self._copy(slot, data, data_num)
+                    self._dma.read_done(self._channel, data_num)
+            except Exception as e:
+                # read() raises the error once the chunks already in the ring are taken
+                with self._cond:
+                    self._statistics['errors'] += 1
+                    self._error = 'dma channel %d read failed, %s.' % (self._channel, str(e))
+                    self._running = False
+                    self._cond.notify_all()
+                break
+
+            with self._cond:
+                if result != 0 and data_num == 0 and elapsed_ms < self._timeout_ms:
+                    # failed before its timeout, an idle channel just times out
+                    self._statistics['errors'] += 1
+                    errors += 1
+                    if errors >= DMAStreamDef.MAX_ERRORS:
+                        self._error = 'dma channel %d read failed, result %s.' % (self._channel, result)
+                        self._running = False
+                        self._cond.notify_all()
+                        break
+                else:
+                    errors = 0
+                if overflow:
+                    self._statistics['overflow'] += 1
+                if result in DMAStreamDef.DATA_UNFINISHED:
+                    self._statistics['unfinished'] += 1
+                if data_num > 0:
+                    self._lengths[slot] = data_num
+                    self._head = (slot + 1) % len(self._ring)
+                    self._count += 1
+                    self._statistics['chunks'] += 1
+                    self._statistics['bytes'] += data_num
+                    backlog = self._backlog()
+                    if backlog > self._statistics['max_backlog']:
+                        self._statistics['max_backlog'] = backlog
+                    self._cond.notify_all()
+            if errors:
+                time.sleep(DMAStreamDef.ERROR_DELAY_S)
+
+    def _copy(self, slot, data, data_num):
+        if isinstance(data, ctypes.Array):
+            ctypes.memmove(self._ring_buf[slot], data, data_num)
+        else:
+            self._ring[slot][:data_num] = bytearray(data[:data_num])
@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import math
-from time import sleep
-from time import time
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.core.bus.axi4_wait import wait_for, AXI4WaitTimeoutException
 from mix.driver.smartgiant.common.bus.axi4_lite_bus_emulator import AXI4LiteBusEmulator
 
 __author__ = "Zhangsong Deng"
@@ -49,6 +48,7 @@ class MIXFftAnalyzerSGDef:
     FREQ_CALCULATE_CONST = 0.5
     FFT_RAM_RD_BYTE = 4
     FFT_VALID_DATA_COUNT = 1
+    FFT_WORDS_PER_POINT = 2
     FFT_POW_IGNORE_BYTE = 8
     THDN_DB_AGLORITHM_CONST = 10
     THD_DB_AGLORITHM_CONST = 10
@@ -103,7 +103,7 @@ class MIXFftAnalyzerSG(object):
 
     rpc_public_api = ['enable', 'disable', 'enable_upload', 'disable_upload',
                       'analyze_config', 'analyze', 'get_vpp', 'get_frequency',
-                      'get_vpp_by_freq', 'get_thdn', 'get_thd']
+                      'get_vpp_by_freq', 'get_thdn', 'get_thd', 'get_results']
 
     def __init__(self, axi4_bus=None, fft_data_cnt=None, fft_point_number=MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_8K):
         if axi4_bus is None:
@@ -136,6 +136,10 @@ class MIXFftAnalyzerSG(object):
         self._vpp = 0
         self._thdn = 0
         self._thd = 0
+        self._noisefloor = 0
+        # results already calculated from the current fft_power_data
+        self._calculated = set()
+        self._power_sum = [0]
 
     def enable(self):
         '''
@@ -253,18 +257,12 @@ class MIXFftAnalyzerSG(object):
         self.axi4_bus.write_8bit_inc(MIXFftAnalyzerSGDef.DEC_CTRL_REGISTER,
                                      [MIXFftAnalyzerSGDef.DECIMATE_PARAMETER_ENABLE])
 
-        rd_data = [0x00]
-        timeout = 0
-        start_time = time()
         # check is decimate parameter is enable
-        while ((rd_data[0] == MIXFftAnalyzerSGDef.DECIMATE_PARAMETER_DISABLE) and
-               timeout < MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S):
-            # check interval
-            sleep(MIXFftAnalyzerSGDef.MEASURE_INTERVAL_S)
-            rd_data = self.axi4_bus.read_8bit_inc(MIXFftAnalyzerSGDef.DEC_CTRL_REGISTER, 1)
-            timeout = time() - start_time
-
-        if timeout > MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S:
+        try:
+            wait_for(self.axi4_bus, MIXFftAnalyzerSGDef.DEC_CTRL_REGISTER, 0xFF,
+                     MIXFftAnalyzerSGDef.DECIMATE_PARAMETER_DISABLE, MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S,
+                     equal=False, max_interval=MIXFftAnalyzerSGDef.MEASURE_INTERVAL_S)
+        except AXI4WaitTimeoutException:
             raise MIXFftAnalyzerSGException(self.dev_name, 'Wait for estimate signal frequency timeout')
 
         # get current active decimate parameter
@@ -281,6 +279,7 @@ class MIXFftAnalyzerSG(object):
             self.bandwidth_index = 'auto'
         else:
             self.bandwidth_index = int(bandwidth / self.freq_resolution)
+        self._calculated = set()
 
     def analyze(self):
         '''
@@ -307,33 +306,21 @@ class MIXFftAnalyzerSG(object):
         self.axi4_bus.write_8bit_inc(MIXFftAnalyzerSGDef.FFT_STATE_REGISTER, [MIXFftAnalyzerSGDef.FFT_BUSY_STATE])
         self.axi4_bus.write_8bit_inc(MIXFftAnalyzerSGDef.FFT_START_REGISTER, [MIXFftAnalyzerSGDef.FFT_START])
 
-        fft_state = [0x00]
-        timeout = 0
-        start_time = time()
         # check FFT transform is complete or transform timeout
-        while (fft_state[0] == MIXFftAnalyzerSGDef.FFT_BUSY_STATE and
-               timeout < MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S):
-            sleep(MIXFftAnalyzerSGDef.MEASURE_INTERVAL_S)
-            fft_state = self.axi4_bus.read_8bit_inc(MIXFftAnalyzerSGDef.FFT_STATE_REGISTER, 1)
-            timeout = time() - start_time
-            if timeout > MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S:
-                raise MIXFftAnalyzerSGException(self.dev_name, 'wait for FFT calculate timeout')
-
-        fft_power_data = []
+        try:
+            wait_for(self.axi4_bus, MIXFftAnalyzerSGDef.FFT_STATE_REGISTER, 0xFF,
+                     MIXFftAnalyzerSGDef.FFT_BUSY_STATE, MIXFftAnalyzerSGDef.MEASURE_TIME_OUT_S,
+                     equal=False, max_interval=MIXFftAnalyzerSGDef.MEASURE_INTERVAL_S)
+        except AXI4WaitTimeoutException:
+            raise MIXFftAnalyzerSGException(self.dev_name, 'wait for FFT calculate timeout')
+
         # get FFT absolute data counts
         if self._fft_data_cnt:
             fft_data_cnt = self._fft_data_cnt
         else:
             fft_data_cnt = self.axi4_bus.read_32bit_inc(MIXFftAnalyzerSGDef.FFT_RAM_DCNT_REGISTER, 1)[0]
 
-        for i in range(0, int(fft_data_cnt / 2)):
-            # The valid data of the FFT is 6 bytes, but FFT_RAM_RD register is 4 bytes. So read the FIFO twice.
-            read_data = self.axi4_bus.read_32bit_fix(MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER,
-                                                     MIXFftAnalyzerSGDef.FFT_VALID_DATA_COUNT)
-            read_data += self.axi4_bus.read_32bit_fix(MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER,
-                                                      MIXFftAnalyzerSGDef.FFT_VALID_DATA_COUNT)
-            # FFT data conbined with first 6 byte data, raw data is a 32bit value
-            fft_power_data.append(read_data[0] | read_data[1] << 32)
+        fft_power_data = self._read_fft_power(int(fft_data_cnt / 2))
 
         # if the waveform has DC component, need to remove the influence DC component,
         # and the first 5 point is about DC component
@@ -344,9 +331,50 @@ class MIXFftAnalyzerSG(object):
         refer_data = self._base_index_find(fft_power_data)
         self.refer_data = refer_data
         self.fft_power_data = fft_power_data
+        self._power_sum = self._cumulative_sum(fft_power_data)
+        self._calculated = set()
 
         self._calculate_signal()
 
+    def _read_fft_power(self, count):
+        '''
+        Drain the FFT power data of count points from the FIFO in one burst.
+
+        The valid data of the FFT is 6 bytes, but FFT_RAM_RD register is 4 bytes,
+        so every point takes two FIFO words, low word first.
+        '''
+        if count <= 0:
+            return []
+        words = self.axi4_bus.read_32bit_fix(MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER,
+                                             count * MIXFftAnalyzerSGDef.FFT_WORDS_PER_POINT)
+        return [low | high << 32 for low, high in zip(words[0::2], words[1::2])]
+
+    def _cumulative_sum(self, data):
+        '''
+        Prefix sums of data, power_sum[i] is sum(data[:i]), so any band power takes two lookups.
+        '''
+        power_sum = [0] * (len(data) + 1)
+        total = 0
+        for i, value in enumerate(data):
+            total += value
+            power_sum[i + 1] = total
+        return power_sum
+
+    def _band_power(self, start, stop):
+        '''
+        Power of fft_power_data[start:stop], same slice semantic, from the prefix sums.
+        '''
+        start, stop, _ = slice(start, stop).indices(len(self._power_sum) - 1)
+        if stop <= start:
+            return 0
+        return self._power_sum[stop] - self._power_sum[start]
+
+    def _calculate_once(self, name, calculate):
+        # a result is calculated once per analyze(), until the config changes
+        if name not in self._calculated:
+            calculate()
+            self._calculated.add(name)
+
     def set_harmonic_count(self, harmonic_count):
         '''
         MIXFftAnalyzerSG set harmonic count.
@@ -362,6 +390,7 @@ class MIXFftAnalyzerSG(object):
         assert harmonic_count >= MIXFftAnalyzerSGDef.HARMONIC_COUNT_MIN
         assert harmonic_count <= MIXFftAnalyzerSGDef.HARMONIC_COUNT_MAX
         self.harmonic_count = harmonic_count
+        self._calculated.discard('thd')
 
     def get_noisefloor(self):
         '''
@@ -371,18 +400,8 @@ class MIXFftAnalyzerSG(object):
             float, value, unit V,  Result of signal's noisefloor.
 
         '''
-        if self.bandwidth_index == 'auto':
-            bandwidth = MIXFftAnalyzerSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
-            bandwidth_index = int(bandwidth / self.freq_resolution)
-            if bandwidth_index > self.fft_point_number_half:
-                bandwidth_index = self.fft_point_number_half
-        else:
-            bandwidth_index = self.bandwidth_index
-
-        all_power = sum(self.fft_power_data[MIXFftAnalyzerSGDef.FFT_POW_IGNORE_BYTE: bandwidth_index])
-        noisefloor = ((all_power ** 0.5) / self.fft_point_number / self.fft_point_number_half /
-                      (2 ** 0.5) * MIXFftAnalyzerSGDef.NOISEFLOOR_COEFFICIENT)
-        return noisefloor
+        self._calculate_once('noisefloor', self._calculate_noisefloor)
+        return self._noisefloor
 
     def get_vpp(self):
         '''
@@ -434,7 +453,7 @@ class MIXFftAnalyzerSG(object):
 
         '''
         if self.freq_point:
-            self._calculate_vpp_by_freq()
+            self._calculate_once('vpp_by_freq', self._calculate_vpp_by_freq)
         return self._vpp_by_freq
 
     def get_thdn(self):
@@ -452,7 +471,7 @@ class MIXFftAnalyzerSG(object):
             print fft_analyzer.get_thdn()
 
         '''
-        self._calculate_thdn()
+        self._calculate_once('thdn', self._calculate_thdn)
         return self._thdn
 
     def get_thd(self):
@@ -471,9 +490,33 @@ class MIXFftAnalyzerSG(object):
 
         '''
         if self.harmonic_count:
-            self._calculate_thd()
+            self._calculate_once('thd', self._calculate_thd)
         return self._thd
 
+    def get_results(self):
+        '''
+        All calculate results of the last analyze in one call.
+
+        Returns:
+            dict, {'vpp': value, 'frequency': value, 'thd': value/None, 'thdn': value, 'noisefloor': value,
+                   'vpp_by_freq': value/None}, thd is None without harmonic_count and
+                   vpp_by_freq is None without freq_point.
+
+        Examples:
+            fft_analyzer.analyze_config(192000, 0xff, 20000, 5, 1000)
+            fft_analyzer.analyze()
+            print fft_analyzer.get_results()
+
+        '''
+        result = dict()
+        result['vpp'] = self._vpp
+        result['frequency'] = self._frequency
+        result['thd'] = self.get_thd() if self.harmonic_count else None
+        result['thdn'] = self.get_thdn()
+        result['noisefloor'] = self.get_noisefloor()
+        result['vpp_by_freq'] = self.get_vpp_by_freq() if self.freq_point else None
+        return result
+
     def _calculate_signal(self):
         '''
         Fundamental wave frequency and ampvpplitude value calculate. This function only use in this module.
@@ -513,22 +556,15 @@ class MIXFftAnalyzerSG(object):
 
         '''
         # each harmonic power's calculate
-        fundamental_power = sum(self.fft_power_data[self.refer_data.k1_index - self.envelope:
-                                                    self.refer_data.k2_index + self.envelope])
+        fundamental_power = self._band_power(self.refer_data.k1_index - self.envelope,
+                                             self.refer_data.k2_index + self.envelope)
         if 0 == fundamental_power:
             raise MIXFftAnalyzerSGException(self.dev_name, "The divisor is equal to 0")
-        if self.bandwidth_index == 'auto':
-            # when bandwidth is auto, best bandwidth is 20000 / decimation
-            bandwidth = MIXFftAnalyzerSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
-            bandwidth_index = int(bandwidth / self.freq_resolution)
-            if bandwidth_index > self.fft_point_number_half:
-                bandwidth_index = self.fft_point_number_half
-        else:
-            bandwidth_index = self.bandwidth_index
+        bandwidth_index = self._get_bandwidth_index()
         # Ignore the first 8 data
         # Nn = ∑((n=2)^(k1 - 3))(AA) + ∑((n=k2 + 3)^(k21 - 3))(AA) + ∑((n=k22 - 3)^(k31 - 3))(AA) +
         #      ∑((n=k32 - 3)^(k41 - 3))(AA) + ∑((n=42 - 3)^(k51 - 3))(AA) + ∑((n=52 - 3)^(N / 2))(AA), AA = An^2
-        all_power = sum(self.fft_power_data[MIXFftAnalyzerSGDef.FFT_POW_IGNORE_BYTE: bandwidth_index])
+        all_power = self._band_power(MIXFftAnalyzerSGDef.FFT_POW_IGNORE_BYTE, bandwidth_index)
         # index = (Nn - A1) / A1
         index = (all_power - fundamental_power) / fundamental_power
         if index <= 0:
@@ -538,6 +574,36 @@ class MIXFftAnalyzerSG(object):
         # the power to amplitude have a 2x relationship in dB algorithm
         self._thdn = MIXFftAnalyzerSGDef.THDN_DB_AGLORITHM_CONST * math.log10(index)
 
+    def _calculate_noisefloor(self):
+        '''
+        Noisefloor calculate. This function only use in this module.
+
+        Returns:
+            None.
+
+        '''
+        all_power = self._band_power(MIXFftAnalyzerSGDef.FFT_POW_IGNORE_BYTE, self._get_bandwidth_index())
+        self._noisefloor = ((all_power ** 0.5) / self.fft_point_number / self.fft_point_number_half /
+                            (2 ** 0.5) * MIXFftAnalyzerSGDef.NOISEFLOOR_COEFFICIENT)
+
+    def _get_bandwidth_index(self):
+        '''
+        Band end index of THD+N and noisefloor. This function only use in this module.
+
+        Returns:
+            int, value, index of fft_power_data.
+
+        '''
+        if self.bandwidth_index == 'auto':
+            # when bandwidth is auto, best bandwidth is 20000 / decimation
+            bandwidth = MIXFftAnalyzerSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
+            bandwidth_index = int(bandwidth / self.freq_resolution)
+            if bandwidth_index > self.fft_point_number_half:
+                bandwidth_index = self.fft_point_number_half
+        else:
+            bandwidth_index = self.bandwidth_index
+        return bandwidth_index
+
     def _calculate_thd(self):
         '''
         THD calculate. This function only use in this module.
@@ -553,8 +619,7 @@ class MIXFftAnalyzerSG(object):
             # find the index of the specified frequency on frequency domain
             k1_index = int(freq_data / self.freq_resolution)
             k2_index = k1_index + 1
-            power_temp = sum(self.fft_power_data[k1_index - self.envelope: k2_index +
-                             self.envelope])
+            power_temp = self._band_power(k1_index - self.envelope, k2_index + self.envelope)
             harmonic_power.append(power_temp)
 
         if harmonic_power[0] == 0:
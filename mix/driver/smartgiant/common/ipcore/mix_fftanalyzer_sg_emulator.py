@@ -98,3 +98,11 @@ is %s, harmonic_count is %s, freq_point is %s" % (self.dev_name, bandwidth, samp
 
     def get_thd(self):
         return self.plugin.thd
+
+    def get_noisefloor(self):
+        return self.plugin.noisefloor
+
+    def get_results(self):
+        return {'vpp': self.plugin.vpp, 'frequency': self.plugin.frequency, 'thd': self.plugin.thd,
+                'thdn': self.plugin.thdn, 'noisefloor': self.plugin.noisefloor,
+                'vpp_by_freq': self.plugin.vpp_by_freq}
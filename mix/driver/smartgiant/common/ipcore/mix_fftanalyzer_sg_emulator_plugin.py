@@ -11,6 +11,7 @@ class MIXFftAnalyzerSGEmulatorPlugin(object):
         self.thdn = 100
         self.thd = 1000
         self.vpp = 0.5
+        self.noisefloor = 0.0001
 
     def enable(self):
         pass
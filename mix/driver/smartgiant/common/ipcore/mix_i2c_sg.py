@@ -86,7 +86,8 @@ class _MIXI2CSG(object):
 
     '''
 
-    rpc_public_api = ['get_speed', 'set_speed', 'read', 'write', 'write_and_read', 'get_cache_size']
+    rpc_public_api = ['get_speed', 'set_speed', 'read', 'write', 'write_and_read', 'batch_transfer',
+                      'get_cache_size']
 
     def __init__(self, axi4_bus=None, speed_hz=PLI2CDef.DEFAULT_RATE):
         if axi4_bus is None:
@@ -208,22 +209,7 @@ class _MIXI2CSG(object):
         self._axi4_bus.write_32bit_inc(PLI2CDef.FREQ_REGISTER, [int(bit_rate_ctrl)])
         self.enable()
 
-    def read(self, addr, data_len):
-        '''
-        MIXI2CSG read specific length datas
-
-        Args:
-            addr:       hexmical, [0~0xFF], read data from this address.
-            data_len:   int, [0~1024], length of datas to read.
-
-        Returns:
-            list, [value], specific length datas.
-
-        Examples:
-            datas = i2c.read(0x00, 3)
-            print(datas)
-
-        '''
+    def _read_commands(self, addr, data_len):
         assert addr >= 0 and addr <= 0xFF
         assert data_len > 0 and data_len <= self._cache_size
 
@@ -234,29 +220,17 @@ class _MIXI2CSG(object):
             send_data.append(PLI2CDef.SEND_ACK_CMD)
         send_data.append(PLI2CDef.DUMMY_DATA)
         send_data.append(PLI2CDef.SEND_NACK_STOP_CMD)
-        recv_data = self._transfer(send_data)
+        return send_data
 
+    def _read_result(self, addr, recv_data):
         for ack in recv_data[0:(len(recv_data) - 2)][1::2]:
             if ack & PLI2CDef.IS_NACK_FLAG == PLI2CDef.IS_NACK_FLAG:
                 msg = 'Read address %x failue, with NACK flag in response data.' % addr
                 raise MIXI2CSGException(self._dev_name, msg)
 
-        result_data = recv_data[2:len(recv_data)][::2]
-
-        return result_data
-
-    def write(self, addr, data):
-        '''
-        MIXI2CSG write datas to address
-
-        Args:
-            address:    hexmial, [0~0xFF], write datas to this address.
-            data:       list, datas to be write.
-
-        Examples:
-            i2c.write(0x00, [0x01, 0x02, 0x03])
+        return recv_data[2:len(recv_data)][::2]
 
-        '''
+    def _write_commands(self, addr, data):
         assert addr >= 0 and addr <= 0xFF
         assert len(data) > 0
 
@@ -266,14 +240,69 @@ class _MIXI2CSG(object):
             send_list.append(PLI2CDef.WAIT_ACK_CMD)
         send_list.append(data[-1])
         send_list.append(PLI2CDef.WAIT_ACK_STOP_CMD)
+        return send_list
 
-        recv_data = self._transfer(send_list)
-
+    def _write_result(self, addr, recv_data):
         for ack in recv_data[0:(len(recv_data) - 2)][1::2]:
             if ack & PLI2CDef.IS_NACK_FLAG == PLI2CDef.IS_NACK_FLAG:
                 msg = 'Write address %x failue, with NACK flag in response data.' % addr
                 raise MIXI2CSGException(self._dev_name, msg)
 
+    def _write_and_read_commands(self, addr, wr_data, rd_len):
+        assert addr >= 0 and addr <= 0xFF
+        assert rd_len > 0 and rd_len <= self._cache_size
+
+        send_list = [addr << 1, PLI2CDef.SEND_START_CMD]
+        [send_list.extend([wr_data[i], PLI2CDef.WAIT_ACK_CMD]) for i in range(len(wr_data))]
+
+        send_list.extend([(addr << 1) | PLI2CDef.READ_FLAG, PLI2CDef.SEND_START_CMD])
+        [send_list.extend([PLI2CDef.DUMMY_DATA, PLI2CDef.SEND_ACK_CMD]) for i in range(rd_len - 1)]
+        send_list.append(PLI2CDef.DUMMY_DATA)
+        send_list.append(PLI2CDef.SEND_NACK_STOP_CMD)
+        return send_list
+
+    def _write_and_read_result(self, addr, wr_len, recv_data):
+        for ack in recv_data[0:(len(recv_data) - 2)][1::2]:
+            if ack & PLI2CDef.IS_NACK_FLAG == PLI2CDef.IS_NACK_FLAG:
+                msg = 'Write and read address %x failue, with NACK flag in response data.' % addr
+                raise MIXI2CSGException(self._dev_name, msg)
+
+        return recv_data[::2][(wr_len + 2):len(recv_data)]
+
+    def read(self, addr, data_len):
+        '''
+        MIXI2CSG read specific length datas
+
+        Args:
+            addr:       hexmical, [0~0xFF], read data from this address.
+            data_len:   int, [0~1024], length of datas to read.
+
+        Returns:
+            list, [value], specific length datas.
+
+        Examples:
+            datas = i2c.read(0x00, 3)
+            print(datas)
+
+        '''
+        recv_data = self._transfer(self._read_commands(addr, data_len))
+        return self._read_result(addr, recv_data)
+
+    def write(self, addr, data):
+        '''
+        MIXI2CSG write datas to address
+
+        Args:
+            address:    hexmial, [0~0xFF], write datas to this address.
+            data:       list, datas to be write.
+
+        Examples:
+            i2c.write(0x00, [0x01, 0x02, 0x03])
+
+        '''
+        recv_data = self._transfer(self._write_commands(addr, data))
+        self._write_result(addr, recv_data)
+
     def write_and_read(self, addr, wr_data, rd_len):
         '''
         MIXI2CSG write datas and then read specific length datas
@@ -291,27 +320,75 @@ class _MIXI2CSG(object):
             print(datas)
 
         '''
-        assert addr >= 0 and addr <= 0xFF
-        assert rd_len > 0 and rd_len <= self._cache_size
+        recv_data = self._transfer(self._write_and_read_commands(addr, wr_data, rd_len))
+        return self._write_and_read_result(addr, len(wr_data), recv_data)
 
-        send_list = [addr << 1, PLI2CDef.SEND_START_CMD]
-        [send_list.extend([wr_data[i], PLI2CDef.WAIT_ACK_CMD]) for i in range(len(wr_data))]
+    def batch_transfer(self, messages):
+        '''
+        MIXI2CSG run many messages with one fifo fill and one wait
 
-        send_list.extend([(addr << 1) | PLI2CDef.READ_FLAG, PLI2CDef.SEND_START_CMD])
-        [send_list.extend([PLI2CDef.DUMMY_DATA, PLI2CDef.SEND_ACK_CMD]) for i in range(rd_len - 1)]
-        send_list.append(PLI2CDef.DUMMY_DATA)
-        send_list.append(PLI2CDef.SEND_NACK_STOP_CMD)
+        Each message is a complete i2c transfer from start to stop. Messages are packed
+        into the command fifo in order and split into more transfers only when the fifo
+        is full. The fifo runs all messages of a transfer, so a NACK is reported after
+        the messages packed with it have run, later transfers are not started.
 
-        recv_data = self._transfer(send_list)
+        Args:
+            messages:   list, [message, ...], message is one of
+                        ['read', addr, data_len],
+                        ['write', addr, [data, ...]],
+                        ['write_and_read', addr, [data, ...], rd_len].
 
-        for ack in recv_data[0:(len(recv_data) - 2)][1::2]:
-            if ack & PLI2CDef.IS_NACK_FLAG == PLI2CDef.IS_NACK_FLAG:
-                msg = 'Write and read address %x failue, with NACK flag in response data.' % addr
-                raise MIXI2CSGException(self._dev_name, msg)
+        Returns:
+            list, [result, ...], read data list of each read and write_and_read message,
+                  None for each write message.
+
+        Raises:
+            MIXI2CSGException:  message type is invalid, message is larger than fifo or NACK.
 
-        result_data = recv_data[::2][(len(wr_data) + 2):len(recv_data)]
+        Examples:
+            # set register pointer, read 2 bytes, write next register
+            result = i2c.batch_transfer([['write', 0x48, [0x01]], ['read', 0x48, 2],
+                                         ['write_and_read', 0x48, [0x00], 2], ['write', 0x48, [0x02, 0x10]]])
 
-        return result_data
+        '''
+        commands = []
+        for message in messages:
+            if message[0] == 'read':
+                commands.append(self._read_commands(message[1], message[2]))
+            elif message[0] == 'write':
+                commands.append(self._write_commands(message[1], message[2]))
+            elif message[0] == 'write_and_read':
+                commands.append(self._write_and_read_commands(message[1], message[2], message[3]))
+            else:
+                raise MIXI2CSGException(self._dev_name, 'Invalid message type %s' % (message[0]))
+
+        # rx count register is read 8 bit wide
+        max_len = min(self._cache_size, 0xFF) * 2
+        results = []
+        start = 0
+        while start < len(commands):
+            stop = start
+            send_list = []
+            while stop < len(commands) and len(send_list) + len(commands[stop]) <= max_len:
+                send_list += commands[stop]
+                stop += 1
+            if stop == start:
+                msg = 'Message %d is larger than the transfer cache size' % (start)
+                raise MIXI2CSGException(self._dev_name, msg)
+            recv_data = self._transfer(send_list)
+
+            pos = 0
+            for message, command in zip(messages[start:stop], commands[start:stop]):
+                recv = recv_data[pos:pos + len(command)]
+                pos += len(command)
+                if message[0] == 'read':
+                    results.append(self._read_result(message[1], recv))
+                elif message[0] == 'write':
+                    results.append(self._write_result(message[1], recv))
+                else:
+                    results.append(self._write_and_read_result(message[1], len(message[2]), recv))
+            start = stop
+        return results
 
     def get_cache_size(self):
         '''
@@ -74,6 +74,13 @@ class _MIXQSPISG(object):
         self._timeout = AXI4Def.AXI4_TIMEOUT
         self._spi_speed = PLSPIDef.DEFAULT_SPEED
         self._spi_work_mode = PLSPIDef.SPI_MODE
+        if hasattr(self._axi4_bus, 'add_shadow_register'):
+            # control, config and clock registers are only changed by this driver
+            self._axi4_bus.add_shadow_register(AXI4Def.IPCORE_INFO_ADDR, 4)
+            self._axi4_bus.add_shadow_register(PLSPIDef.BASE_CLOCK_FREQ_REGISTER, PLSPIDef.CLK_REGISTER_LEN)
+            self._axi4_bus.add_shadow_register(PLSPIDef.CONFIG_REGISTER, PLSPIDef.CONFIG_REGISTER_LEN)
+            self._axi4_bus.add_shadow_register(PLSPIDef.FREQ_REGISTER, 2)
+            self._axi4_bus.add_shadow_register(PLSPIDef.CONTROL_REGISTER, PLSPIDef.CONTROL_REGISTER_LEN)
         self.open()
 
     def __del__(self):
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-import time
 import math
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.core.bus.axi4_wait import wait_for, AXI4WaitTimeoutException
 from mix.driver.core.utility.data_operate import DataOperate
 
 
@@ -231,20 +231,14 @@ class MIXSignalMeterSG(object):
         self.axi4_bus.write_8bit_inc(MIXSignalMeterSGDef.FREQ_REGISTER, [0x00])
         self.axi4_bus.write_8bit_inc(
             MIXSignalMeterSGDef.SET_MEASURE_REGISTER, [0x01])
-        rd_data = self.axi4_bus.read_8bit_inc(
-            MIXSignalMeterSGDef.FREQ_REGISTER, 1)
-
-        last_time = time.time()
-        # time.time() unit needs to be converted to ms
-        while ((rd_data[0] != 0x01) and
-               ((time.time() - last_time) * 1000 < (time_ms + MIXSignalMeterSGDef.DEFAULT_TIMEOUT))):
-            time.sleep(MIXSignalMeterSGDef.DEFAULT_DELAY)
-            rd_data = self.axi4_bus.read_8bit_inc(
-                MIXSignalMeterSGDef.FREQ_REGISTER, 1)
-
-        if((time.time() - last_time) * 1000 >= (time_ms + MIXSignalMeterSGDef.DEFAULT_TIMEOUT)):
-            raise MIXSignalMeterSGException('SignalMeter Measure time out')
+        # timeout unit needs to be converted from ms to s
+        try:
+            wait_for(self.axi4_bus, MIXSignalMeterSGDef.FREQ_REGISTER, 0xFF, 0x01,
+                     (time_ms + MIXSignalMeterSGDef.DEFAULT_TIMEOUT) / 1000.0,
+                     max_interval=MIXSignalMeterSGDef.DEFAULT_DELAY)
+        except AXI4WaitTimeoutException:
             self._measure_state = 0
+            raise MIXSignalMeterSGException('SignalMeter Measure time out')
         self._measure_state = 1
         return "done"
 
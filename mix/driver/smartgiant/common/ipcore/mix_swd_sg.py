@@ -2,6 +2,8 @@
 import time
 from mix.driver.smartgiant.common.utility.data_operate import DataOperate
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.core.bus.axi4_batch import AXI4Batch, AXI4BatchException
+from mix.driver.core.bus.axi4_wait import wait_for, AXI4WaitTimeoutException
 from mix.driver.smartgiant.common.bus.axi4_lite_bus_emulator import AXI4LiteBusEmulator
 
 __author__ = 'jihua.jiang@SmartGiant'
@@ -91,11 +93,44 @@ class MIXSWDSG(object):
         else:
             self.axi4_bus = axi4_bus
 
+        self._create_batches()
         self._enable()
 
     def __del__(self):
         self._disable()
 
+    def _create_batches(self):
+        '''
+        Record the register sequences of one swd write and one swd read transaction.
+
+        Only the request and write data change between transactions, they are
+        updated in place before each execution.
+        '''
+        self._write_batch = AXI4Batch(self.axi4_bus)
+        self._write_req = self._write_batch.write_8bit_inc(MIXSWDSGDef.SWD_REQ_DATA, [0x00])
+        self._write_data = self._write_batch.write_32bit_fix(MIXSWDSGDef.SWD_WDATA_REG, [0x00])
+        self._write_batch.write_8bit_inc(MIXSWDSGDef.SWD_START_REG, [MIXSWDSGDef.START_TRANSMIT])
+        self._write_batch.poll(MIXSWDSGDef.SWD_STATE_REG, 0xFF, MIXSWDSGDef.BUSY, MIXSWDSGDef.TIMEOUT_S,
+                               equal=False, interval=MIXSWDSGDef.DELAY_S)
+        self._write_batch.read_8bit_inc(MIXSWDSGDef.SWD_ACK_DATA_REG, 1)
+
+        self._read_batch = AXI4Batch(self.axi4_bus)
+        self._read_req = self._read_batch.write_8bit_inc(MIXSWDSGDef.SWD_REQ_DATA, [0x00])
+        self._read_batch.write_8bit_inc(MIXSWDSGDef.SWD_START_REG, [MIXSWDSGDef.START_TRANSMIT])
+        self._read_batch.poll(MIXSWDSGDef.SWD_STATE_REG, 0xFF, MIXSWDSGDef.BUSY, MIXSWDSGDef.TIMEOUT_S,
+                              equal=False, interval=MIXSWDSGDef.DELAY_S)
+        self._read_batch.read_32bit_fix(MIXSWDSGDef.SWD_RDATA_REG, 1)
+        self._read_batch.read_8bit_inc(MIXSWDSGDef.SWD_ACK_DATA_REG, 1)
+
+    def _execute(self, batch):
+        '''
+        Execute one recorded transaction, poll timeout is reported as communicate timeout.
+        '''
+        try:
+            return batch.execute()
+        except AXI4BatchException:
+            raise MIXSWDSGException("communicate timeout")
+
     def _enable(self):
         '''
         enable swd device, device must be enable and that can communicate.
@@ -243,17 +278,13 @@ class MIXSWDSG(object):
         '''
         assert isinstance(data, int)
 
-        # write request data
-        self.axi4_bus.write_8bit_inc(MIXSWDSGDef.SWD_REQ_DATA, [req_data])
-        # write data
-        self.axi4_bus.write_32bit_fix(MIXSWDSGDef.SWD_WDATA_REG, [data])
-        # start transmit
-        self.axi4_bus.write_8bit_inc(MIXSWDSGDef.SWD_START_REG, [MIXSWDSGDef.START_TRANSMIT])
-
-        self._wait_busy()
+        # request data, write data, start transmit, wait ready and read ACK in one batch
+        self._write_batch.update(self._write_req, [req_data])
+        self._write_batch.update(self._write_data, [data])
+        ack_data = self._execute(self._write_batch)[0][0]
 
         # check the ACK data
-        self._check_ack(self.axi4_bus.read_8bit_inc(MIXSWDSGDef.SWD_ACK_DATA_REG, 1)[0])
+        self._check_ack(ack_data)
         return "done"
 
     def read(self, req_data):
@@ -274,20 +305,13 @@ class MIXSWDSG(object):
             swd.read(0x21)
 
         '''
-        # write request data
-        self.axi4_bus.write_8bit_inc(MIXSWDSGDef.SWD_REQ_DATA, [req_data])
-        # start transmit
-        self.axi4_bus.write_8bit_inc(MIXSWDSGDef.SWD_START_REG, [MIXSWDSGDef.START_TRANSMIT])
+        # request data, start transmit, wait ready, read data and ACK in one batch
+        self._read_batch.update(self._read_req, [req_data])
+        rd_data, ack_data = self._execute(self._read_batch)
 
-        self._wait_busy()
+        self._check_ack(ack_data[0])
 
-        rd_data = self.axi4_bus.read_32bit_fix(MIXSWDSGDef.SWD_RDATA_REG, 1)[0]
-
-        ack_data = self.axi4_bus.read_8bit_inc(MIXSWDSGDef.SWD_ACK_DATA_REG, 1)[0]
-
-        self._check_ack(ack_data)
-
-        return rd_data
+        return rd_data[0]
 
     def _check_ack(self, ack):
         '''
@@ -311,14 +335,11 @@ class MIXSWDSG(object):
         '''
         Wait swd comminucattion ready.
         '''
-        start = time.time()
-
-        while (time.time() < (start + MIXSWDSGDef.TIMEOUT_S)):
-            if MIXSWDSGDef.BUSY != self.axi4_bus.read_8bit_inc(MIXSWDSGDef.SWD_STATE_REG, 1)[0]:
-                return
-            time.sleep(MIXSWDSGDef.DELAY_S)
-
-        raise MIXSWDSGException("communicate timeout")
+        try:
+            wait_for(self.axi4_bus, MIXSWDSGDef.SWD_STATE_REG, 0xFF, MIXSWDSGDef.BUSY,
+                     MIXSWDSGDef.TIMEOUT_S, equal=False, max_interval=MIXSWDSGDef.DELAY_S)
+        except AXI4WaitTimeoutException:
+            raise MIXSWDSGException("communicate timeout")
 
     def _calculate_req_parity(self, data):
         assert data >= 0 and data <= 0xFF
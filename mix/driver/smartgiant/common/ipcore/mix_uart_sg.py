@@ -183,6 +183,34 @@ class MIXUARTSG(object):
 
         return result_data
 
+    def read_available(self, timeout_sec=0):
+        '''
+        Uart wait at most timeout_sec for data and read all data cached, return as soon as
+        there is any data, used by UARTReader.
+
+        Args:
+            timeout_sec:    float, default 0, max wait time for the first byte.
+
+        Returns:
+            list, [value],  each element takes one byte, empty if no data arrived.
+
+        Examples:
+            rd_data = uart_bus.read_available(0.05)
+
+        '''
+        assert timeout_sec >= 0
+
+        now = time.time()
+        while True:
+            rx_buf_count = self.axi4_bus.read_16bit_inc(
+                PLUARTDef.RXBUF_COUNT_REGISTER, 1)[0]
+            if rx_buf_count > 0:
+                return self.axi4_bus.read_8bit_fix(
+                    PLUARTDef.RX_BUF_REGISTER, rx_buf_count)
+            if time.time() >= now + timeout_sec:
+                return []
+            time.sleep(AXI4Def.AXI4_DELAY)
+
     def write_hex(self, wr_data):
         '''
         Uart write hex data.
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import math
-from time import sleep
-from time import time
+import time
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.core.bus.axi4_wait import wait_for, AXI4WaitTimeoutException
 
 __author__ = "Zhangsong Deng"
 __version__ = "1.2"
@@ -67,6 +67,7 @@ class MIXXtalkMeasureSGDef:
     FREQ_CALCULATE_CONST = 0.5
     FFT_RAM_RD_BYTE = 4
     FFT_VALID_DATA_COUNT = 1
+    FFT_WORDS_PER_POINT = 2
     FFT_POW_IGNORE_BYTE = 8
     THDN_DB_AGLORITHM_CONST = 10
     THD_DB_AGLORITHM_CONST = 10
@@ -87,6 +88,7 @@ class MIXXtalkMeasureSGDef:
 
     ANALYZE_MODE = ["normal", "xtalk"]
     CHANNEL = ["left", "right"]
+    XTALK_DB_AGLORITHM_CONST = 20
 
 
 class MIXXtalkMeasureSGDataDef():
@@ -122,7 +124,7 @@ class MIXXtalkMeasureSG(object):
 
     rpc_public_api = ['enable', 'disable', 'enable_upload', 'disable_upload',
                       'analyze_config', 'analyze', 'get_vpp', 'get_frequency',
-                      'get_vpp_by_freq', 'get_thdn', 'get_thd']
+                      'get_vpp_by_freq', 'get_thdn', 'get_thd', 'get_results']
 
     def __init__(self, axi4_bus=None, fft_data_cnt=None, fft_point_number=MIXXtalkMeasureSGDef.FFT_POINT_NUMBER_8K):
         if isinstance(axi4_bus, basestring):
@@ -134,6 +136,7 @@ class MIXXtalkMeasureSG(object):
 
         # for measure configuration
         self.sample_rate = 0
+        self.decimation = None
         self.freq_resolution = 0
         self.bandwidth_index = 0
         self.harmonic_count = 5
@@ -152,6 +155,12 @@ class MIXXtalkMeasureSG(object):
         self._vpp = 0
         self._thdn = 0
         self._thd = 0
+        self._noisefloor = 0
+        # results already calculated from the current fft_power_data
+        self._calculated = set()
+        self._power_sum = [0]
+        # [channel, analyze_mode] of the last measure_select
+        self._measure_selected = None
 
     def enable(self):
         '''
@@ -252,6 +261,7 @@ class MIXXtalkMeasureSG(object):
         '''
         assert analyze_mode in MIXXtalkMeasureSGDef.ANALYZE_MODE
         assert channel in MIXXtalkMeasureSGDef.CHANNEL
+        self._measure_selected = [channel, analyze_mode]
 
         if(analyze_mode == "normal"):
             if (channel == "left"):
@@ -324,39 +334,38 @@ class MIXXtalkMeasureSG(object):
         self.harmonic_count = harmonic_count
         self.freq_point = freq_point
 
-        # config decimation and enable decimate parameter
+        decimation = self._config_decimation(decimation_type)
+        self.decimation = decimation
+        # calculate true sample rate
+        self.sample_rate = sample_rate / decimation
+        # calculate frequency resolution
+        self.freq_resolution = sample_rate / (self.fft_point_number * decimation)
+        # calculate bandwidth index by bandwidth in frequency domain
+        if bandwidth == 'auto':
+            self.bandwidth_index = 'auto'
+        else:
+            self.bandwidth_index = int(bandwidth / self.freq_resolution)
+        self._calculated = set()
+
+    def _config_decimation(self, decimation_type):
+        # config decimation and enable decimate parameter, return the active decimation
         self.axi4_bus.write_8bit_inc(MIXXtalkMeasureSGDef.DEC_PARAM_CFG_REGISTER, [decimation_type])
         self.axi4_bus.write_8bit_inc(MIXXtalkMeasureSGDef.DEC_CTRL_REGISTER,
                                      [MIXXtalkMeasureSGDef.DECIMATE_PARAMETER_ENABLE])
 
-        rd_data = [0x00]
-        timeout = 0
-        start_time = time()
         # check is decimate parameter is enable
-        while ((rd_data[0] == MIXXtalkMeasureSGDef.DECIMATE_PARAMETER_DISABLE) and
-               timeout < MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S):
-            # check interval
-            sleep(MIXXtalkMeasureSGDef.MEASURE_INTERVAL_S)
-            rd_data = self.axi4_bus.read_8bit_inc(MIXXtalkMeasureSGDef.DEC_CTRL_REGISTER, 1)
-            timeout = time() - start_time
-
-        if timeout > MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S:
+        try:
+            wait_for(self.axi4_bus, MIXXtalkMeasureSGDef.DEC_CTRL_REGISTER, 0xFF,
+                     MIXXtalkMeasureSGDef.DECIMATE_PARAMETER_DISABLE, MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S,
+                     equal=False, max_interval=MIXXtalkMeasureSGDef.MEASURE_INTERVAL_S)
+        except AXI4WaitTimeoutException:
             raise MIXXtalkMeasureSGException(self.dev_name, 'Wait for estimate signal frequency timeout')
 
         # get current active decimate parameter
         rd_data = self.axi4_bus.read_8bit_inc(MIXXtalkMeasureSGDef.DEC_PARAM_VALUE_REGISTER, 1)
         if 0 == rd_data[0]:
             raise MIXXtalkMeasureSGException(self.dev_name, "The divisor is equal to 0")
-        self.decimation = rd_data[0]
-        # calculate true sample rate
-        self.sample_rate = sample_rate / rd_data[0]
-        # calculate frequency resolution
-        self.freq_resolution = sample_rate / (self.fft_point_number * rd_data[0])
-        # calculate bandwidth index by bandwidth in frequency domain
-        if bandwidth == 'auto':
-            self.bandwidth_index = 'auto'
-        else:
-            self.bandwidth_index = int(bandwidth / self.freq_resolution)
+        return rd_data[0]
 
     def analyze(self):
         '''
@@ -384,33 +393,21 @@ class MIXXtalkMeasureSG(object):
         self.axi4_bus.write_8bit_inc(MIXXtalkMeasureSGDef.FFT_STATE_REGISTER, [MIXXtalkMeasureSGDef.FFT_BUSY_STATE])
         self.axi4_bus.write_8bit_inc(MIXXtalkMeasureSGDef.FFT_START_REGISTER, [MIXXtalkMeasureSGDef.FFT_START])
 
-        fft_state = [0x00]
-        timeout = 0
-        start_time = time()
         # check FFT transform is complete or transform timeout
-        while (fft_state[0] == MIXXtalkMeasureSGDef.FFT_BUSY_STATE and
-               timeout < MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S):
-            sleep(MIXXtalkMeasureSGDef.MEASURE_INTERVAL_S)
-            fft_state = self.axi4_bus.read_8bit_inc(MIXXtalkMeasureSGDef.FFT_STATE_REGISTER, 1)
-            timeout = time() - start_time
-            if timeout > MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S:
-                raise MIXXtalkMeasureSGException(self.dev_name, 'wait for FFT calculate timeout')
-
-        fft_power_data = []
+        try:
+            wait_for(self.axi4_bus, MIXXtalkMeasureSGDef.FFT_STATE_REGISTER, 0xFF,
+                     MIXXtalkMeasureSGDef.FFT_BUSY_STATE, MIXXtalkMeasureSGDef.MEASURE_TIME_OUT_S,
+                     equal=False, max_interval=MIXXtalkMeasureSGDef.MEASURE_INTERVAL_S)
+        except AXI4WaitTimeoutException:
+            raise MIXXtalkMeasureSGException(self.dev_name, 'wait for FFT calculate timeout')
+
         # get FFT absolute data counts
         if self._fft_data_cnt:
             fft_data_cnt = self._fft_data_cnt
         else:
             fft_data_cnt = self.axi4_bus.read_32bit_inc(MIXXtalkMeasureSGDef.FFT_RAM_DCNT_REGISTER, 1)[0]
 
-        for i in range(0, int(fft_data_cnt / 2)):
-            # The valid data of the FFT is 6 bytes, but FFT_RAM_RD register is 4 bytes. So read the FIFO twice.
-            read_data = self.axi4_bus.read_32bit_fix(MIXXtalkMeasureSGDef.FFT_RAM_RD_REGISTER,
-                                                     MIXXtalkMeasureSGDef.FFT_VALID_DATA_COUNT)
-            read_data += self.axi4_bus.read_32bit_fix(MIXXtalkMeasureSGDef.FFT_RAM_RD_REGISTER,
-                                                      MIXXtalkMeasureSGDef.FFT_VALID_DATA_COUNT)
-            # FFT data conbined with first 6 byte data, raw data is a 32bit value
-            fft_power_data.append(read_data[0] | read_data[1] << 32)
+        fft_power_data = self._read_fft_power(int(fft_data_cnt / 2))
 
         # if the waveform has DC component, need to remove the influence DC component,
         # and the first 5 point is about DC component
@@ -421,9 +418,50 @@ class MIXXtalkMeasureSG(object):
         refer_data = self._base_index_find(fft_power_data)
         self.refer_data = refer_data
         self.fft_power_data = fft_power_data
+        self._power_sum = self._cumulative_sum(fft_power_data)
+        self._calculated = set()
 
         self._calculate_signal()
 
+    def _read_fft_power(self, count):
+        '''
+        Drain the FFT power data of count points from the FIFO in one burst.
+
+        The valid data of the FFT is 6 bytes, but FFT_RAM_RD register is 4 bytes,
+        so every point takes two FIFO words, low word first.
+        '''
+        if count <= 0:
+            return []
+        words = self.axi4_bus.read_32bit_fix(MIXXtalkMeasureSGDef.FFT_RAM_RD_REGISTER,
+                                             count * MIXXtalkMeasureSGDef.FFT_WORDS_PER_POINT)
+        return [low | high << 32 for low, high in zip(words[0::2], words[1::2])]
+
+    def _cumulative_sum(self, data):
+        '''
+        Prefix sums of data, power_sum[i] is sum(data[:i]), so any band power takes two lookups.
+        '''
+        power_sum = [0] * (len(data) + 1)
+        total = 0
+        for i, value in enumerate(data):
+            total += value
+            power_sum[i + 1] = total
+        return power_sum
+
+    def _band_power(self, start, stop):
+        '''
+        Power of fft_power_data[start:stop], same slice semantic, from the prefix sums.
+        '''
+        start, stop, _ = slice(start, stop).indices(len(self._power_sum) - 1)
+        if stop <= start:
+            return 0
+        return self._power_sum[stop] - self._power_sum[start]
+
+    def _calculate_once(self, name, calculate):
+        # a result is calculated once per analyze(), until the config changes
+        if name not in self._calculated:
+            calculate()
+            self._calculated.add(name)
+
     def set_harmonic_count(self, harmonic_count):
         '''
         MIXXtalkMeasureSG set harmonic count.
@@ -439,6 +477,7 @@ class MIXXtalkMeasureSG(object):
         assert harmonic_count >= MIXXtalkMeasureSGDef.HARMONIC_COUNT_MIN
         assert harmonic_count <= MIXXtalkMeasureSGDef.HARMONIC_COUNT_MAX
         self.harmonic_count = harmonic_count
+        self._calculated.discard('thd')
 
     def get_vpp(self):
         '''
@@ -490,7 +529,7 @@ class MIXXtalkMeasureSG(object):
 
         '''
         if self.freq_point:
-            self._calculate_vpp_by_freq()
+            self._calculate_once('vpp_by_freq', self._calculate_vpp_by_freq)
         return self._vpp_by_freq
 
     def get_thdn(self):
@@ -508,7 +547,7 @@ class MIXXtalkMeasureSG(object):
             print xtalk_analyzer.get_thdn()
 
         '''
-        self._calculate_thdn()
+        self._calculate_once('thdn', self._calculate_thdn)
         return self._thdn
 
     def get_thd(self):
@@ -527,9 +566,140 @@ class MIXXtalkMeasureSG(object):
 
         '''
         if self.harmonic_count:
-            self._calculate_thd()
+            self._calculate_once('thd', self._calculate_thd)
         return self._thd
 
+    def get_results(self):
+        '''
+        All calculate results of the last analyze in one call.
+
+        Returns:
+            dict, {'vpp': value, 'frequency': value, 'thd': value/None, 'thdn': value,
+                   'vpp_by_freq': value/None}, thd is None without harmonic_count and
+                   vpp_by_freq is None without freq_point.
+
+        Examples:
+            xtalk_analyzer.analyze_config(192000, 0xff, 20000, 5, 1000)
+            xtalk_analyzer.analyze()
+            print xtalk_analyzer.get_results()
+
+        '''
+        result = dict()
+        result['vpp'] = self._vpp
+        result['frequency'] = self._frequency
+        result['thd'] = self.get_thd() if self.harmonic_count else None
+        result['thdn'] = self.get_thdn()
+        result['vpp_by_freq'] = self.get_vpp_by_freq() if self.freq_point else None
+        return result
+
+    def xtalk_sweep(self, points, sample_rate, decimation_type=1, bandwidth='auto', prepare=None):
+        '''
+        Crosstalk of a list of (aggressor, victim, frequency) points, measured back to back.
+
+        In xtalk mode one capture gives both channels, so every capture measures the vpp of
+        left and right at the point frequency, and crosstalk is 20 * log10(victim vpp / aggressor vpp).
+        Decimation is only configured once, and a capture is reused by the next points with the
+        same aggressor and frequency. The stimulus of the aggressor is made by prepare before every
+        new capture. Without prepare the caller outputs the stimulus before the call, so all points
+        must share one aggressor and frequency. prepare is a python function, so the sweep is not
+        an RPC of the analyzer, it is called by test functions which hold the signal source.
+
+        The analyze_config and measure_select state before the sweep is restored after it, so the
+        FFT data must be measured again before the results of a normal measure are read.
+
+        Args:
+            points:          list, [[aggressor, victim, frequency], ...], aggressor and victim are
+                             in ["left", "right"], frequency is int, unit Hz.
+            sample_rate:     int, [0~125000000], Sample rate of your ADC device, unit is Hz.
+            decimation_type: int, [1~255], default 1, Config 0x15 register.
+            bandwidth:       int/string, default 'auto', FFT calculation bandwidth limit, unit is Hz.
+            prepare:         function/None, default None, called as prepare(aggressor, frequency)
+                             before a new capture, to output the stimulus, required if the points
+                             have more than one aggressor or frequency.
+
+        Returns:
+            dict, {'frequencies': list, 'matrix': dict, 'points': list}, matrix[aggressor][victim] is
+                  the crosstalk in dB of every frequency in frequencies, None if not measured.
+                  points are {'aggressor': string, 'victim': string, 'frequency': int, 'xtalk': value,
+                  'aggressor_vpp': value, 'victim_vpp': value, 'captured': bool, 'time_s': value},
+                  captured is False if the point reused the capture of the point before.
+
+        Raises:
+            MIXXtalkMeasureSGException:  vpp at the point frequency is 0, or the points need more than
+                                         one stimulus without prepare.
+
+        Examples:
+            xtalk_analyzer.disable()
+            xtalk_analyzer.enable()
+            # stimulus of 1000 Hz on left is output before
+            result = xtalk_analyzer.xtalk_sweep([['left', 'right', 1000]], 192000)
+            print result['matrix']['left']['right']
+
+            def prepare(aggressor, frequency):
+                signal_source.output(aggressor, frequency)
+            result = xtalk_analyzer.xtalk_sweep([['left', 'right', 1000], ['left', 'right', 10000],
+                                                 ['right', 'left', 1000]], 192000, prepare=prepare)
+
+        '''
+        assert len(points) > 0
+        for aggressor, victim, frequency in points:
+            assert aggressor in MIXXtalkMeasureSGDef.CHANNEL
+            assert victim in MIXXtalkMeasureSGDef.CHANNEL
+            assert aggressor != victim
+            assert isinstance(frequency, int) and frequency > 0
+        if prepare is None and len(set((point[0], point[2]) for point in points)) > 1:
+            raise MIXXtalkMeasureSGException(self.dev_name, "Points with more than one aggressor or frequency "
+                                                            "need prepare to output the stimulus")
+
+        config = dict((name, getattr(self, name)) for name in ['sample_rate', 'decimation', 'freq_resolution',
+                                                                  'bandwidth_index', 'harmonic_count',
+                                                                  'freq_point'])
+        measure_selected = self._measure_selected
+        try:
+            return self._xtalk_sweep(points, sample_rate, decimation_type, bandwidth, prepare)
+        finally:
+            if config['decimation'] is not None and config['decimation'] != self.decimation:
+                self._config_decimation(config['decimation'])
+            for name, value in config.items():
+                setattr(self, name, value)
+            if measure_selected is not None:
+                self.measure_select(*measure_selected)
+            self._calculated = set()
+
+    def _xtalk_sweep(self, points, sample_rate, decimation_type, bandwidth, prepare):
+        self.analyze_config(sample_rate, decimation_type, bandwidth, self.harmonic_count, points[0][2])
+
+        frequencies = sorted(set(point[2] for point in points))
+        matrix = dict((aggressor, dict((victim, [None] * len(frequencies))
+                                       for victim in MIXXtalkMeasureSGDef.CHANNEL if victim != aggressor))
+                      for aggressor in MIXXtalkMeasureSGDef.CHANNEL)
+        results = []
+        stimulus = None
+        vpp = {}
+        for aggressor, victim, frequency in points:
+            start = time.time()
+            captured = stimulus != (aggressor, frequency)
+            if captured:
+                if prepare is not None:
+                    prepare(aggressor, frequency)
+                stimulus = (aggressor, frequency)
+                self.freq_point = frequency
+                # left captures both channels and caches right, right is calculated from the cache
+                for channel in MIXXtalkMeasureSGDef.CHANNEL:
+                    self.measure_select(channel, 'xtalk')
+                    self.analyze()
+                    vpp[channel] = self.get_vpp_by_freq()
+
+            if vpp[aggressor] == 0 or vpp[victim] == 0:
+                raise MIXXtalkMeasureSGException(self.dev_name, "The vpp at %d Hz is equal to 0" % frequency)
+            xtalk = MIXXtalkMeasureSGDef.XTALK_DB_AGLORITHM_CONST * math.log10(vpp[victim] / vpp[aggressor])
+            matrix[aggressor][victim][frequencies.index(frequency)] = xtalk
+            results.append({'aggressor': aggressor, 'victim': victim, 'frequency': frequency, 'xtalk': xtalk,
+                            'aggressor_vpp': vpp[aggressor], 'victim_vpp': vpp[victim],
+                            'captured': captured, 'time_s': time.time() - start})
+
+        return {'frequencies': frequencies, 'matrix': matrix, 'points': results}
+
     def _calculate_signal(self):
         '''
         Fundamental wave frequency and ampvpplitude value calculate. This function only use in this module.
@@ -569,22 +739,15 @@ class MIXXtalkMeasureSG(object):
 
         '''
         # each harmonic power's calculate
-        fundamental_power = sum(self.fft_power_data[self.refer_data.k1_index - self.envelope:
-                                                    self.refer_data.k2_index + self.envelope])
+        fundamental_power = self._band_power(self.refer_data.k1_index - self.envelope,
+                                             self.refer_data.k2_index + self.envelope)
         if 0 == fundamental_power:
             raise MIXXtalkMeasureSGException(self.dev_name, "The divisor is equal to 0")
-        if self.bandwidth_index == 'auto':
-            # when bandwidth is auto, best bandwidth is 20000 / decimation
-            bandwidth = MIXXtalkMeasureSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
-            bandwidth_index = int(bandwidth / self.freq_resolution)
-            if bandwidth_index > self.fft_point_number_half:
-                bandwidth_index = self.fft_point_number_half
-        else:
-            bandwidth_index = self.bandwidth_index
+        bandwidth_index = self._get_bandwidth_index()
         # Ignore the first 8 data
         # Nn = ∑((n=2)^(k1 - 3))(AA) + ∑((n=k2 + 3)^(k21 - 3))(AA) + ∑((n=k22 - 3)^(k31 - 3))(AA) +
         #      ∑((n=k32 - 3)^(k41 - 3))(AA) + ∑((n=42 - 3)^(k51 - 3))(AA) + ∑((n=52 - 3)^(N / 2))(AA), AA = An^2
-        all_power = sum(self.fft_power_data[MIXXtalkMeasureSGDef.FFT_POW_IGNORE_BYTE: bandwidth_index])
+        all_power = self._band_power(MIXXtalkMeasureSGDef.FFT_POW_IGNORE_BYTE, bandwidth_index)
         # index = (Nn - A1) / A1
         index = (all_power - fundamental_power) / fundamental_power
         if index <= 0:
@@ -594,6 +757,24 @@ class MIXXtalkMeasureSG(object):
         # the power to amplitude have a 2x relationship in dB algorithm
         self._thdn = MIXXtalkMeasureSGDef.THDN_DB_AGLORITHM_CONST * math.log10(index)
 
+    def _get_bandwidth_index(self):
+        '''
+        Band end index of THD+N and noisefloor. This function only use in this module.
+
+        Returns:
+            int, value, index of fft_power_data.
+
+        '''
+        if self.bandwidth_index == 'auto':
+            # when bandwidth is auto, best bandwidth is 20000 / decimation
+            bandwidth = MIXXtalkMeasureSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
+            bandwidth_index = int(bandwidth / self.freq_resolution)
+            if bandwidth_index > self.fft_point_number_half:
+                bandwidth_index = self.fft_point_number_half
+        else:
+            bandwidth_index = self.bandwidth_index
+        return bandwidth_index
+
     def _calculate_thd(self):
         '''
         THD calculate. This function only use in this module.
@@ -609,8 +790,7 @@ class MIXXtalkMeasureSG(object):
             # find the index of the specified frequency on frequency domain
             k1_index = int(freq_data / self.freq_resolution)
             k2_index = k1_index + 1
-            power_temp = sum(self.fft_power_data[k1_index - self.envelope: k2_index +
-                                                 self.envelope])
+            power_temp = self._band_power(k1_index - self.envelope, k2_index + self.envelope)
             harmonic_power.append(power_temp)
 
         if harmonic_power[0] == 0:
@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 import struct
-import collections
+import bisect
 from datetime import datetime
 from mix.driver.smartgiant.common.module.mixmoduledriver import MIXModuleDriver
 from mix.driver.core.ic.nct75_emulator import NCT75Emulator
+from mix.driver.core.ic.nvmem_cache import NVMemCache, NVMemCacheMixin
 from mix.driver.smartgiant.common.ic.eeprom_emulator import EepromEmulator
+from mix.driver.smartgiant.common.utility.capture_registry import capture_registry
+from mix.driver.smartgiant.common.utility.calibration_lookup import CalibrationLookup
+from mix.driver.smartgiant.common.utility.calibration_cell import parse_calibration_cells
+from mix.driver.smartgiant.common.utility.calibration_snapshot import calibration_checksum
 
 __author__ = 'yuanle@SmartGiant'
 __version__ = '0.2'
@@ -80,6 +85,13 @@ class MIXBoardDef:
     SN_MONTHS = [chr(ord('A') + i) for i in range(12)]
     SN_YEARS = ['A', 'B', 'C', 'D']
 
+    # max bytes of one read_eeprom when loading calibration
+    CAL_READ_CHUNK = 1024
+
+    # eeprom regions read through the NVMemCache: identity and calibration descriptors before
+    # the calibration area, calibration cells are read once per load and kept by the snapshot.
+    NVMEM_CACHE_REGIONS = [[0x00, ICIDef.CAL_AREA_ADDR]]
+
 
 class BoardOperationError(Exception):
     '''When the board have the hardware operation error, use this raise
@@ -116,7 +128,7 @@ def capacity_to_bytes(kbits):
     return kbits * 1024 / 8
 
 
-class MIXBoard(MIXModuleDriver):
+class MIXBoard(MIXModuleDriver, NVMemCacheMixin):
     '''
     MIXBoard function class, this is all board parent
 
@@ -144,7 +156,10 @@ class MIXBoard(MIXModuleDriver):
                       'config_calibration_checksum',
                       'config_calibration_range',
                       'read_calibration_item', 'write_calibration_item', 'get_ranges_name',
-                      'set_production_mode'
+                      'set_production_mode',
+                      'capture_info', 'capture_list', 'capture_release', 'capture_slice',
+                      'capture_envelope', 'capture_histogram', 'capture_statistics',
+                      'get_nvmem_cache_statistics', 'invalidate_nvmem_cache'
                       ] + MIXModuleDriver.rpc_public_api
 
     calibration_info = {
@@ -168,6 +183,11 @@ class MIXBoard(MIXModuleDriver):
 
     _module = 'MIX'
 
+    # CalibrationSnapshot instance shared by all boards, None to always read calibration from eeprom
+    calibration_snapshot = None
+    # eeprom reads go through a NVMemCache, False to always read the device
+    use_nvmem_cache = True
+
     def __init__(self, eeprom=None, temperature_device=None, cal_table={}, range_table={}):
         self._legacy_cal_table = cal_table
         self._range_table = range_table
@@ -176,6 +196,8 @@ class MIXBoard(MIXModuleDriver):
             self._eeprom_device = EepromEmulator("eeprom_emulator")
         else:
             self._eeprom_device = eeprom
+        if self.use_nvmem_cache:
+            self._eeprom_device = NVMemCache(self._eeprom_device, regions=MIXBoardDef.NVMEM_CACHE_REGIONS)
         if temperature_device is None:
             self._temperature_device = NCT75Emulator("nct75_emulatur")
         else:
@@ -185,6 +207,11 @@ class MIXBoard(MIXModuleDriver):
         self._range_err_table = {}
         self._cal_common_error = None
         self._product_cal_flag = False
+        # cal_pipe cache, {unit_index: cell} and {levels key: table}
+        self._cal_cell_cache = {}
+        self._cal_pipe_tables = {}
+        # calibrate_array lookups, {range_name: CalibrationLookup}
+        self._calibration_lookups = {}
 
     def version(self):
         '''
@@ -566,6 +593,7 @@ class MIXBoard(MIXModuleDriver):
         data = s.unpack(pack_data)
         address = self.calibration_info["unit_start_addr"] + 13 * unit_index
         self.write_eeprom(address, data)
+        self._invalidate_cal_pipe_cache()
 
     def legacy_read_calibration_cell(self, unit_index):
         '''
@@ -626,6 +654,7 @@ class MIXBoard(MIXModuleDriver):
         data = [0xff for i in range(13)]
         address = self.calibration_info["unit_start_addr"] + 13 * unit_index
         self.write_eeprom(address, data)
+        self._invalidate_cal_pipe_cache()
 
     def get_calibration_mode(self):
         '''
@@ -657,6 +686,7 @@ class MIXBoard(MIXModuleDriver):
         '''
         assert mode in ["cal", "raw"]
         self._cal_mode_flag = self.calibration_info["mode"][mode]
+        self._invalidate_cal_pipe_cache()
 
     def is_use_cal_data(self):
         '''
@@ -716,64 +746,70 @@ class MIXBoard(MIXModuleDriver):
         if fun_cal_info == {} or fun_cal_info is None:
             return raw_data
 
-        # select calibration limit data format
-        cal_info_mode = None
-        for key, value in fun_cal_info.items():
-            if 'limit' in value.keys():
-                cal_info_mode = 'config'
-            else:
-                cal_info_mode = 'memory'
-
-            break
-
-        if cal_info_mode == 'memory':
-            # read section cal data from eeprom
-            cal_info = collections.OrderedDict()
-            for i in range(0, len(fun_cal_info)):
-                level = "level%d" % (i + 1)
-                index = fun_cal_info[level]["unit_index"]
-                result = self.legacy_read_calibration_cell(index)
-                if not result['is_use']:
-                    break
-                cal_info[level] = result
+        table = self._get_cal_pipe_table(fun_cal_info)
+        bounds = table['bounds']
+        if table['sorted']:
+            level = bisect.bisect_left(bounds, raw_data)
+        else:
+            level = 0
+            while level < len(bounds) and not raw_data <= bounds[level]:
+                level += 1
+        if level == len(bounds):
+            # above all levels, use the last one
+            level -= 1
+        if level < 0 or not table['is_use'][level]:
+            return raw_data
 
-            # select cal data
-            level = None
-            for key, value in cal_info.items():
-                if raw_data <= value["threshold"]:
-                    level = key
-                    break
-            if level is None:
-                if len(cal_info) > 0:
-                    level = "level%d" % (len(cal_info))
-                else:
-                    return raw_data
-            cal_datas = cal_info[level]
+        calibrated_result = table['gain'][level] * \
+            raw_data + table['offset'][level]
+        return calibrated_result
 
-        else:
-            # select cal data
-            level = None
-            for i in range(0, len(fun_cal_info)):
-                key = "level%d" % (i + 1)
-                if raw_data <= fun_cal_info[key]["limit"][0]:
-                    level = key
-                    break
+    def _invalidate_cal_pipe_cache(self):
+        self._cal_cell_cache = {}
+        self._cal_pipe_tables = {}
+
+    def _read_cached_calibration_cell(self, unit_index):
+        if unit_index not in self._cal_cell_cache:
+            self._cal_cell_cache[unit_index] = self.legacy_read_calibration_cell(unit_index)
+        return self._cal_cell_cache[unit_index]
 
-            if level is None:
-                if len(fun_cal_info) > 0:
-                    level = "level%d" % (len(fun_cal_info))
+    def _get_cal_pipe_table(self, fun_cal_info):
+        '''
+        Get the lookup table of cal_pipe levels, cells are read from eeprom only the first time.
 
-            # read cal data from eeprom
-            index = fun_cal_info[level]["unit_index"]
-            cal_datas = self.legacy_read_calibration_cell(index)
+        Returns:
+            dict, {'bounds': list, 'sorted': boolean, 'gain': list, 'offset': list, 'is_use': list},
+                  the first level whose bound >= raw data is used.
 
-        if cal_datas['is_use']:
-            calibrated_result = cal_datas["gain"] * \
-                raw_data + cal_datas["offset"]
+        '''
+        levels = ["level%d" % (i + 1) for i in range(len(fun_cal_info))]
+        # select calibration limit data format
+        config_mode = 'limit' in fun_cal_info[levels[0]]
+        if config_mode:
+            key = tuple((fun_cal_info[level]["unit_index"], fun_cal_info[level]["limit"][0]) for level in levels)
         else:
-            calibrated_result = raw_data
+            key = tuple(fun_cal_info[level]["unit_index"] for level in levels)
+        if key in self._cal_pipe_tables:
+            return self._cal_pipe_tables[key]
 
-        return calibrated_result
+        if config_mode:
+            bounds = [limit for _, limit in key]
+            cells = [self._read_cached_calibration_cell(index) for index, _ in key]
+        else:
+            # levels end at the first unused cell, thresholds are in the cells
+            cells = []
+            for index in key:
+                cell = self._read_cached_calibration_cell(index)
+                if not cell['is_use']:
+                    break
+                cells.append(cell)
+            bounds = [cell['threshold'] for cell in cells]
+
+        table = {'bounds': bounds, 'sorted': bounds == sorted(bounds),
+                 'gain': [cell['gain'] for cell in cells], 'offset': [cell['offset'] for cell in cells],
+                 'is_use': [cell['is_use'] for cell in cells]}
+        self._cal_pipe_tables[key] = table
+        return table
 
     def set_production_mode(self, state="enable"):
         '''
@@ -863,6 +899,18 @@ class MIXBoard(MIXModuleDriver):
             self._cal_common_error = ICIException(str(e))
             return "done"
 
+        snapshot_key = self._get_calibration_snapshot_key(cal_index)
+        if snapshot_key is not None and self.calibration_snapshot.load_into(self, snapshot_key, ICIException):
+            return "done"
+
+        # blob address and size are read once, for the blob read and the range positions
+        try:
+            base_addr = super(MIXBoard, self)._get_cal_address(cal_index)
+            cal_size = super(MIXBoard, self)._get_cal_size(cal_index)
+        except Exception as e:
+            self._cal_common_error = e
+            return "done"
+
         if not self._product_cal_flag:
             try:
                 read_data = super(MIXBoard, self).read_calibration_cell(cal_index)
@@ -870,12 +918,7 @@ class MIXBoard(MIXModuleDriver):
                 self._cal_common_error = e
                 return "done"
         else:
-            start_address = self._get_cal_address(cal_index)
-            data_size = self._get_cal_size(cal_index)
-            read_data = self.read_nvram(start_address, data_size)
-
-        base_addr = super(MIXBoard, self)._get_cal_address(cal_index)
-        cal_size = super(MIXBoard, self)._get_cal_size(cal_index)
+            read_data = self.read_nvram(base_addr, cal_size)
 
         for range_name, index in self._range_table.items():
             self._calibration_table[range_name] = []
@@ -897,25 +940,70 @@ class MIXBoard(MIXModuleDriver):
                 continue
             count = read_data[count_pos]
             cal_pos = count_pos + ICIDef.CAL_COUNT_LEN
-            cal_len = count * ICIDef.CAL_CELL_LEN
-            cal_data = read_data[cal_pos:(cal_pos + cal_len)]
+            self._calibration_table[range_name] = parse_calibration_cells(read_data, cal_pos, count,
+                                                                          ICIDef.CAL_SAVE_FLAG)
+        if snapshot_key is not None:
+            self.calibration_snapshot.save_from(self, snapshot_key)
+        return "done"
 
-            for i in range(count):
-                item_pos = i * ICIDef.CAL_CELL_LEN
-                data = cal_data[item_pos:(item_pos + ICIDef.CAL_CELL_LEN)]
+    def _get_calibration_snapshot_key(self, cal_index):
+        '''
+        Get the snapshot key of ICI calibration, serial number and checksum of the calibration header.
 
-                s = struct.Struct('16B')
-                pack_data = s.pack(*data)
+        The header holds the date time, address, size and sha1 of the calibration blob, so any
+        new calibration written with its checksum gives a new key. Production mode always reads
+        the blob because it is loaded before the checksum is configured.
 
-                s = struct.Struct('3f4B')
-                result = s.unpack(pack_data)
-                if result[3] != ICIDef.CAL_SAVE_FLAG:
-                    self._calibration_table[range_name].append({'gain': 1.0, "offset": 0.0,
-                                                                "threshold": 0.0, "is_use": False})
-                else:
-                    self._calibration_table[range_name].append({"gain": result[0], "offset": result[1],
-                                                                "threshold": result[2], "is_use": True})
-        return "done"
+        Args:
+            cal_index:  int, (>=0), calibration index.
+
+        Returns:
+            tuple/None, (serial_number, checksum), None if snapshot is not used.
+
+        '''
+        if self.calibration_snapshot is None or self._product_cal_flag:
+            return None
+        try:
+            serial_number = super(MIXBoard, self).read_serial_number().rstrip('\x00 ')
+            header = self.read_nvram(self.FIRST_CAL_DATETIME_ADDR + cal_index * self.CAL_HEADER_SIZE,
+                                     self.CAL_HEADER_SIZE)
+        except Exception:
+            return None
+        # blank or erased eeprom has no usable serial number
+        if not serial_number or any(ord(c) < 0x20 or ord(c) > 0x7E for c in serial_number):
+            return None
+        checksum = calibration_checksum(self.__class__.__name__, cal_index, list(bytearray(header)),
+                                        sorted(self._range_table.items()))
+        return serial_number, checksum
+
+    def _read_cal_image(self, image, start, stop):
+        '''
+        Extend image to cover eeprom address [start, stop), only the missing bytes are read.
+
+        Args:
+            image:  dict, {'start': int, 'data': bytearray}, start is None for an empty image.
+            start:  int, first address.
+            stop:   int, end address, excluded.
+
+        '''
+        if image['start'] is None:
+            image['start'] = start
+            image['data'] = self._read_eeprom_span(start, stop)
+            return
+        end = image['start'] + len(image['data'])
+        if start < image['start']:
+            image['data'] = self._read_eeprom_span(start, image['start']) + image['data']
+            image['start'] = start
+        if stop > end:
+            image['data'] += self._read_eeprom_span(end, stop)
+
+    def _read_eeprom_span(self, start, stop):
+        data = bytearray()
+        while start < stop:
+            count = min(stop - start, MIXBoardDef.CAL_READ_CHUNK)
+            data += bytearray(self.read_eeprom(start, count))
+            start += count
+        return data
 
     def load_legacy_ici_calibration(self):
         '''
@@ -932,45 +1020,57 @@ class MIXBoard(MIXModuleDriver):
             self._cal_common_error = e
             return "done"
 
+        area_start = ICIDef.CAL_AREA_ADDR + ICIDef.CAL_VERSION_SIZE
+        area_end = ICIDef.CAL_AREA_ADDR + ICIDef.CAL_AREA_SIZE
+        # the calibration area is read into an image in a few sequential reads:
+        # range address table, then item counts, then cal cells
+        image = {'start': None, 'data': bytearray()}
+
+        range_addrs = {}
         for range_name, index in self._range_table.items():
             self._calibration_table[range_name] = []
             # get range address
             addr = base_addr + index * ICIDef.CAL_RANGE_LEN
-            if addr < ICIDef.CAL_AREA_ADDR + ICIDef.CAL_VERSION_SIZE or \
-               addr >= ICIDef.CAL_AREA_ADDR + ICIDef.CAL_AREA_SIZE:
+            if addr < area_start or addr >= area_end:
                 continue
-            data = self.read_eeprom(addr, ICIDef.CAL_RANGE_LEN)
+            range_addrs[range_name] = addr
+        if not range_addrs:
+            return "done"
+        self._read_cal_image(image, min(range_addrs.values()), max(range_addrs.values()) + ICIDef.CAL_RANGE_LEN)
+
+        count_addrs = {}
+        for range_name, addr in range_addrs.items():
+            pos = addr - image['start']
             # get item count address
-            addr = (data[0] << 8) | data[1]
-            if addr < ICIDef.CAL_AREA_ADDR + ICIDef.CAL_VERSION_SIZE or \
-               addr >= ICIDef.CAL_AREA_ADDR + ICIDef.CAL_AREA_SIZE:
+            addr = (image['data'][pos] << 8) | image['data'][pos + 1]
+            if addr < area_start or addr >= area_end:
                 continue
-            count = self.read_eeprom(addr, 1)[0]
+            count_addrs[range_name] = addr
+        if not count_addrs:
+            return "done"
+        self._read_cal_image(image, min(count_addrs.values()), max(count_addrs.values()) + ICIDef.CAL_COUNT_LEN)
+
+        cells = {}
+        for range_name, addr in count_addrs.items():
+            count = image['data'][addr - image['start']]
             # get cal cell address
             addr += ICIDef.CAL_COUNT_LEN
-            if addr < ICIDef.CAL_AREA_ADDR + ICIDef.CAL_VERSION_SIZE or \
-               addr >= ICIDef.CAL_AREA_ADDR + ICIDef.CAL_AREA_SIZE:
+            if addr < area_start or addr >= area_end:
                 self._cal_common_error = ICIException("Range {} cell address 0x{:x} "
                                                       "is invalid".format(range_name, addr))
                 continue
-            if addr + count > ICIDef.CAL_AREA_ADDR + ICIDef.CAL_AREA_SIZE:
+            if addr + count > area_end:
                 self._cal_common_error = ICIException("Range {} cell count {} is invalid".format(range_name, count))
                 continue
+            cells[range_name] = (addr, count)
+        if not cells:
+            return "done"
+        self._read_cal_image(image, min(addr for addr, _ in cells.values()),
+                             max(addr + count * ICIDef.CAL_CELL_LEN for addr, count in cells.values()))
 
-            for i in range(count):
-                data = self.read_eeprom(addr, ICIDef.CAL_CELL_LEN)
-                addr = addr + ICIDef.CAL_CELL_LEN
-                s = struct.Struct('16B')
-                pack_data = s.pack(*data)
-
-                s = struct.Struct('3f4B')
-                result = s.unpack(pack_data)
-                if result[3] != ICIDef.CAL_SAVE_FLAG:
-                    self._calibration_table[range_name].append({'gain': 1.0, "offset": 0.0,
-                                                                "threshold": 0.0, "is_use": False})
-                else:
-                    self._calibration_table[range_name].append({"gain": result[0], "offset": result[1],
-                                                                "threshold": result[2], "is_use": True})
+        for range_name, (addr, count) in cells.items():
+            self._calibration_table[range_name] = parse_calibration_cells(image['data'], addr - image['start'],
+                                                                          count, ICIDef.CAL_SAVE_FLAG)
         return "done"
 
     def load_calibration(self):
@@ -1026,6 +1126,38 @@ class MIXBoard(MIXModuleDriver):
             level = i
         return items[level]['gain'] * data + items[level]['offset']
 
+    def calibrate_array(self, range_name, samples):
+        '''
+        This function is used to calibrate many data of one range, result is the same as calibrate() of each.
+
+        Args:
+            range_name:     string, which range used to do calibration
+            samples:        list/numpy.ndarray, raw data which need to be calibrated.
+
+        Returns:
+            list/numpy.ndarray:     calibrated data, numpy.ndarray only for numpy.ndarray samples.
+
+        Examples:
+            volts = board.calibrate_array('DCV', [1.1, 1.2, 1.3])
+        '''
+        if not self.is_use_cal_data():
+            return samples
+
+        if self._cal_common_error is not None:
+            raise self._cal_common_error
+
+        assert range_name in self._calibration_table
+
+        items = self._calibration_table[range_name]
+        if len(items) == 0:
+            return samples
+
+        if range_name in self._range_err_table:
+            raise self._range_err_table[range_name]
+
+        lookup = CalibrationLookup.for_table(self._calibration_lookups, range_name, items)
+        return lookup.calibrate_array(samples)
+
     def eeprom_read_string(self, addr, rd_len):
         '''
         Read string from eeprom specific address.
@@ -1065,6 +1197,99 @@ class MIXBoard(MIXModuleDriver):
         self.write_eeprom(addr, data)
         return "done"
 
+    def capture_info(self, handle):
+        '''
+        Get metadata of a capture kept on the server, see CaptureRegistry.
+
+        Args:
+            handle:     int, capture handle returned by the capture api.
+
+        Returns:
+            dict, capture metadata, like {'handle': 1, 'length': 4096, 'unit': 'mV', ...}.
+        '''
+        return capture_registry.info(handle)
+
+    def capture_list(self):
+        '''
+        Get metadata of all captures kept on the server and memory usage.
+
+        Returns:
+            dict, {'captures': list, 'memory_used': int, 'memory_budget': int, 'evicted': int}.
+        '''
+        return capture_registry.list()
+
+    def capture_release(self, handle):
+        '''
+        Release a capture kept on the server.
+
+        Args:
+            handle:     int, capture handle.
+
+        Returns:
+            string, "done", api execution successful.
+        '''
+        capture_registry.release(handle)
+        return "done"
+
+    def capture_slice(self, handle, start=0, stop=None, step=1):
+        '''
+        Get a window of a capture kept on the server.
+
+        Args:
+            handle:     int, capture handle.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+            step:       int, default 1, index step.
+
+        Returns:
+            list, values.
+        '''
+        return capture_registry.slice(handle, start, stop, step)
+
+    def capture_envelope(self, handle, points=1000, start=0, stop=None):
+        '''
+        Get min/max envelope of a capture kept on the server.
+
+        Args:
+            handle:     int, capture handle.
+            points:     int, default 1000, bucket count.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+
+        Returns:
+            dict, {'min': list, 'max': list, 'index': list}.
+        '''
+        return capture_registry.envelope(handle, points, start, stop)
+
+    def capture_histogram(self, handle, bins=100, value_range=None):
+        '''
+        Get histogram of a capture kept on the server.
+
+        Args:
+            handle:         int, capture handle.
+            bins:           int, default 100, bin count.
+            value_range:    list/None, default None, [low, high], min and max of capture if None.
+
+        Returns:
+            dict, {'counts': list, 'edges': list}.
+        '''
+        return capture_registry.histogram(handle, bins, value_range)
+
+    def capture_statistics(self, handle, start=0, stop=None):
+        '''
+        Get statistics of a capture kept on the server.
+
+        Args:
+            handle:     int, capture handle.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+
+        Returns:
+            dict, {'count': int, 'mean': float, 'rms': float, 'std': float, 'min': float, 'max': float,
+                   'peak': float, 'vpp': float}.
+        '''
+        return capture_registry.statistics(handle, start, stop)
+
     def read_capacity(self):
         '''
         Read Storage size from eeprom
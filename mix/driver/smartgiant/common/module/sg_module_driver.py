@@ -5,7 +5,11 @@ from datetime import datetime
 from mix.driver.core.module.mixmodulehelper import BytesHelper
 from mix.driver.core.module.mixmoduledriver import MIXModuleDriver
 from mix.driver.core.module.mixmodulenvmem import NVMemFieldNames
+from mix.driver.core.ic.nvmem_cache import NVMemCache, NVMemCacheMixin
 from mix.driver.smartgiant.common.module.mixmoduleerror import (InvalidCalibrationIndex, InvalidCalibrationCell)
+from mix.driver.smartgiant.common.utility.calibration_lookup import CalibrationLookup
+from mix.driver.smartgiant.common.utility.calibration_cell import parse_calibration_cells
+from mix.driver.smartgiant.common.utility.calibration_snapshot import calibration_checksum
 
 __author__ = 'yuanle@SmartGiant'
 __version__ = '0.1'
@@ -67,7 +71,7 @@ def leastsq(x, y):
     return k, b
 
 
-class SGModuleDriver(MIXModuleDriver):
+class SGModuleDriver(MIXModuleDriver, NVMemCacheMixin):
     '''
     SGModuleDriver function class, this is all board parent
 
@@ -94,21 +98,42 @@ class SGModuleDriver(MIXModuleDriver):
                       'write_module_calibration',
                       # function defined by SG
                       'read_calibration_item', 'get_ranges_name', 'read_temperature',
-                      'enable_calibration', 'disable_calibration', 'get_active_calibration_index'
+                      'enable_calibration', 'disable_calibration', 'get_active_calibration_index',
+                      'get_nvmem_cache_statistics', 'invalidate_nvmem_cache'
                       ] + MIXModuleDriver.rpc_public_api
 
+    # CalibrationSnapshot instance shared by all modules, None to always read calibration from nvmem
+    calibration_snapshot = None
+    # nvmem reads go through a NVMemCache, False to always read the device
+    use_nvmem_cache = True
+
     def __init__(self, eeprom=None, temperature_device=None, range_table={}):
         self._calibration_table = {}
+        if eeprom is not None and self.use_nvmem_cache:
+            eeprom = NVMemCache(eeprom)
         self._eeprom_device = eeprom
         self._temperature_device = temperature_device
         self._cal_mode_flag = 'cal'
 
         self._range_err_table = {}
         self._cal_common_error = None
+        self._calibration_lookups = {}
         super(SGModuleDriver, self).__init__()
+        self._set_nvmem_cache_regions()
         self._range_table = self._get_range_table(range_table)
         self.load_calibration()
 
+    def _set_nvmem_cache_regions(self):
+        # cache the read only area and the calibration headers, they are before the first
+        # calibration data; calibration data is read once per load and kept by the snapshot.
+        if not isinstance(self._eeprom_device, NVMemCache):
+            return
+        if self.nvmem.num_cals > 0:
+            end = min(self.nvmem[NVMemFieldNames.CAL_DATA_START_ADDR])
+        else:
+            end = self.nvmem.map[NVMemFieldNames.FIRST_BASE_CAL_FIELD][0]
+        self._eeprom_device.set_regions([[0x00, end]])
+
     def _get_range_table(self, range_table):
         if isinstance(range_table, dict):
             return range_table
@@ -238,6 +263,11 @@ class SGModuleDriver(MIXModuleDriver):
         else:
             cal_index = calibration_cell_index
 
+        snapshot_key = self._get_calibration_snapshot_key(cal_index)
+        if snapshot_key is not None and self.calibration_snapshot.load_into(self, snapshot_key, ICIException):
+            self.cal_index = cal_index
+            return "done"
+
         try:
             read_data = self.read_calibration_cell(cal_index)
         except Exception as e:
@@ -270,25 +300,40 @@ class SGModuleDriver(MIXModuleDriver):
                 continue
             count = read_data[count_pos]
             cal_pos = count_pos + CalibrationDef.CAL_COUNT_LEN
-            cal_len = count * CalibrationDef.CAL_CELL_LEN
-            cal_data = read_data[cal_pos:(cal_pos + cal_len)]
+            self._calibration_table[range_name] = parse_calibration_cells(read_data, cal_pos, count,
+                                                                          CalibrationDef.CAL_SAVE_FLAG)
+        if snapshot_key is not None:
+            self.calibration_snapshot.save_from(self, snapshot_key)
+        return "done"
 
-            for i in range(count):
-                item_pos = i * CalibrationDef.CAL_CELL_LEN
-                data = cal_data[item_pos:(item_pos + CalibrationDef.CAL_CELL_LEN)]
+    def _get_calibration_snapshot_key(self, cal_index):
+        '''
+        Get the snapshot key of calibration, serial number and checksum of the calibration header.
 
-                s = struct.Struct('16B')
-                pack_data = s.pack(*data)
+        The header holds the date time, address, size and sha1 of the calibration blob, so any
+        new calibration written with write_calibration_cell gives a new key.
 
-                s = struct.Struct('3f4B')
-                result = s.unpack(pack_data)
-                if result[3] != CalibrationDef.CAL_SAVE_FLAG:
-                    self._calibration_table[range_name].append({'gain': 1.0, "offset": 0.0,
-                                                                "threshold": 0.0, "is_use": False})
-                else:
-                    self._calibration_table[range_name].append({"gain": result[0], "offset": result[1],
-                                                                "threshold": result[2], "is_use": True})
-        return "done"
+        Args:
+            cal_index:  int, (>=0), calibration index.
+
+        Returns:
+            tuple/None, (serial_number, checksum), None if snapshot is not used.
+
+        '''
+        if self.calibration_snapshot is None:
+            return None
+        try:
+            serial_number = self.read_serial_number().rstrip('\x00 ')
+            header = bytearray(self.nvmem.get_cal_header_bytes(cal_index)) + \
+                bytearray(self.nvmem[NVMemFieldNames.CAL_CHKSUM][cal_index])
+        except Exception:
+            return None
+        # blank or erased nvmem has no usable serial number
+        if not serial_number or any(ord(c) < 0x20 or ord(c) > 0x7E for c in serial_number):
+            return None
+        checksum = calibration_checksum(self.__class__.__name__, cal_index, list(header),
+                                        sorted(self._range_table.items()))
+        return serial_number, checksum
 
     def calibrate(self, range_name, data):
         '''
@@ -326,6 +371,37 @@ class SGModuleDriver(MIXModuleDriver):
 
         return items[level]['gain'] * data + items[level]['offset']
 
+    def calibrate_array(self, range_name, samples):
+        '''
+        This function is used to calibrate many data of one range, result is the same as calibrate() of each.
+
+        Args:
+            range_name:     string, which range used to do calibration
+            samples:        list/numpy.ndarray, raw data which need to be calibrated.
+
+        Returns:
+            list/numpy.ndarray:     calibrated data, numpy.ndarray only for numpy.ndarray samples.
+
+        Examples:
+            volts = board.calibrate_array('DCV', [1.1, 1.2, 1.3])
+        '''
+        if not self.is_use_cal_data():
+            return samples
+
+        if self._cal_common_error is not None:
+            raise self._cal_common_error
+
+        if range_name in self._range_err_table:
+            raise self._range_err_table[range_name]
+
+        assert range_name in self._calibration_table
+        items = self._calibration_table[range_name]
+        if len(items) == 0:
+            return samples
+
+        lookup = CalibrationLookup.for_table(self._calibration_lookups, range_name, items)
+        return lookup.calibrate_array(samples)
+
     def eeprom_read_string(self, addr, rd_len):
         '''
         Read string from eeprom specific address.
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+import math
+
+from mix.driver.smartgiant.common.ipcore.mix_fftanalyzer_sg import MIXFftAnalyzerSGDef
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class AudioAnalyzerDef:
+    # 4 term nuttall window with continuous first derivative, the window of the FFT analyzer ip,
+    # MIXFftAnalyzerSGDef.ALPHA/NUTTAL_COEFFICIENT_* are its interpolation coefficients
+    WINDOW_COEFFICIENTS = (0.338946, 0.481973, 0.161054, 0.018027)
+    # the FFT analyzer ip clears the DC bins
+    DC_BINS = 5
+    ENVELOPE_MIN = 4
+    ENVELOPE_16K = 8
+    ENOB_OFFSET_DB = 1.76
+    ENOB_DB_PER_BIT = 6.02
+    DB_CONST = 10
+
+
+class AudioAnalyzerException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class AudioAnalyzer(object):
+    '''
+    Host side audio analyzer on raw sample arrays.
+
+    The same algorithm as MIXFftAnalyzerSG runs on samples uploaded by DMA:
+    Nuttall windowed FFT, fundamental from the two largest bins with the Nuttall
+    correction polynomial, harmonic and noise power from bin envelopes. The power
+    spectrum is scaled like the FFT RAM of the ip, so results on the same data
+    match the FPGA, and analyze_spectrum() takes the FFT RAM data itself.
+    Besides vpp, frequency, THD and THD+N it gives SNR, SINAD, ENOB, noise and
+    harmonic levels, for any FFT size. All channels are analyzed in one
+    vectorized pass. numpy is required.
+
+    Args:
+        sample_rate:        int/float, unit Hz, sample rate of the analyzed data.
+        fft_size:           int/None, default 8192, FFT points, even, data length is used if None.
+        bandwidth:          int/string, default 'auto', unit Hz, noise bandwidth, 'auto' is 20000 Hz / decimation.
+        harmonic_count:     int, [1~10], default 5, harmonics for THD, fundamental included.
+        decimation:         int, [1~255], default 1, decimation of the data, only for 'auto' bandwidth.
+        envelope:           int/None, default None, bins on each side of a tone,
+                            8 for 16K points and more, else 4, like the ip.
+
+    Examples:
+        codec = SampleCodec(4, 8, 24, True, scale=1.0 / (1 << 24))
+        analyzer = AudioAnalyzer(192000, 8192, 20000, 5)
+        result = analyzer.analyze(codec.decode(data, data_num))
+        print(result['vpp'], result['frequency'], result['thdn'], result['snr'], result['enob'])
+
+        # one result per channel
+        results = analyzer.analyze(codec.decode_channels(data, data_num))
+
+    '''
+
+    def __init__(self, sample_rate, fft_size=MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_8K, bandwidth='auto',
+                 harmonic_count=5, decimation=1, envelope=None):
+        if np is None:
+            raise AudioAnalyzerException('numpy is required by audio analyzer')
+        assert sample_rate > 0
+        assert fft_size is None or (fft_size > 0 and fft_size % 2 == 0)
+        assert bandwidth == 'auto' or bandwidth > 0
+        assert MIXFftAnalyzerSGDef.HARMONIC_COUNT_MIN <= harmonic_count <= MIXFftAnalyzerSGDef.HARMONIC_COUNT_MAX
+        assert MIXFftAnalyzerSGDef.DECIMATION_MIN <= decimation <= MIXFftAnalyzerSGDef.DECIMATION_MAX
+        assert envelope is None or envelope >= 0
+
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.bandwidth = bandwidth
+        self.harmonic_count = harmonic_count
+        self.decimation = decimation
+        self.envelope = envelope
+        self._windows = {}
+
+    def window(self, size):
+        '''
+        Get the analysis window of size points.
+
+        Args:
+            size:   int, window points.
+
+        Returns:
+            numpy.ndarray, periodic Nuttall window.
+
+        '''
+        if size not in self._windows:
+            phase = 2 * np.pi * np.arange(size) / size
+            window = np.zeros(size)
+            for i, coefficient in enumerate(AudioAnalyzerDef.WINDOW_COEFFICIENTS):
+                window += (-1) ** i * coefficient * np.cos(i * phase)
+            self._windows[size] = window
+        return self._windows[size]
+
+    def spectrum(self, samples):
+        '''
+        Get the power spectrum of samples, scaled like the FFT RAM of the ip.
+
+        Args:
+            samples:    list/numpy.ndarray, 1-D samples of one channel, or 2-D, one row per channel.
+
+        Returns:
+            numpy.ndarray, fft_size / 2 power bins, one row per channel for 2-D samples.
+
+        Raises:
+            AudioAnalyzerException:     samples are less than fft_size.
+
+        '''
+        data = np.asarray(samples, dtype=np.float64)
+        size = self.fft_size or data.shape[-1]
+        if data.shape[-1] < size:
+            raise AudioAnalyzerException('%d samples are less than fft size %d' % (data.shape[-1], size))
+        data = data[..., :size]
+        spectrum = np.fft.rfft(data * self.window(size), axis=-1)[..., :size // 2]
+        # the ip amplitude is n times of the numpy one
+        return np.square(np.abs(spectrum) * size)
+
+    def analyze(self, samples):
+        '''
+        Analyze samples.
+
+        Args:
+            samples:    list/numpy.ndarray/dict, 1-D samples of one channel, 2-D with one row per channel,
+                        or {channel: samples} like SampleCodec.decode_channels() returns.
+                        The first fft_size samples are analyzed.
+
+        Returns:
+            dict, result of one channel, see analyze_spectrum().
+            list, results of 2-D samples, one per row.
+            dict, {channel: result} of dict samples.
+
+        Raises:
+            AudioAnalyzerException:     samples are not enough, or no signal is found.
+
+        '''
+        if isinstance(samples, dict):
+            channels = sorted(samples.keys())
+            data = [np.asarray(samples[channel], dtype=np.float64) for channel in channels]
+            size = self.fft_size or min(len(values) for values in data)
+            power = self.spectrum([values[:size] for values in data])
+            return dict(zip(channels, self._analyze(power)))
+
+        power = self.spectrum(samples)
+        if power.ndim == 1:
+            return self._analyze(power[np.newaxis])[0]
+        return self._analyze(power)
+
+    def analyze_spectrum(self, power):
+        '''
+        Analyze a power spectrum, like the FFT RAM data of MIXFftAnalyzerSG.
+
+        Args:
+            power:  list/numpy.ndarray, fft points / 2 power bins, or 2-D with one row per channel.
+
+        Returns:
+            dict, {'vpp': float, 'frequency': float, 'thd': float/None, 'thdn': float, 'snr': float,
+                   'sinad': float, 'enob': float, 'noisefloor': float, 'noise': float,
+                   'harmonics': list}.
+                  vpp is in unit of the samples, frequency in Hz, thd, thdn, snr and sinad in dB,
+                  thd is None when harmonic_count is 1. noisefloor is the ip noise floor of all band
+                  power, noise is the same without fundamental and harmonics.
+                  harmonics are {'order': int, 'frequency': float, 'vpp': float, 'level': float}
+                  from the fundamental on, level in dB relative to the fundamental power.
+            list, results of 2-D power, one per row.
+
+        Raises:
+            AudioAnalyzerException:     no signal is found.
+
+        '''
+        power = np.array(power, dtype=np.float64)
+        if power.ndim == 1:
+            return self._analyze(power[np.newaxis])[0]
+        return self._analyze(power)
+
+    def analyze_tones(self, samples, frequencies):
+        '''
+        Analyze a multi-tone signal at known frequencies.
+
+        Args:
+            samples:        list/numpy.ndarray, 1-D samples of one channel, or 2-D, one row per channel.
+            frequencies:    list, unit Hz, tone frequencies.
+
+        Returns:
+            dict, {'tones': list, 'noise_distortion': float}, tones are {'frequency': float, 'vpp': float,
+                  'level': float}, frequency is the measured one and level is in dB relative to all tones.
+                  noise_distortion is the band power out of tone envelopes in dB relative to all tones.
+            list, results of 2-D samples, one per row.
+
+        Raises:
+            AudioAnalyzerException:     samples are not enough, or no tone power.
+
+        '''
+        assert len(frequencies) > 0
+        power = self.spectrum(samples)
+        single = power.ndim == 1
+        power = power.reshape(-1, power.shape[-1])
+        size = power.shape[1] * 2
+        power[:, :AudioAnalyzerDef.DC_BINS] = 0
+        resolution = self.sample_rate / size
+        envelope = self._envelope(size)
+
+        k1 = np.floor(np.asarray(frequencies, dtype=np.float64) / resolution).astype(np.int64)
+        k1 = np.tile(k1, (power.shape[0], 1))
+        vpp, frequency = self._correction(power, k1, size)
+        tone_power = self._band_power(power, k1 - envelope, k1 + 1 + envelope)
+        total = tone_power.sum(axis=1)
+        if np.any(total <= 0):
+            raise AudioAnalyzerException('tone power is zero')
+        band = self._band_mask(power, size)
+        band[self._envelope_mask(power, k1, envelope)] = False
+        rest = (power * band).sum(axis=1)
+
+        results = []
+        for ch in range(power.shape[0]):
+            tones = [{'frequency': float(frequency[ch, i]), 'vpp': float(vpp[ch, i]),
+                      'level': self._db(tone_power[ch, i] / total[ch])} for i in range(len(frequencies))]
+            results.append({'tones': tones, 'noise_distortion': self._db(rest[ch] / total[ch])})
+        return results[0] if single else results
+
+    def _envelope(self, size):
+        if self.envelope is not None:
+            return self.envelope
+        if size >= MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_16K:
+            return AudioAnalyzerDef.ENVELOPE_16K
+        return AudioAnalyzerDef.ENVELOPE_MIN
+
+    def _bandwidth_index(self, size):
+        resolution = self.sample_rate / size
+        if self.bandwidth == 'auto':
+            bandwidth = MIXFftAnalyzerSGDef.BEST_BANDWIDTH_FOR_THDN / self.decimation
+        else:
+            bandwidth = self.bandwidth
+        return min(int(bandwidth / resolution), size // 2)
+
+    def _db(self, ratio):
+        if ratio <= 0:
+            raise AudioAnalyzerException('logarithmic index is less than 0 or equal to 0')
+        return AudioAnalyzerDef.DB_CONST * math.log10(ratio)
+
+    def _gather(self, power, start, stop):
+        # bins [start, stop) of every row, stop - start is the same for all, out of range bins are masked
+        width = int(np.max(stop - start)) if start.size else 0
+        index = start[..., np.newaxis] + np.arange(width)
+        valid = (index >= 0) & (index < power.shape[1])
+        index = np.where(valid, index, 0)
+        rows = np.arange(power.shape[0]).reshape((-1,) + (1,) * (index.ndim - 1))
+        return index, valid, rows
+
+    def _band_power(self, power, start, stop):
+        '''
+        Power sum of bins [start, stop) like power[start:stop], start and stop are (channels, bands).
+        '''
+        index, valid, rows = self._gather(power, start, stop)
+        return (power[rows, index] * valid).sum(axis=-1)
+
+    def _envelope_mask(self, power, k1, envelope):
+        mask = np.zeros(power.shape, dtype=bool)
+        index, valid, rows = self._gather(power, k1 - envelope, k1 + 1 + envelope)
+        mask[np.broadcast_to(rows, index.shape)[valid], index[valid]] = True
+        return mask
+
+    def _band_mask(self, power, size):
+        bins = np.arange(power.shape[1])
+        band = (bins >= MIXFftAnalyzerSGDef.FFT_POW_IGNORE_BYTE) & (bins < self._bandwidth_index(size))
+        return np.tile(band, (power.shape[0], 1))
+
+    def _correction(self, power, k1, size):
+        '''
+        Nuttall correction polynomial on bins k1 and k1 + 1, the same as MIXFftAnalyzerSG.
+
+        Returns:
+            tuple, (vpp, frequency), numpy.ndarray shaped like k1.
+
+        '''
+        rows = np.arange(power.shape[0]).reshape((-1,) + (1,) * (k1.ndim - 1))
+        last = power.shape[1] - 1
+        y1 = np.sqrt(power[rows, np.clip(k1, 0, last)])
+        y2 = np.sqrt(power[rows, np.clip(k1 + 1, 0, last)])
+        if np.any(y1 + y2 == 0):
+            raise AudioAnalyzerException('the divisor is equal to 0')
+        # β = (y2 - y1) / (y2 + y1), α = 2.95494514 * β + 0.17671943 * β^3 + 0.09230694 * β^5
+        beta = (y2 - y1) / (y2 + y1)
+        alpha = (MIXFftAnalyzerSGDef.ALPHA_COEFFICIENT_1 * beta +
+                 MIXFftAnalyzerSGDef.ALPHA_COEFFICIENT_2 * beta ** 3 +
+                 MIXFftAnalyzerSGDef.ALPHA_COEFFICIENT_3 * beta ** 5)
+        # A = (y1 + y2) * (3.20976143 + 0.9187393 * α^2 + 0.14734229 * α^4) / N
+        nuttall = (y1 + y2) * (MIXFftAnalyzerSGDef.NUTTAL_COEFFICIENT_1 +
+                               MIXFftAnalyzerSGDef.NUTTAL_COEFFICIENT_2 * alpha ** 2 +
+                               MIXFftAnalyzerSGDef.NUTTAL_COEFFICIENT_3 * alpha ** 4) / size
+        vpp = nuttall / (size // 2)
+        # f = (0.5 + α + k1) * (Fs / N)
+        frequency = (MIXFftAnalyzerSGDef.FREQ_CALCULATE_CONST + alpha + k1) * (self.sample_rate / size)
+        return vpp, frequency
+
+    def _analyze(self, power):
+        size = power.shape[1] * 2
+        channels = power.shape[0]
+        envelope = self._envelope(size)
+        power[:, :AudioAnalyzerDef.DC_BINS] = 0
+
+        # k1 is the lower one of the largest bin and its larger neighbour, like _base_index_find
+        max_index = np.argmax(power, axis=1)
+        rows = np.arange(channels)
+        left = power[rows, np.maximum(max_index - 1, 0)]
+        right = power[rows, np.minimum(max_index + 1, power.shape[1] - 1)]
+        k1 = np.where(left > right, max_index - 1, max_index)
+
+        vpp, frequency = self._correction(power, k1[:, np.newaxis], size)
+        vpp = vpp[:, 0]
+        frequency = frequency[:, 0]
+
+        band = self._band_mask(power, size)
+        fundamental_mask = self._envelope_mask(power, k1[:, np.newaxis], envelope)
+        fundamental = (power * fundamental_mask).sum(axis=1)
+        if np.any(fundamental == 0):
+            raise AudioAnalyzerException('the divisor is equal to 0')
+        # band power - fundamental power, summed without cancellation
+        noise_distortion = ((power * (band & ~fundamental_mask)).sum(axis=1) -
+                            (power * (~band & fundamental_mask)).sum(axis=1))
+
+        # harmonic k1 = int(n * f / resolution), harmonics[:, 0] is the fundamental
+        resolution = self.sample_rate / size
+        orders = np.arange(1, self.harmonic_count + 1)
+        harmonic_k1 = np.floor(frequency[:, np.newaxis] * orders / resolution).astype(np.int64)
+        harmonics = self._band_power(power, harmonic_k1 - envelope, harmonic_k1 + 1 + envelope)
+        harmonic_vpp, harmonic_frequency = self._correction(power, harmonic_k1, size)
+
+        noise_mask = band & ~fundamental_mask
+        if self.harmonic_count > 1:
+            noise_mask &= ~self._envelope_mask(power, harmonic_k1[:, 1:], envelope)
+        noise = (power * noise_mask).sum(axis=1)
+        all_power = (power * band).sum(axis=1)
+
+        results = []
+        for ch in range(channels):
+            sinad = -self._db(noise_distortion[ch] / fundamental[ch])
+            if harmonics[ch, 0] == 0:
+                raise AudioAnalyzerException('the divisor is equal to 0')
+            thd = None
+            if self.harmonic_count > 1:
+                thd = self._db(harmonics[ch, 1:].sum() / harmonics[ch, 0])
+            result = {
+                'vpp': float(vpp[ch]),
+                'frequency': float(frequency[ch]),
+                'thd': thd,
+                'thdn': -sinad,
+                'snr': -self._db(noise[ch] / fundamental[ch]),
+                'sinad': sinad,
+                'enob': (sinad - AudioAnalyzerDef.ENOB_OFFSET_DB) / AudioAnalyzerDef.ENOB_DB_PER_BIT,
+                'noisefloor': self._noisefloor(all_power[ch], size),
+                'noise': self._noisefloor(noise[ch], size),
+                'harmonics': [{'order': int(orders[i]), 'frequency': float(harmonic_frequency[ch, i]),
+                               'vpp': float(harmonic_vpp[ch, i]),
+                               'level': (self._db(harmonics[ch, i] / harmonics[ch, 0])
+                                         if harmonics[ch, i] > 0 else None)}
+                              for i in range(self.harmonic_count)]
+            }
+            results.append(result)
+        return results
+
+    def _noisefloor(self, power, size):
+        return float(math.sqrt(power) / size / (size // 2) / math.sqrt(2) *
+                     MIXFftAnalyzerSGDef.NOISEFLOOR_COEFFICIENT)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import struct
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class CalibrationCellDef:
+    # gain, offset, threshold, save flag, 3 reserved bytes
+    CELL_FORMAT = '3f4B'
+    CELL_LEN = 16
+    CELL_FIELDS = 7
+
+
+def parse_calibration_cells(data, offset, count, save_flag):
+    '''
+    Parse count ICI calibration cells from an in-memory image with one unpack.
+
+    Args:
+        data:       bytearray/list/string, calibration image, list items are byte.
+        offset:     int, position of the first cell in data.
+        count:      int, cell count.
+        save_flag:  int, flag of a saved cell, other cells are not used.
+
+    Returns:
+        list, [{'gain': float, 'offset': float, 'threshold': float, 'is_use': boolean}, ...],
+              unused cells are {'gain': 1.0, 'offset': 0.0, 'threshold': 0.0, 'is_use': False}.
+
+    Raises:
+        struct.error:   data is shorter than the cells.
+
+    Examples:
+        data = board.read_eeprom(addr, 1 + 3 * 16)
+        items = parse_calibration_cells(data, 1, data[0], 0x5A)
+
+    '''
+    if count <= 0:
+        return []
+    if isinstance(data, list):
+        data = bytearray(data)
+    values = struct.unpack_from(CalibrationCellDef.CELL_FORMAT * count, data, offset)
+
+    items = []
+    for i in range(0, count * CalibrationCellDef.CELL_FIELDS, CalibrationCellDef.CELL_FIELDS):
+        if values[i + 3] != save_flag:
+            items.append({'gain': 1.0, "offset": 0.0, "threshold": 0.0, "is_use": False})
+        else:
+            items.append({"gain": values[i], "offset": values[i + 1], "threshold": values[i + 2], "is_use": True})
+    return items
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import bisect
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class CalibrationLookup(object):
+    '''
+    Precomputed level lookup of one calibration range.
+
+    The scalar calibrate() scans the cells in order and uses the first cell whose
+    threshold is above the data, stopping at the first unused cell. The first
+    threshold above the data is also the first running maximum of the thresholds
+    above it, and the running maximum is sorted, so the level is found with
+    bisect, or numpy searchsorted for a whole array, with the same result.
+
+    Args:
+        items:  list, calibration cells of the range, [{'gain': float, 'offset': float,
+                'threshold': float, 'is_use': boolean}, ...], not empty.
+
+    Examples:
+        lookup = CalibrationLookup(self._calibration_table['DCV'])
+        volts = lookup.calibrate_array(adc_volts)
+
+    '''
+
+    @classmethod
+    def for_table(cls, cache, range_name, items):
+        '''
+        Get the lookup of a range from cache, it is built again when the range is loaded again.
+
+        Args:
+            cache:      dict, {range_name: CalibrationLookup}, lookups kept by the module driver.
+            range_name: string, calibration range.
+            items:      list, calibration cells of the range, not empty.
+
+        Returns:
+            instance(CalibrationLookup).
+
+        Examples:
+            lookup = CalibrationLookup.for_table(self._calibration_lookups, 'DCV',
+                                                 self._calibration_table['DCV'])
+
+        '''
+        lookup = cache.get(range_name)
+        if lookup is None or lookup.items is not items or lookup.count != len(items):
+            lookup = cls(items)
+            cache[range_name] = lookup
+        return lookup
+
+    def __init__(self, items):
+        assert len(items) > 0
+        self.items = items
+        self.count = len(items)
+
+        # cells checked by the scalar scan, up to and including the first unused one
+        unused = self.count
+        for i, item in enumerate(items):
+            if not item['is_use']:
+                unused = i
+                break
+        checked = items[:min(unused + 1, self.count)]
+        # level when no checked threshold is above the data
+        self._default_level = max(min(unused, self.count) - 1, 0)
+
+        self._bounds = []
+        bound = None
+        for item in checked:
+            bound = item['threshold'] if bound is None else max(bound, item['threshold'])
+            self._bounds.append(bound)
+        self._gains = [item['gain'] for item in items]
+        self._offsets = [item['offset'] for item in items]
+
+    def level(self, data):
+        '''
+        Get the calibration level of data, same as the scalar scan.
+
+        Args:
+            data:   float, raw data.
+
+        Returns:
+            int, index of the cell.
+
+        '''
+        level = bisect.bisect_right(self._bounds, data)
+        return level if level < len(self._bounds) else self._default_level
+
+    def calibrate(self, data):
+        '''
+        Calibrate one value.
+
+        Args:
+            data:   float, raw data.
+
+        Returns:
+            float, calibrated data.
+
+        '''
+        level = self.level(data)
+        return self._gains[level] * data + self._offsets[level]
+
+    def calibrate_array(self, samples):
+        '''
+        Calibrate all samples in one pass.
+
+        Args:
+            samples:    list/numpy.ndarray, raw data.
+
+        Returns:
+            numpy.ndarray/list, calibrated data, numpy.ndarray only for numpy.ndarray samples.
+
+        '''
+        if np is None:
+            return [self.calibrate(data) for data in samples]
+
+        values = np.asarray(samples, dtype=np.float64)
+        levels = np.searchsorted(self._bounds, values, side='right')
+        levels[levels >= len(self._bounds)] = self._default_level
+        result = np.asarray(self._gains)[levels] * values + np.asarray(self._offsets)[levels]
+        return result if isinstance(samples, np.ndarray) else result.tolist()
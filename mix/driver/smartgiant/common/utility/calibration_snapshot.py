@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class CalibrationSnapshotDef:
+    DEFAULT_FOLDER = '/mix/cache/calibration'
+    FORMAT_VERSION = 1
+    FILE_SUFFIX = '.json'
+    # characters allowed in the snapshot file name, others are replaced by '_'
+    INVALID_NAME_CHARS = r'[^0-9A-Za-z_.-]'
+
+
+class CalibrationSnapshotException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+def calibration_checksum(*parts):
+    '''
+    Get the snapshot checksum of everything the parsed calibration table depends on.
+
+    Args:
+        parts:  bytearray/list/string/int, calibration header bytes, range table, ...
+
+    Returns:
+        string, sha1 hex digest.
+
+    Examples:
+        checksum = calibration_checksum(cal_index, header, sorted(range_table.items()))
+
+    '''
+    s = hashlib.sha1()
+    for part in parts:
+        s.update(str(part))
+        s.update('\0')
+    return s.hexdigest()
+
+
+class CalibrationSnapshot(object):
+    '''
+    Host side store of parsed calibration tables, one json file per module serial number.
+
+    A module loads its calibration table from the snapshot when the checksum of its
+    calibration header still matches the stored one, so a server start needs a few
+    small eeprom reads instead of reading and parsing the whole calibration area.
+    Any mismatch, missing or broken file is a miss and the caller falls back to a
+    full read, then saves the new table.
+
+    Args:
+        folder:     string, default '/mix/cache/calibration', snapshot folder, created on first save.
+
+    Examples:
+        MIXBoard.calibration_snapshot = CalibrationSnapshot()
+        board.load_calibration()
+
+    '''
+
+    def __init__(self, folder=CalibrationSnapshotDef.DEFAULT_FOLDER):
+        self.folder = os.path.expanduser(folder)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _path(self, serial_number):
+        name = re.sub(CalibrationSnapshotDef.INVALID_NAME_CHARS, '_', serial_number.strip())
+        return os.path.join(self.folder, name + CalibrationSnapshotDef.FILE_SUFFIX)
+
+    def load(self, serial_number, checksum):
+        '''
+        Load the calibration snapshot of a module.
+
+        Args:
+            serial_number:  string, module serial number.
+            checksum:       string, checksum of the calibration on the module.
+
+        Returns:
+            dict/None, {'table': dict, 'range_err': dict}, None if there is no valid snapshot.
+
+        '''
+        try:
+            with open(self._path(serial_number), 'r') as f:
+                record = json.load(f)
+            valid = record['version'] == CalibrationSnapshotDef.FORMAT_VERSION and \
+                record['serial_number'] == serial_number and record['checksum'] == checksum
+            if valid:
+                table = {}
+                for range_name, items in record['table'].items():
+                    table[str(range_name)] = [
+                        {'gain': float(item['gain']), 'offset': float(item['offset']),
+                         'threshold': float(item['threshold']), 'is_use': bool(item['is_use'])}
+                        for item in items]
+                range_err = dict((str(k), str(v)) for k, v in record['range_err'].items())
+        except (IOError, OSError, ValueError, KeyError, TypeError, AttributeError):
+            valid = False
+
+        with self._lock:
+            if not valid:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return {'table': table, 'range_err': range_err}
+
+    def save(self, serial_number, checksum, table, range_err=None):
+        '''
+        Save the calibration snapshot of a module, the file is replaced atomically.
+
+        Args:
+            serial_number:  string, module serial number.
+            checksum:       string, checksum of the calibration on the module.
+            table:          dict, {range_name: [{'gain': float, 'offset': float, 'threshold': float,
+                            'is_use': boolean}, ...]}.
+            range_err:      dict/None, default None, {range_name: error message}, None for no error.
+
+        Raises:
+            CalibrationSnapshotException:   snapshot file can not be written.
+
+        '''
+        record = {
+            'version': CalibrationSnapshotDef.FORMAT_VERSION,
+            'serial_number': serial_number,
+            'checksum': checksum,
+            'table': table,
+            'range_err': dict((k, str(v)) for k, v in (range_err or {}).items())
+        }
+        path = self._path(serial_number)
+        try:
+            if not os.path.isdir(self.folder):
+                os.makedirs(self.folder)
+            fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            raise CalibrationSnapshotException('write calibration snapshot %s fail: %s' % (path, str(e)))
+
+    def load_into(self, board, key, error_class):
+        '''
+        Load the calibration snapshot of a module into its calibration and range error tables.
+
+        Args:
+            board:          instance(MIXBoard/SGModuleDriver), module loading its calibration.
+            key:            tuple, (serial_number, checksum), snapshot key of the module.
+            error_class:    class, exception raised by calibrate() of the module for a range error.
+
+        Returns:
+            boolean, True if the tables were loaded, False if there is no valid snapshot.
+
+        Examples:
+            if snapshot.load_into(self, key, ICIException):
+                return "done"
+
+        '''
+        record = self.load(*key)
+        if record is None:
+            return False
+        board._calibration_table = record['table']
+        board._range_err_table = dict((range_name, error_class(err))
+                                      for range_name, err in record['range_err'].items())
+        return True
+
+    def save_from(self, board, key):
+        '''
+        Save the calibration and range error tables of a module, a failed save is ignored
+        because the snapshot only speeds up the next load.
+
+        Args:
+            board:          instance(MIXBoard/SGModuleDriver), module which just read its calibration.
+            key:            tuple, (serial_number, checksum), snapshot key of the module.
+
+        Returns:
+            boolean, True if the snapshot was saved.
+
+        Examples:
+            snapshot.save_from(self, key)
+
+        '''
+        serial_number, checksum = key
+        try:
+            self.save(serial_number, checksum, board._calibration_table, board._range_err_table)
+        except CalibrationSnapshotException:
+            return False
+        return True
+
+    def remove(self, serial_number):
+        '''
+        Remove the calibration snapshot of a module, nothing is done if there is none.
+
+        Args:
+            serial_number:  string, module serial number.
+
+        '''
+        try:
+            os.remove(self._path(serial_number))
+        except OSError:
+            pass
+
+    def statistics(self):
+        '''
+        Get snapshot hit statistics.
+
+        Returns:
+            dict, {'hits': int, 'misses': int}.
+
+        '''
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses}
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import threading
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class CaptureRegistryDef:
+    MEMORY_BUDGET = 64 * 1024 * 1024     # bytes
+    # approximate size of one value in a python list
+    LIST_ITEM_SIZE = 24
+    ENVELOPE_POINTS = 1000
+    HISTOGRAM_BINS = 100
+
+
+class CaptureRegistryException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class CaptureRegistry(object):
+    '''
+    Server side registry of captured data, referenced by handle.
+
+    A capture is stored once where it was acquired and the station only gets a
+    handle and metadata back. Slices, min/max envelopes, histograms and
+    statistics are then computed next to the data and only the result is sent.
+    Captures are evicted least recently used first when the memory budget is
+    exceeded. Values are numpy arrays when numpy is available, else lists.
+
+    Args:
+        memory_budget:  int, default 64MB, unit byte, memory allowed for all captures.
+
+    Examples:
+        handle = capture_registry.put(volt, sample_rate=192000, unit='mV')['handle']
+        print(capture_registry.statistics(handle))      # {'mean': 1.2, 'rms': 1.3, ...}
+        print(capture_registry.envelope(handle, 500))   # {'min': [...], 'max': [...], ...}
+        capture_registry.release(handle)
+
+    '''
+
+    def __init__(self, memory_budget=CaptureRegistryDef.MEMORY_BUDGET):
+        assert memory_budget > 0
+        self._memory_budget = memory_budget
+        self._memory_used = 0
+        self._captures = collections.OrderedDict()
+        self._next_handle = 1
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def _size(self, values):
+        if np is not None and isinstance(values, np.ndarray):
+            return values.nbytes
+        return len(values) * CaptureRegistryDef.LIST_ITEM_SIZE
+
+    def _get(self, handle):
+        try:
+            item = self._captures.pop(handle)
+        except KeyError:
+            raise CaptureRegistryException('capture %s does not exist or was evicted' % handle)
+        # most recently used at the end
+        self._captures[handle] = item
+        return item
+
+    def put(self, values, **metadata):
+        '''
+        Store a capture, older captures are evicted if the memory budget is exceeded.
+
+        Args:
+            values:     numpy.ndarray/list, captured values, kept by reference.
+            metadata:   keyword arguments, stored with the capture, like sample_rate=192000, unit='mV'.
+
+        Returns:
+            dict, capture metadata, with 'handle', 'length' and 'time'.
+
+        Raises:
+            CaptureRegistryException:   the capture alone exceeds the memory budget.
+
+        '''
+        if np is not None and not isinstance(values, np.ndarray):
+            values = np.asarray(values, dtype=np.float64)
+        size = self._size(values)
+        if size > self._memory_budget:
+            raise CaptureRegistryException('capture of %d bytes exceeds memory budget %d bytes' %
+                                           (size, self._memory_budget))
+        with self._lock:
+            while self._memory_used + size > self._memory_budget:
+                handle, item = self._captures.popitem(last=False)
+                self._memory_used -= item['size']
+                self._evicted += 1
+            handle = self._next_handle
+            self._next_handle += 1
+            info = dict(metadata, handle=handle, length=len(values), time=time.time())
+            self._captures[handle] = {'values': values, 'size': size, 'info': info}
+            self._memory_used += size
+        return dict(info)
+
+    def info(self, handle):
+        '''
+        Get capture metadata.
+
+        Args:
+            handle:     int, capture handle.
+
+        Returns:
+            dict, capture metadata.
+
+        '''
+        with self._lock:
+            return dict(self._get(handle)['info'])
+
+    def list(self):
+        '''
+        Get metadata of all captures and memory usage.
+
+        Returns:
+            dict, {'captures': list, 'memory_used': int, 'memory_budget': int, 'evicted': int}.
+
+        '''
+        with self._lock:
+            return {'captures': [dict(item['info']) for item in self._captures.values()],
+                    'memory_used': self._memory_used, 'memory_budget': self._memory_budget,
+                    'evicted': self._evicted}
+
+    def release(self, handle):
+        '''
+        Remove a capture.
+
+        Args:
+            handle:     int, capture handle.
+
+        '''
+        with self._lock:
+            item = self._captures.pop(handle, None)
+            if item is not None:
+                self._memory_used -= item['size']
+
+    def values(self, handle):
+        '''
+        Get the stored values of a capture, for drivers running next to the registry.
+
+        Args:
+            handle:     int, capture handle.
+
+        Returns:
+            numpy.ndarray/list, values, not copied.
+
+        '''
+        with self._lock:
+            return self._get(handle)['values']
+
+    def slice(self, handle, start=0, stop=None, step=1):
+        '''
+        Get a window of a capture.
+
+        Args:
+            handle:     int, capture handle.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+            step:       int, default 1, index step.
+
+        Returns:
+            list, values.
+
+        '''
+        assert step > 0
+        values = self.values(handle)[start:stop:step]
+        return values if isinstance(values, list) else values.tolist()
+
+    def envelope(self, handle, points=CaptureRegistryDef.ENVELOPE_POINTS, start=0, stop=None):
+        '''
+        Get min/max envelope of a capture decimated to at most points buckets, for plotting.
+
+        Args:
+            handle:     int, capture handle.
+            points:     int, default 1000, bucket count.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+
+        Returns:
+            dict, {'min': list, 'max': list, 'index': list}, index is the first sample index of every bucket.
+
+        '''
+        assert points > 0
+        values = self.values(handle)
+        length = len(values)
+        start, stop, _ = slice(start, stop).indices(length)
+        count = stop - start
+        if count <= 0:
+            return {'min': [], 'max': [], 'index': []}
+        points = min(points, count)
+        index = [start + i * count // points for i in range(points)]
+
+        if np is not None:
+            window = values[start:stop]
+            offsets = np.asarray(index) - start
+            return {'min': np.minimum.reduceat(window, offsets).tolist(),
+                    'max': np.maximum.reduceat(window, offsets).tolist(),
+                    'index': index}
+
+        bounds = index + [stop]
+        return {'min': [min(values[bounds[i]:bounds[i + 1]]) for i in range(points)],
+                'max': [max(values[bounds[i]:bounds[i + 1]]) for i in range(points)],
+                'index': index}
+
+    def histogram(self, handle, bins=CaptureRegistryDef.HISTOGRAM_BINS, value_range=None):
+        '''
+        Get histogram of capture values.
+
+        Args:
+            handle:         int, capture handle.
+            bins:           int, default 100, bin count.
+            value_range:    list/None, default None, [low, high], min and max of capture if None.
+
+        Returns:
+            dict, {'counts': list, 'edges': list}, edges has bins + 1 items.
+
+        Raises:
+            CaptureRegistryException:   the capture is empty and value_range is None.
+
+        '''
+        assert bins > 0
+        values = self.values(handle)
+        if len(values) == 0 and value_range is None:
+            raise CaptureRegistryException('capture %s is empty' % handle)
+        if value_range is None and np is not None:
+            value_range = [values.min(), values.max()]
+        elif value_range is None:
+            value_range = [min(values), max(values)]
+        low, high = float(value_range[0]), float(value_range[1])
+        if high <= low:
+            high = low + 1.0
+
+        if np is not None:
+            counts, edges = np.histogram(values, bins, (low, high))
+            return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+        width = (high - low) / bins
+        counts = [0] * bins
+        for value in values:
+            if low <= value <= high:
+                counts[min(int((value - low) / width), bins - 1)] += 1
+        return {'counts': counts, 'edges': [low + i * width for i in range(bins + 1)]}
+
+    def statistics(self, handle, start=0, stop=None):
+        '''
+        Get statistics of a capture window.
+
+        Args:
+            handle:     int, capture handle.
+            start:      int, default 0, first index.
+            stop:       int/None, default None, end index, excluded, capture end if None.
+
+        Returns:
+            dict, {'count': int, 'mean': float, 'rms': float, 'std': float, 'min': float, 'max': float,
+                   'peak': float, 'vpp': float}, peak is the max absolute value.
+
+        Raises:
+            CaptureRegistryException:   the window is empty.
+
+        '''
+        values = self.values(handle)[start:stop]
+        count = len(values)
+        if count == 0:
+            raise CaptureRegistryException('capture %s window is empty' % handle)
+
+        # std from the deviations, sqrt(rms^2 - mean^2) loses the noise of a large DC level
+        if np is not None:
+            mean = float(values.mean())
+            rms = float(math.sqrt(np.dot(values, values) / count))
+            std = float(values.std())
+            low = float(values.min())
+            high = float(values.max())
+        else:
+            mean = math.fsum(values) / count
+            rms = math.sqrt(math.fsum(value * value for value in values) / count)
+            std = math.sqrt(math.fsum((value - mean) ** 2 for value in values) / count)
+            low = min(values)
+            high = max(values)
+        return {'count': count, 'mean': mean, 'rms': rms, 'std': std,
+                'min': low, 'max': high, 'peak': max(abs(low), abs(high)), 'vpp': high - low}
+
+
+# registry shared by the drivers of one rpc server
+capture_registry = CaptureRegistry()
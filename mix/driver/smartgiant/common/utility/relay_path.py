@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import threading
+from mix.driver.core.ic.io_expander_base import IOExpanderBase
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class RelayPathPlanner(object):
+    '''
+    Switch the relays of a module to a measure path with the fewest io expander writes.
+
+    A path is the relay bit table of a range, [(bit, level), ...], applied in order. A bit
+    listed more than once, like (9, 0) ... (9, 1) in the Mimic current ranges, breaks the
+    path first and makes it again after the other relays switched, so the planner applies a
+    path in three phases: break, the relays listed once, make. Only the relays which differ
+    from the state the planner knows are written, one set_pins for each phase, and nothing,
+    break and make included, is written when the relays already hold the path.
+
+    The planner only knows the relays it switched. Call invalidate() after the relays were
+    written some other way or the module lost power, the next path then writes every bit.
+
+    Args:
+        io:         instance(IOExpanderBase), io expander driving the relays, emulators with
+                                              set_pin only are driven pin by pin.
+
+    Examples:
+        planner = RelayPathPlanner(cat9555)
+        if planner.apply(mimic_function_info['voltage']['6V']['bits']):
+            time.sleep(0.005)
+
+    '''
+
+    def __init__(self, io):
+        self.io = io
+        # bit --> level, bits not in it are unknown
+        self._state = {}
+        self._lock = threading.Lock()
+        self._paths = 0
+        self._skipped = 0
+        self._relay_changes = 0
+
+    def plan(self, path):
+        '''
+        Get the relay changes to reach a path from the known state, nothing is written.
+
+        Args:
+            path:       list, [(bit, level), ...], relay bit table of the range.
+
+        Returns:
+            list, [[(bit, level), ...], ...], relay changes of each phase in order, empty if
+                  the relays already hold the path.
+
+        Examples:
+            phases = planner.plan([(9, 0), (0, 1), (10, 1), (9, 1)])
+
+        '''
+        order = []
+        first = {}
+        final = {}
+        for bit, level in path:
+            if bit not in first:
+                order.append(bit)
+                first[bit] = level
+            final[bit] = level
+
+        if all(self._state.get(bit) == final[bit] for bit in order):
+            return []
+
+        breaks = [bit for bit in order if first[bit] != final[bit]]
+        state = dict(self._state)
+        phases = []
+        break_phase = [(bit, first[bit]) for bit in breaks if state.get(bit) != first[bit]]
+        state.update(break_phase)
+        phases.append(break_phase)
+        phases.append([(bit, final[bit]) for bit in order
+                       if bit not in breaks and state.get(bit) != final[bit]])
+        phases.append([(bit, final[bit]) for bit in breaks])
+        return [phase for phase in phases if phase]
+
+    def _write(self, phase):
+        if isinstance(self.io, IOExpanderBase):
+            self.io.set_pins(dict(phase))
+        else:
+            for bit, level in phase:
+                self.io.set_pin(bit, level)
+
+    def apply(self, path):
+        '''
+        Switch the relays to a path, break before make.
+
+        Args:
+            path:       list, [(bit, level), ...], relay bit table of the range.
+
+        Returns:
+            int, count of relay changes written, 0 if the relays already hold the path,
+                 the caller can skip the relay settling time then.
+
+        Examples:
+            planner.apply([(9, 0), (0, 1), (10, 1), (9, 1)])
+
+        '''
+        with self._lock:
+            phases = self.plan(path)
+            for phase in phases:
+                try:
+                    self._write(phase)
+                except Exception:
+                    # relays of the failed write are in an unknown state
+                    for bit, level in phase:
+                        self._state.pop(bit, None)
+                    raise
+                self._state.update(phase)
+
+            changes = sum(len(phase) for phase in phases)
+            self._paths += 1
+            if changes == 0:
+                self._skipped += 1
+            self._relay_changes += changes
+        return changes
+
+    def invalidate(self):
+        '''
+        Forget the relay state, the next path writes every bit of it.
+
+        Examples:
+            planner.invalidate()
+
+        '''
+        with self._lock:
+            self._state = {}
+
+    def statistics(self):
+        '''
+        Get path switching statistics.
+
+        Returns:
+            dict, {'paths': int, 'skipped': int, 'relay_changes': int}, skipped is the count of
+                  paths the relays already held.
+
+        '''
+        with self._lock:
+            return {'paths': self._paths, 'skipped': self._skipped, 'relay_changes': self._relay_changes}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'qinxiaojun@SmartGiant'
+__version__ = '0.1'
+
+
+class SampleCodecDef:
+    # struct format and numpy dtype of each word size, little endian
+    WORD_FORMATS = {
+        1: ('B', '<u1'),
+        2: ('H', '<u2'),
+        4: ('I', '<u4'),
+        8: ('Q', '<u8')
+    }
+
+
+class SampleCodecException(Exception):
+    def __init__(self, err_str):
+        self._err_str = err_str
+
+    def __str__(self):
+        return self._err_str
+
+
+class SampleCodec(object):
+    '''
+    Decoder of packed ADC samples uploaded by DMA.
+
+    Every sample is a little endian word which holds a bit field value and an
+    optional channel tag. Decoding extracts the value, applies two's complement
+    sign and converts it with value * scale + offset. All words are decoded in
+    one vectorized pass when numpy is available, otherwise a pure python loop
+    is used and lists are returned instead of numpy arrays.
+
+    Args:
+        word_size:      int, [1, 2, 4, 8], default 4, unit byte, size of one sample word.
+        value_shift:    int, default 0, lowest bit of the value field.
+        value_bits:     int, default 32, width of the value field.
+        signed:         boolean, [True, False], default False, value is two's complement.
+        channel_shift:  int, default 0, lowest bit of the channel tag.
+        channel_bits:   int, default 0, width of the channel tag, 0 if words are not tagged.
+        scale:          float, default 1.0, unit of one lsb.
+        offset:         float, default 0.0, added after scaling.
+
+    Examples:
+        # 4 bytes word, bit[0-2] channel, bit[14-31] 18 bit value, 10V range in mV
+        codec = SampleCodec(4, 14, 18, True, 0, 3, 10000.0 / (1 << 17))
+        result, data, data_num, overflow = dma.read_channel_all_data(0)
+        volts = codec.decode_channels(data, data_num)
+        dma.read_done(0, data_num)
+        print(volts[0].mean())
+
+    '''
+
+    def __init__(self, word_size=4, value_shift=0, value_bits=32, signed=False,
+                 channel_shift=0, channel_bits=0, scale=1.0, offset=0.0):
+        assert word_size in SampleCodecDef.WORD_FORMATS
+        assert value_bits > 0 and value_shift + value_bits <= word_size * 8
+        assert channel_shift + channel_bits <= word_size * 8
+        self.word_size = word_size
+        self.value_shift = value_shift
+        self.value_bits = value_bits
+        self.signed = signed
+        self.channel_shift = channel_shift
+        self.channel_bits = channel_bits
+        self.scale = scale
+        self.offset = offset
+
+        self._format, self._dtype = SampleCodecDef.WORD_FORMATS[word_size]
+        self._value_mask = (1 << value_bits) - 1
+        self._channel_mask = (1 << channel_bits) - 1
+
+    def scaled(self, scale, offset=0.0):
+        '''
+        Get a codec of the same layout with another scale, like for another range.
+
+        Args:
+            scale:      float, unit of one lsb.
+            offset:     float, default 0.0, added after scaling.
+
+        Returns:
+            instance(SampleCodec).
+
+        '''
+        return SampleCodec(self.word_size, self.value_shift, self.value_bits, self.signed,
+                           self.channel_shift, self.channel_bits, scale, offset)
+
+    def decode(self, data, length=None):
+        '''
+        Decode all samples in order, channel tags are ignored.
+
+        Args:
+            data:       ctypes array/bytearray/memoryview/string/list/None, dma data, list items are byte,
+                        None for an empty dma channel.
+            length:     int/None, default None, unit byte, valid data length, whole data if None.
+
+        Returns:
+            numpy.ndarray/list, float values, list if numpy is not available.
+
+        '''
+        words = self._words(data, length)
+        if np is not None:
+            return self._values(words) * self.scale + self.offset
+        return [self._value(word) * self.scale + self.offset for word in words]
+
+    def decode_channels(self, data, length=None):
+        '''
+        Decode all samples and split them by channel tag, order is kept inside a channel.
+
+        Args:
+            data:       ctypes array/bytearray/memoryview/string/list/None, dma data, list items are byte,
+                        None for an empty dma channel.
+            length:     int/None, default None, unit byte, valid data length, whole data if None.
+
+        Returns:
+            dict, {channel: numpy.ndarray/list}, float values of every channel found in the data.
+
+        Raises:
+            SampleCodecException:   the layout has no channel tag.
+
+        '''
+        if self.channel_bits == 0:
+            raise SampleCodecException('sample layout has no channel tag')
+
+        words = self._words(data, length)
+        if np is not None:
+            values = self._values(words) * self.scale + self.offset
+            channels = (words >> np.uint64(self.channel_shift)) & np.uint64(self._channel_mask)
+            return dict((int(channel), values[channels == channel]) for channel in np.unique(channels))
+
+        result = {}
+        for word in words:
+            channel = (word >> self.channel_shift) & self._channel_mask
+            value = self._value(word) * self.scale + self.offset
+            result.setdefault(channel, []).append(value)
+        return result
+
+    def _words(self, data, length):
+        if length is None:
+            length = 0 if data is None else len(data)
+        count = length // self.word_size
+        # an empty dma channel returns None data with 0 length
+        if data is None or count == 0:
+            return np.zeros(0, dtype=np.uint64) if np is not None else ()
+        if isinstance(data, list):
+            data = bytearray(data[:count * self.word_size])
+
+        if np is not None:
+            try:
+                return np.frombuffer(data, dtype=self._dtype, count=count).astype(np.uint64)
+            except (TypeError, AttributeError):
+                # object without the old buffer interface, like memoryview on python 2
+                data = np.asarray(data, dtype=np.uint8)[:count * self.word_size]
+                return data.view(self._dtype).astype(np.uint64)
+        return struct.unpack_from('<%d%s' % (count, self._format), data)
+
+    def _values(self, words):
+        values = ((words >> np.uint64(self.value_shift)) & np.uint64(self._value_mask)).astype(np.int64)
+        if self.signed:
+            values -= (values >> (self.value_bits - 1)) << self.value_bits
+        return values
+
+    def _value(self, word):
+        value = (word >> self.value_shift) & self._value_mask
+        if self.signed and value >> (self.value_bits - 1):
+            value -= 1 << self.value_bits
+        return value
+
+
+def to_list(values):
+    '''
+    Convert decoded values to a list, which can be returned by rpc.
+
+    Args:
+        values:     numpy.ndarray/list, decoded values.
+
+    Returns:
+        list.
+
+    '''
+    if isinstance(values, list):
+        return values
+    return values.tolist()
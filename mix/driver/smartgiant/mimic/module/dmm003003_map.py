@@ -9,6 +9,7 @@ from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
 from mix.driver.smartgiant.common.ipcore.mix_ad717x_sg import MIXAd7175SG
 from mix.driver.smartgiant.common.ipcore.mix_daqt1_sg_r import MIXDAQT1SGR
 from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver
+from mix.driver.smartgiant.common.utility.relay_path import RelayPathPlanner
 
 
 __author__ = 'jinkun.lin@SmartGiant'
@@ -466,6 +467,7 @@ class MimicBase(SGModuleDriver):
         self.eeprom = CAT24C32(eeprom_dev_addr, i2c)
         self.sensor = NCT75(sensor_dev_addr, i2c)
         self.cat9555 = CAT9555(cat9555_dev_addr, i2c)
+        self.relay_path = RelayPathPlanner(self.cat9555)
 
         if ipcore:
             if isinstance(ipcore, basestring):
@@ -526,6 +528,7 @@ class MimicBase(SGModuleDriver):
         while True:
             try:
                 self.cat9555.set_pins_dir([0x00, 0x00])
+                self.relay_path.invalidate()
                 self.ad7175.channel_init()
                 self.set_measure_path(MimicDef.DEFAULT_CHAN, MimicDef.DEFAULT_RANGE)
                 self.set_sampling_rate(0, MimicDef.SAMPLING_RATE)
@@ -637,10 +640,8 @@ class MimicBase(SGModuleDriver):
         if channel not in self.measure_path or \
                 scope != self.measure_path[channel]:
             bits = self.function_info[channel][scope]['bits']
-            for bit in bits:
-                self.cat9555.set_pin(bit[0], bit[1])
-
-            time.sleep(delay_time / 1000.0)
+            if self.relay_path.apply(bits):
+                time.sleep(delay_time / 1000.0)
 
             self.measure_path.clear()
             self.measure_path[channel] = scope
@@ -889,8 +890,7 @@ class MimicBase(SGModuleDriver):
             raise
         else:
             if measure_scope in self.module_calibration_info:
-                calibrate = functools.partial(self.calibrate, measure_scope)
-                adc_volt = map(calibrate, adc_volt)
+                adc_volt = self.calibrate_array(measure_scope, adc_volt)
 
             volt_to_target_unit = functools.partial(self._volt_to_target_unit, measure_channel, measure_scope)
             target_data = [map(volt_to_target_unit, adc_volt), unit]
@@ -13,6 +13,7 @@ from mix.driver.smartgiant.common.ic.eeprom_emulator import EepromEmulator
 from mix.driver.smartgiant.common.ipcore.mix_daqt1_sg_r import MIXDAQT1SGR
 from mix.driver.smartgiant.common.ipcore.mix_ad7175_sg_emulator import MIXAd7175SGEmulator
 from mix.driver.smartgiant.common.module.mix_board import MIXBoard, BoardArgCheckError
+from mix.driver.smartgiant.common.utility.relay_path import RelayPathPlanner
 
 __author__ = 'jinkun.lin@SmartGiant'
 __version__ = '0.1'
@@ -645,6 +646,7 @@ class Mimic(MIXBoard):
             self.sensor = NCT75Emulator('nct75_emulator')
             self.cat9555 = CAT9555Emulator(
                 MimicDef.CAT9555_DEV_ADDR, None, None)
+        self.relay_path = RelayPathPlanner(self.cat9555)
 
         if ipcore:
             if isinstance(ipcore, basestring):
@@ -693,6 +695,7 @@ class Mimic(MIXBoard):
         '''
         self.load_calibration()
         self.cat9555.set_pins_dir([0x00, 0x00])
+        self.relay_path.invalidate()
         self.ad7175.channel_init()
         self.set_measure_path(MimicDef.DEFAULT_CHAN, MimicDef.DEFAULT_RANGE)
         self.set_sampling_rate(0, MimicDef.SAMPLING_RATE)
@@ -793,10 +796,8 @@ class Mimic(MIXBoard):
         if channel not in self.measure_path or \
                 scope != self.measure_path[channel]:
             bits = self.function_info[channel][scope]['bits']
-            for bit in bits:
-                self.cat9555.set_pin(bit[0], bit[1])
-
-            time.sleep(delay_time / 1000.0)
+            if self.relay_path.apply(bits):
+                time.sleep(delay_time / 1000.0)
 
             self.measure_path.clear()
             self.measure_path[channel] = scope
@@ -1045,8 +1046,7 @@ class Mimic(MIXBoard):
             raise
         else:
             if measure_scope in self.module_calibration_info:
-                calibrate = functools.partial(self.calibrate, measure_scope)
-                adc_volt = map(calibrate, adc_volt)
+                adc_volt = self.calibrate_array(measure_scope, adc_volt)
 
             volt_to_target_unit = functools.partial(self._volt_to_target_unit, measure_channel, measure_scope)
             target_data = [map(volt_to_target_unit, adc_volt), unit]
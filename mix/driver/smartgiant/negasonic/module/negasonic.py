@@ -17,6 +17,8 @@ from mix.driver.smartgiant.common.ipcore.mix_signalsource_sg_emulator import MIX
 from mix.driver.smartgiant.common.ipcore.mix_aut1_sg_r import MIXAUT1SGR
 from mix.driver.smartgiant.common.module.mix_board import MIXBoard
 from mix.driver.smartgiant.common.module.mix_board import BoardArgCheckError
+from mix.driver.smartgiant.common.utility.sample_codec import SampleCodec
+from mix.driver.smartgiant.common.utility.audio_analyzer import AudioAnalyzer
 
 
 __author__ = "Zhangsong Deng"
@@ -80,6 +82,10 @@ class NegasonicDef():
     READ_CAL_DATA_PACK_FORMAT = "9B"
     READ_CAL_DATA_UNPACK_FORMAT = "2fB"
 
+    # upload data is 32bit, high 24bit is twos complement value, scaled to full scale vpp 1
+    UPLOAD_CODEC = SampleCodec(4, 8, 24, True, scale=1.0 / (1 << 24))
+    UPLOAD_FFT_SIZE = 8192
+
     ADC_RESET_PIN = 0
     I2S_RX_EN_PIN = 1
     DAC_RESET_PIN = 8
@@ -292,6 +298,50 @@ class NegasonicBase(MIXBoard):
         result["rms"] = rms
         return result
 
+    def measure_upload(self, data, length, bandwidth_hz, harmonic_num):
+        '''
+        Negasonic measure signal's Vpp, RMS, THD+N, THD, SNR and ENOB from upload data on host.
+
+        The data uploaded by DMA is analyzed with AudioAnalyzer, the same algorithm as the FFT analyzer,
+        so results of measure() can be checked on the same signal.
+
+        Args:
+            data:            ctypes array/bytearray/list, DMA data uploaded after enable_upload().
+            length:          int, unit byte, valid data length, at least 4 * 8192.
+            bandwidth_hz:    int/string, [24~95977], Measure signal's limit bandwidth, unit is Hz, or 'auto'.
+            harmonic_num:    int, [1~10], Use for measuring signal's THD.
+
+        Returns:
+            dict, {'vpp': value, 'freq': value, 'thd': value, 'thdn': value, 'rms': value, 'snr': value,
+                   'sinad': value, 'enob': value}, vpp and rms in mV, thd, thdn, snr and sinad in dB.
+
+        Examples:
+            result, data, data_num, overflow = dma.read_channel_all_data(0)
+            print(negasonic.measure_upload(data, data_num, 20000, 5))
+            dma.read_done(0, data_num)
+
+        '''
+        assert bandwidth_hz == 'auto' or isinstance(bandwidth_hz, int)
+        assert isinstance(harmonic_num, int) and harmonic_num > 0
+
+        samples = NegasonicDef.UPLOAD_CODEC.decode(data, length)
+        analyzer = AudioAnalyzer(self.sample_rate, NegasonicDef.UPLOAD_FFT_SIZE, bandwidth_hz, harmonic_num)
+        analysis = analyzer.analyze(samples)
+
+        vpp = analysis['vpp'] * NegasonicDef.AUDIO_ANALYZER_VREF
+        rms = self.calibrate(NegasonicDef.MEASURE_CAL_ITEM, vpp / NegasonicDef.RMS_TO_VPP_RATIO)
+
+        result = dict()
+        result["vpp"] = rms * NegasonicDef.RMS_TO_VPP_RATIO
+        result["freq"] = analysis['frequency']
+        result["thd"] = analysis['thd']
+        result["thdn"] = analysis['thdn']
+        result["rms"] = rms
+        result["snr"] = analysis['snr']
+        result["sinad"] = analysis['sinad']
+        result["enob"] = analysis['enob']
+        return result
+
     def enable_output(self, freq, rms):
         '''
         Negasonic output sine wave, differencial mode.
@@ -16,6 +16,7 @@ from mix.driver.smartgiant.common.ic.ltc2378_emulator import LTC2378Emulator
 from mix.driver.smartgiant.common.ic.ltc2378 import LTC2378, LTC2378Def
 from mix.driver.smartgiant.common.ic.tmp10x import TMP108
 from mix.driver.smartgiant.common.ipcore.mix_dma_sg_emulator import MIXDMASGEmulator
+from mix.driver.smartgiant.common.ipcore.mix_dma_stream import DMAStream
 from mix.driver.smartgiant.common.ipcore.pl_spi_dac_emulator import PLSPIDACEmulator
 from mix.driver.smartgiant.common.ipcore.mix_signalsource_sg_emulator import MIXSignalSourceSGEmulator
 from mix.driver.smartgiant.common.ipcore.mix_fftanalyzer_sg import MIXFftAnalyzerSG
@@ -26,6 +27,8 @@ from mix.driver.smartgiant.common.ipcore.pl_spi_dac import PLSPIDAC
 from mix.driver.smartgiant.common.ipcore.mix_solaris_sg_r import MIXSolarisSGR
 from mix.driver.smartgiant.common.module.mix_board import MIXBoard
 from mix.driver.smartgiant.common.utility.data_operate import DataOperate
+from mix.driver.smartgiant.common.utility.sample_codec import SampleCodec, to_list
+from mix.driver.smartgiant.common.utility.capture_registry import capture_registry
 
 
 __author__ = 'Jiasheng.Xie@SmartGiant'
@@ -37,6 +40,10 @@ class SolarisDef:
     DMA_SIZE = 16 * 1024 * 1024  # 16Mbytes
     DMA_READ_SIZE = 2048     # read 2048 bytes once
     DMA_TIMEOUT_MS = 3000
+    DMA_STREAM_CHUNK_SIZE = 0x10000
+    # every 4 bytes of dma data hold one LTC2378 code in bit[12-31]
+    LTC2378_SAMPLE_SHIFT = 12
+    LTC2378_RESOLUTION = 20
 
     SWITCH_DELAY_S = 0.001
 
@@ -182,7 +189,8 @@ class Solaris(MIXBoard):
 
     rpc_public_api = ['module_init', 'io_dir_set', 'io_dir_read', 'io_set', 'io_read',
                       'adg2128_set_xy_state', 'adg2128_get_xy_state', 'ltc2378_get_raw_data',
-                      'ltc2378_get_raw_data_by_len', 'adg2128_reset', 'voltage_measure', 'voltage_output',
+                      'ltc2378_get_raw_data_by_len', 'ltc2378_get_voltage', 'ltc2378_capture',
+                      'adg2128_reset', 'voltage_measure', 'voltage_output',
                       'rms_measure', 'ad5761_readback_voltage', 'enable_ad5272', 'set_resistor_value',
                       'read_resistor', 'set_resistor_mode', 'measure_thdn', 'ad5761_set_control_register',
                       'triangle', 'pulse', 'disable_waveform', 'dc',
@@ -603,6 +611,122 @@ class Solaris(MIXBoard):
         else:
             return data[:data_num]
 
+    def ltc2378_get_voltage(self, channel, vref=SolarisDef.LTC2378_VREF):
+        '''
+        Solaris read all ltc2378 data of dma channel and convert them to voltage
+
+        The dma data is decoded in one pass, see SampleCodec.
+
+        Args:
+            channel:  string, ["rms", "thdn"], THDN DMA channel or RMS DMA channel.
+            vref:     float, default 5000.0, unit mV, reference voltage of LTC2378.
+
+        Returns:
+            list/string, if success return a list of voltage in mV else return string 'error'.
+
+        Examples:
+            volt = solaris.ltc2378_get_voltage("rms")
+            print(volt)     # [1.2, 1.3, ...]
+
+        '''
+        volt = self._ltc2378_read_voltage(channel, vref)
+        if volt is None:
+            return 'error'
+        return to_list(volt)
+
+    def ltc2378_capture(self, channel, vref=SolarisDef.LTC2378_VREF):
+        '''
+        Solaris capture all ltc2378 data of dma channel as voltage and keep it on the server
+
+        Only the capture handle and metadata are returned, use capture_statistics,
+        capture_envelope, capture_slice, capture_histogram to get results computed
+        on the server, and capture_release when done.
+
+        Args:
+            channel:  string, ["rms", "thdn"], THDN DMA channel or RMS DMA channel.
+            vref:     float, default 5000.0, unit mV, reference voltage of LTC2378.
+
+        Returns:
+            dict/string, capture metadata if success else return string 'error',
+                         like {'handle': 1, 'length': 4096, 'unit': 'mV', 'channel': 'rms', ...}.
+
+        Examples:
+            handle = solaris.ltc2378_capture("rms")['handle']
+            print(solaris.capture_statistics(handle)['rms'])
+            solaris.capture_release(handle)
+
+        '''
+        volt = self._ltc2378_read_voltage(channel, vref)
+        if volt is None:
+            return 'error'
+        return capture_registry.put(volt, unit='mV', channel=channel)
+
+    def _ltc2378_read_voltage(self, channel, vref):
+        # read all data of the dma channel and decode it to mV, None on dma error or overflow
+        assert channel in self.dma_channel.keys()
+        result, data, data_num, overflow = self.dma.read_channel_all_data(self.dma_channel[channel])
+        if result != 0 or overflow == 1:
+            self.dma.read_done(self.dma_channel[channel], data_num)
+            return None
+        if data is None or data_num == 0:
+            # empty channel, nothing captured since the last read
+            self.dma.read_done(self.dma_channel[channel], data_num)
+            return []
+        # decode before read_done, data maps the dma memory
+        volt = self.ltc2378_codec(vref).decode(data, data_num)
+        self.dma.read_done(self.dma_channel[channel], data_num)
+        return volt
+
+    def ltc2378_codec(self, vref=SolarisDef.LTC2378_VREF):
+        '''
+        Solaris get the codec of ltc2378 dma data, decoded values are voltage in mV
+
+        Args:
+            vref:     float, default 5000.0, unit mV, reference voltage of LTC2378.
+
+        Returns:
+            instance(SampleCodec).
+
+        Examples:
+            codec = solaris.ltc2378_codec()
+            with solaris.ltc2378_open_stream("rms") as stream:
+                for chunk in stream:
+                    volt = codec.decode(chunk)
+
+        '''
+        return SampleCodec(4, SolarisDef.LTC2378_SAMPLE_SHIFT, SolarisDef.LTC2378_RESOLUTION, True,
+                           scale=vref / (1 << (SolarisDef.LTC2378_RESOLUTION - 1)))
+
+    def ltc2378_open_stream(self, channel, chunk_size=SolarisDef.DMA_STREAM_CHUNK_SIZE):
+        '''
+        Solaris open a continuous ltc2378 data stream on the dma channel
+
+        The returned stream reads the channel in background and releases the dma
+        memory itself, use it for long acquisitions instead of polling
+        ltc2378_get_raw_data. Upload must be enabled before the stream is started.
+
+        Args:
+            channel:     string, ["rms", "thdn"], THDN DMA channel or RMS DMA channel.
+            chunk_size:  int, default 0x10000, unit byte, max size of one chunk, multiple of 4.
+
+        Returns:
+            instance(DMAStream), stream not started yet.
+
+        Examples:
+            solaris.enable_upload(upload_state="on")
+            with solaris.ltc2378_open_stream("rms") as stream:
+                for chunk in stream:
+                    # every 4 bytes consist of one ADC data, only 20 bit effective
+                    handle(chunk)
+                    if done:
+                        break
+            solaris.disable_upload()
+
+        '''
+        assert channel in self.dma_channel.keys()
+        assert chunk_size % 4 == 0
+        return DMAStream(self.dma, self.dma_channel[channel], chunk_size)
+
     def adg2128_reset(self):
         '''
         Solaris board reset adg2128
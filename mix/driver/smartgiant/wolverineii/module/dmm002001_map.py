@@ -4,6 +4,7 @@ import math
 import time
 from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver
 from mix.driver.smartgiant.common.ic.pca9536 import PCA9536
+from mix.driver.smartgiant.common.utility.relay_path import RelayPathPlanner
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
 from mix.driver.core.ic.cat24cxx import CAT24C32
 from mix.driver.core.ic.nct75 import NCT75
@@ -208,6 +209,7 @@ class WolverineII(SGModuleDriver):
         self.eeprom = CAT24C32(WolverineiiDef.EEPROM_DEV_ADDR, i2c)
         self.sensor = NCT75(WolverineiiDef.SENSOR_DEV_ADDR, i2c)
         self.pca9536 = PCA9536(WolverineiiDef.IO_EXP_DEV_ADDR, i2c)
+        self.relay_path = RelayPathPlanner(self.pca9536)
 
         if isinstance(ipcore, basestring):
             axi4_bus = AXI4LiteBus(ipcore, WolverineiiDef.MIXDAQT1_REG_SIZE)
@@ -275,6 +277,7 @@ class WolverineII(SGModuleDriver):
             try:
                 self.pca9536.set_pins_dir([0x00])
                 self.pca9536.set_ports([0x00])
+                self.relay_path.invalidate()
                 return
             except Exception as e:
                 if time.time() - start_time > timeout:
@@ -294,6 +297,7 @@ class WolverineII(SGModuleDriver):
             try:
                 self.pca9536.set_pins_dir([0x00])
                 self.pca9536.set_ports([0x00])
+                self.relay_path.invalidate()
                 self.ad7175.reset()
                 time.sleep(0.01)
                 self.ad7175.channel_init()
@@ -428,10 +432,8 @@ class WolverineII(SGModuleDriver):
 
         if channel != self.get_measure_path().get(WolverineiiDef.SELECT_RANGE_KEY, ''):
             bits = wolverineii_function_info[channel]['bits']
-            for bit in bits:
-                self.pca9536.set_pin(bit[0], bit[1])
-
-            time.sleep(WolverineiiDef.RELAY_DELAY_S)
+            if self.relay_path.apply(bits):
+                time.sleep(WolverineiiDef.RELAY_DELAY_S)
 
         self.measure_path.clear()
         self.measure_path[WolverineiiDef.SELECT_RANGE_KEY] = channel
@@ -690,8 +692,7 @@ class WolverineII(SGModuleDriver):
                                                 channel)
         target_data = [map(volt_to_target_unit, adc_volt), unit]
         temp_data = target_data[0]
-        calibrate = functools.partial(self.calibrate, channel)
-        temp_data = map(calibrate, temp_data)
+        temp_data = self.calibrate_array(channel, temp_data)
 
         min_data = min(temp_data)
         max_data = max(temp_data)
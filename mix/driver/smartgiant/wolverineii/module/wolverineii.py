@@ -13,6 +13,7 @@ from mix.driver.core.ic.nct75 import NCT75
 from mix.driver.core.ic.nct75_emulator import NCT75Emulator
 from mix.driver.smartgiant.common.ic.eeprom_emulator import EepromEmulator
 from mix.driver.smartgiant.common.ic.pca9536_emulator import PCA9536 as PCA9536Emulator
+from mix.driver.smartgiant.common.utility.relay_path import RelayPathPlanner
 from mix.driver.smartgiant.common.ipcore.mix_daqt1_sg_r import MIXDAQT1SGR
 
 __author__ = 'zicheng.huang@SmartGiant'
@@ -232,6 +233,7 @@ class WolverineII(MIXBoard):
             self.eeprom = EepromEmulator('eeprom_emulator')
             self.sensor = NCT75Emulator('nct75_emulator')
             self.pca9536 = PCA9536Emulator('pca9536_emulator')
+        self.relay_path = RelayPathPlanner(self.pca9536)
         if ipcore:
             if isinstance(ipcore, basestring):
                 axi4_bus = AXI4LiteBus(ipcore, WolverineiiDef.MIXDAQT1_REG_SIZE)
@@ -287,6 +289,7 @@ class WolverineII(MIXBoard):
         '''
         self.pca9536.set_pins_dir([0x00])
         self.pca9536.set_ports([0x00])
+        self.relay_path.invalidate()
         self.ad7175.channel_init()
         self.set_measure_path(WolverineiiDef.DEFAULT_RANGE)
         self.set_sampling_rate('A', WolverineiiDef.DEFAULT_SAMPLE_RATE)
@@ -389,10 +392,8 @@ class WolverineII(MIXBoard):
 
         if sel_range != self.get_measure_path().get(WolverineiiDef.SELECT_RANGE_KEY, ''):
             bits = wolverineii_function_info[sel_range]['bits']
-            for bit in bits:
-                self.pca9536.set_pin(bit[0], bit[1])
-
-            time.sleep(delay_time)
+            if self.relay_path.apply(bits):
+                time.sleep(delay_time)
 
         self.measure_path.clear()
         self.measure_path[WolverineiiDef.SELECT_RANGE_KEY] = sel_range
@@ -488,8 +489,7 @@ class WolverineII(MIXBoard):
             raise
         else:
             cal_infor = measure_scope
-            calibrate = functools.partial(self.calibrate, cal_infor)
-            adc_volt = map(calibrate, adc_volt)
+            adc_volt = self.calibrate_array(cal_infor, adc_volt)
 
             volt_to_target_unit = functools.partial(self._volt_to_target_unit, measure_scope)
             target_data = [map(volt_to_target_unit, adc_volt), unit]
@@ -20,15 +20,22 @@ from mix.lynx.rpc import ZmqPublisher
 from mix.lynx.rpc import NoOpPublisher
 from mix.lynx.rpc import RPCServerWrapper
 from mix.lynx.rpc import RPCLogger
+from mix.lynx.rpc.console_streamer import ConsoleStreamer
 from datapath import *
 from xavier import Xavier
 from mix.driver.core.bus.gpio import GPIO
 from mix.driver.core.bus.pin import Pin
+from mix.driver.core.bus.i2c_arbiter import I2CArbiterDef
+from mix.driver.core.bus.i2c_arbiter import I2CArbitratedBus
+from mix.driver.smartgiant.common.module.mix_board import MIXBoard
+from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver
+from mix.driver.smartgiant.common.utility.calibration_snapshot import CalibrationSnapshot
 
 # EEPROM class for reading compatible string from module eeprom.
 # compatible for both M24xxx and CAT24Cxx;
 # use small page size driver to support different EEPROM size.
 from mix.driver.core.ic.m24cxx import M24C08 as EEPROM
+from mix.driver.core.ic.nvmem_cache import NVMemCache
 
 # global station of xavier firmware boot
 # once any driver loading/test_case loading failed with exception,
@@ -209,7 +216,8 @@ def read_module_compatible_string(i2c, addr=0x50):
         comp_str = read_module_compatible_string(i2c)
         # comp_str could be 'GQQ-LTJW-2-001'
     '''
-    eeprom = EEPROM(addr, i2c)
+    # fields are close to each other, the cache reads them in a few block reads
+    eeprom = NVMemCache(EEPROM(addr, i2c))
     eeprom_rev = eeprom.read(0, 1)[0]
     # get eeprom layout info by version;
     # if not defined, regard as v1 (ici < 2.8.4)
@@ -781,14 +789,71 @@ def create_object_from_json_dict(name, obj_profile, local=True):
     return obj
 
 
-def create_dut_instances(dut_profile, shared_devices):
+def create_dut_i2c_arbitration(dut_name, arbitration_profile, shared_devices):
+    '''
+    Wrap shared i2c buses with I2CArbitratedBus for one dut.
+
+    The dut profile node is like
+    "i2c_arbitration": {"buses": ["@i2c_1", "@i2c_mux"], "priority": 0, "origin": "dut1"};
+    priority defaults to 1 (normal, 0 is the highest) and origin to the dut name.
+    A bus which is a list, like downstream buses of a mux, is wrapped item by item;
+    "@i2c_mux.0" wraps only that item.
+
+    Args:
+        dut_name: string, name of the dut.
+        arbitration_profile: dict, "i2c_arbitration" json dict node of the dut.
+        shared_devices: dict, {name: obj}, shared devices for all duts.
+
+    Returns:
+        dict(key: bus name, value: wrapped bus or list with wrapped buses)
+
+    Examples:
+        buses = create_dut_i2c_arbitration('dut1', {'buses': ['@i2c_1'], 'priority': 0}, shared_devices)
+        XObject.update_objects(buses)
+    '''
+    priority = arbitration_profile.get('priority', I2CArbiterDef.PRIORITY_NORMAL)
+    origin = arbitration_profile.get('origin', dut_name)
+    buses = {}
+    for bus_ref in arbitration_profile.get('buses', []):
+        bus_name, index = get_name_index_from_str_value(bus_ref)
+        if bus_name not in shared_devices:
+            msg = 'Undefined i2c arbitration bus: {}: {}'.format(dut_name, bus_ref)
+            log_error(msg)
+            continue
+        bus = buses.get(bus_name, shared_devices[bus_name])
+        is_list = isinstance(bus, (list, tuple))
+        if index is not None and not is_list:
+            msg = 'Invalid i2c arbitration bus index: {}: {}, {} is not a bus list'
+            log_error(msg.format(dut_name, bus_ref, bus_name))
+            continue
+        if index is not None and index >= len(bus):
+            msg = 'Invalid i2c arbitration bus index: {}: {}, {} has {} buses'
+            log_error(msg.format(dut_name, bus_ref, bus_name, len(bus)))
+            continue
+        if is_list:
+            bus = list(bus)
+            for i in range(len(bus)) if index is None else [index]:
+                if not isinstance(bus[i], I2CArbitratedBus):
+                    bus[i] = I2CArbitratedBus(bus[i], priority, origin)
+        elif not isinstance(bus, I2CArbitratedBus):
+            bus = I2CArbitratedBus(bus, priority, origin)
+        buses[bus_name] = bus
+        logger.info('{}: i2c bus {} arbitrated, priority {}'.format(dut_name, bus_ref, priority))
+    return buses
+
+
+def create_dut_instances(dut_profile, shared_devices, dut_name=None):
     '''
     Create DUT private instances and register to given rpc server.
 
+    Shared i2c buses listed in the "i2c_arbitration" node of the dut are replaced by
+    I2CArbitratedBus for this dut, see create_dut_i2c_arbitration.
+
     Args:
         dut_profile: dict,  json dict node for dut.
         shared_devices: dict, {name: obj}, shared devices for all duts;
                         possibly referenced by DUT instances to be created.
+        dut_name: string/None, name of the dut, default origin of its i2c transactions.
 
     Returns:
         dict(key: obj_alias, value: obj) contains all objects for this dut
@@ -804,6 +869,9 @@ def create_dut_instances(dut_profile, shared_devices):
 
     XObject.clear_all_objects()
     XObject.update_objects(shared_devices)
+    arbitration_profile = dut_profile.get('i2c_arbitration')
+    if isinstance(arbitration_profile, dict):
+        XObject.update_objects(create_dut_i2c_arbitration(dut_name, arbitration_profile, shared_devices))
     obj_under_create = {}
     for obj_alias, obj_profile in dut_profile.iteritems():
         if isinstance(obj_profile, dict) and ('class' in obj_profile or 'allowed' in obj_profile):
@@ -1263,6 +1331,35 @@ def first_stage_launch(hw_profile_file,
     start_mgmt_server(profile.pop('mgmt_server', {}), log_folder)
 
 
+def set_calibration_snapshot(snapshot_profile):
+    '''
+    Let modules load their calibration from the host side snapshot store, from the
+    "calibration_snapshot" profile node, like
+    "calibration_snapshot": {"folder": "/mix/cache/calibration"};
+    "enable": false in the node, or no node, keeps reading calibration from nvmem.
+    Must be called before modules are created, they load calibration in their init.
+
+    Args:
+        snapshot_profile: dict/None, "calibration_snapshot" json dict node.
+
+    Returns:
+        instance(CalibrationSnapshot)/None, the snapshot store set to the module classes.
+    '''
+    if not isinstance(snapshot_profile, dict) or not snapshot_profile.get('enable', True):
+        return None
+    try:
+        kwargs = {k: v for k, v in snapshot_profile.items() if k in ['folder']}
+        snapshot = CalibrationSnapshot(**kwargs)
+    except Exception as e:
+        msg = 'Failed to create calibration snapshot; traceback={}'
+        log_error(msg.format(traceback.format_exc()))
+        return None
+    MIXBoard.calibration_snapshot = snapshot
+    SGModuleDriver.calibration_snapshot = snapshot
+    logger.info('calibration snapshot folder: {}'.format(snapshot.folder))
+    return snapshot
+
+
 def create_shared_devices(profile_shared_dict):
     # create and return shared devices
     shared_devices = load_objects(profile_shared_dict, local=False)
@@ -1288,6 +1385,30 @@ def create_dut_rpc_server(duts, ctx):
         dut.server = server
 
 
+def create_dut_console(duts):
+    '''
+    Start console streaming for duts with a "console" node in profile, like
+    "console": {"channels": {"dut": "uart_1"}, "backlog": 1000};
+    channels map console channel names to uart instances of the dut.
+    The streamer publishes through the dut publisher and is registered as "console".
+    '''
+    for dut_name, dut in duts.items():
+        console_profile = dut.profile.get('console')
+        if not isinstance(console_profile, dict) or 'channels' not in console_profile:
+            continue
+        try:
+            uarts = {channel: dut.instances[uart_name]
+                     for channel, uart_name in console_profile['channels'].items()}
+            kwargs = {k: v for k, v in console_profile.items() if k in ['backlog', 'batch_interval']}
+            console = ConsoleStreamer(dut.server.publisher, uarts, **kwargs)
+            console.start()
+            dut.instances['console'] = console
+        except Exception as e:
+            msg = 'Failure found when starting console streaming for {}; traceback={}'
+            msg = msg.format(dut_name, traceback.format_exc())
+            log_error(msg)
+
+
 def register_dut_instance(duts):
     # register DUT instance
     for dut_name, dut in duts.items():
@@ -1345,6 +1466,9 @@ def second_stage_launch(driver_folder):
 
     load_driver_folder(driver_folder)
 
+    # calibration snapshot is used by modules created from here on
+    set_calibration_snapshot(profile.get('calibration_snapshot'))
+
     # create shared devices and store in XObject
     key_shared_devices = 'shared_devices'
     shared_devices = create_shared_devices(profile.get(key_shared_devices, {}))
@@ -1366,7 +1490,7 @@ def second_stage_launch(driver_folder):
      for dut in duts.values()]
 
     # create DUT instances; {dut_name: dict of instances}
-    [setattr(dut, 'instances', create_dut_instances(dut.profile, shared_devices))
+    [setattr(dut, 'instances', create_dut_instances(dut.profile, shared_devices, dut.name))
      for dut in duts.values()]
 
     # collect all modules that support power control (2-step-power-on)
@@ -1390,6 +1514,7 @@ def second_stage_launch(driver_folder):
     # create DUT RPC server, saved in XObjects
     ctx = zmq.Context()
     create_dut_rpc_server(duts, ctx)
+    create_dut_console(duts)
 
     # register DUT instance, save ext_programs and load test functions
     register_dut_instance(duts)
@@ -0,0 +1,317 @@
+import re
+import time
+import threading
+import collections
+import ujson as json
+
+import levels
+from mix.driver.core.bus.uart_reader import UARTReader
+
+
+class ConsoleStreamerDef:
+    TOPIC_PREFIX = 'console/'
+    BATCH_INTERVAL = 0.1
+    BATCH_LINES = 200
+    BACKLOG_LINES = 1000
+    # a line longer than this without line end is published in pieces
+    MAX_LINE_LEN = 4096
+    THREAD_JOIN_TIMEOUT = 1
+
+
+class ConsoleStreamerException(Exception):
+    def __init__(self, err_str):
+        self._err_reason = '%s.' % (err_str)
+
+    def __str__(self):
+        return self._err_reason
+
+
+class ConsoleStreamer(object):
+    '''
+    Capture DUT consoles on the server and publish their lines through the DUT publisher.
+
+    Each console channel is a UART drained by a UARTReader. Every batch_interval the received
+    data is split into lines, each line is [seq, timestamp, text] where seq counts the lines of
+    the channel and timestamp is when the line started to arrive. The last backlog lines of each
+    channel are kept.
+
+    A client subscribes to a channel with subscribe(), filters are applied on the server so only
+    matching lines are sent. Lines are published as json batches,
+    {"channel": channel, "lines": [[seq, timestamp, text], ...]}, on the topic returned by
+    subscribe(), which is the first frame of the publisher message. The backlog is replayed in
+    the subscribe() response, so no line is lost between the two.
+
+    A line is only published once it ended. When a channel was idle for a batch interval with a
+    line not ended, like a prompt, the text so far is published as provisional output,
+    {"channel": channel, "lines": [], "partial": [timestamp, text]}, to subscriptions without
+    filters; it gets no seq and is published again as a line when it ends. Filters always see
+    whole lines.
+
+    A batch which fails, like a publish error, is counted in statistics() and streaming goes on.
+
+    :param publisher: Publisher, DUT publisher, like ZmqPublisher.
+    :param uarts: dict, {channel: uart or UARTReader}.
+    :param backlog: int, lines kept for each channel.
+    :param batch_interval: float, second, time lines are collected before they are published.
+
+    .. code-block:: python
+
+        console = ConsoleStreamer(publisher, {'dut': uart_1})
+        console.start()
+
+        # client: subscribe the topic first, then ask for the stream
+        sub.setsockopt(zmq.SUBSCRIBE, 'console/dut/station1/')
+        result = client.console_subscribe('dut', 'station1', 'PASS|FAIL|ERR')
+        for seq, timestamp, text in result['backlog']:
+            print(text)
+    '''
+    rpc_public_api = ['start', 'stop', 'get_channels', 'subscribe', 'unsubscribe',
+                      'get_subscriptions', 'get_backlog', 'statistics']
+
+    def __init__(self, publisher, uarts, backlog=ConsoleStreamerDef.BACKLOG_LINES,
+                 batch_interval=ConsoleStreamerDef.BATCH_INTERVAL):
+        assert isinstance(uarts, dict) and uarts
+        assert backlog > 0
+        assert batch_interval > 0
+        self.publisher = publisher
+        self.batch_interval = batch_interval
+        self.readers = {}
+        self._partial = {}
+        self._provisional = {}
+        self._backlog = {}
+        self._seq = {}
+        for channel, uart in uarts.items():
+            self.readers[channel] = uart if isinstance(uart, UARTReader) else UARTReader(uart)
+            # [timestamp, data] of the line not ended yet
+            self._partial[channel] = None
+            # (partial, length) last published as provisional output
+            self._provisional[channel] = None
+            self._backlog[channel] = collections.deque(maxlen=backlog)
+            self._seq[channel] = 0
+        # topic --> {'channel': string, 'include': regex/None, 'exclude': regex/None}
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._published = 0
+        self._errors = 0
+        self._error = None
+        self._client_id = 0
+
+    def _topic(self, channel, client_id):
+        return '%s%s/%s/' % (ConsoleStreamerDef.TOPIC_PREFIX, channel, client_id)
+
+    def _split_lines(self, channel, chunks):
+        # complete lines of the chunks, a line not ended is kept for the next batch
+        lines = []
+        partial = self._partial[channel]
+        for timestamp, data in chunks:
+            for piece in re.split('(\n)', data):
+                if piece == '':
+                    continue
+                if partial is None:
+                    partial = [timestamp, '']
+                if piece == '\n':
+                    lines.append(partial)
+                    partial = None
+                    continue
+                partial[1] += piece
+                while len(partial[1]) > ConsoleStreamerDef.MAX_LINE_LEN:
+                    lines.append([partial[0], partial[1][:ConsoleStreamerDef.MAX_LINE_LEN]])
+                    partial = [timestamp, partial[1][ConsoleStreamerDef.MAX_LINE_LEN:]]
+        self._partial[channel] = partial
+
+        result = []
+        for timestamp, data in lines:
+            self._seq[channel] += 1
+            text = data.rstrip('\r').decode('utf-8', 'replace')
+            result.append([self._seq[channel], timestamp, text])
+        return result
+
+    def _match(self, subscription, text):
+        if subscription['include'] is not None and not subscription['include'].search(text):
+            return False
+        if subscription['exclude'] is not None and subscription['exclude'].search(text):
+            return False
+        return True
+
+    def _publish(self, channel, lines):
+        # called with the lock held
+        for topic, subscription in self._subscriptions.items():
+            if subscription['channel'] != channel:
+                continue
+            matched = [line for line in lines if self._match(subscription, line[2])]
+            for i in range(0, len(matched), ConsoleStreamerDef.BATCH_LINES):
+                msg = json.dumps({'channel': channel, 'lines': matched[i:i + ConsoleStreamerDef.BATCH_LINES]})
+                self.publisher.publish(msg, 'console', levels.INFO, topic)
+                self._published += 1
+
+    def _publish_partial(self, channel):
+        # called with the lock held, the line not ended of an idle channel is published
+        # as provisional output to subscriptions without filters and is kept as partial
+        partial = self._partial[channel]
+        if partial is None or self._provisional[channel] == (partial, len(partial[1])):
+            return
+        self._provisional[channel] = (partial, len(partial[1]))
+        text = partial[1].rstrip('\r').decode('utf-8', 'replace')
+        for topic, subscription in self._subscriptions.items():
+            if subscription['channel'] != channel or \
+                    subscription['include'] is not None or subscription['exclude'] is not None:
+                continue
+            msg = json.dumps({'channel': channel, 'lines': [], 'partial': [partial[0], text]})
+            self.publisher.publish(msg, 'console', levels.INFO, topic)
+            self._published += 1
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.batch_interval)
+            for channel, reader in self.readers.items():
+                try:
+                    chunks = reader.read_chunks()
+                    with self._lock:
+                        lines = self._split_lines(channel, chunks)
+                        if lines:
+                            self._backlog[channel].extend(lines)
+                            self._publish(channel, lines)
+                        if not chunks:
+                            self._publish_partial(channel)
+                except Exception as e:
+                    # the lines of a failed batch are lost for subscribers, streaming goes on
+                    with self._lock:
+                        self._errors += 1
+                        self._error = '%s: %s' % (channel, str(e))
+
+    def start(self):
+        '''
+        Start capturing all console channels.
+
+        :returns: string, "done"
+        '''
+        if self._running:
+            return 'done'
+        for reader in self.readers.values():
+            reader.start()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='console_streamer')
+        self._thread.daemon = True
+        self._thread.start()
+        return 'done'
+
+    def stop(self):
+        '''
+        Stop capturing, lines still in the uart readers are dropped.
+
+        :returns: string, "done"
+        '''
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(ConsoleStreamerDef.THREAD_JOIN_TIMEOUT)
+            self._thread = None
+        for reader in self.readers.values():
+            reader.stop()
+            reader.flush()
+        return 'done'
+
+    def get_channels(self):
+        '''
+        :returns: list, console channel names
+        '''
+        return sorted(self.readers.keys())
+
+    def subscribe(self, channel, client_id=None, include=None, exclude=None, backlog=True):
+        '''
+        Start publishing the lines of a channel on a topic of the client.
+
+        Subscribing again with the same client_id replaces the filters.
+
+        :param channel: string, console channel.
+        :param client_id: string/None, part of the topic, so the client can subscribe the topic on its
+                          zmq SUB socket before calling this; None to get a new one.
+        :param include: string/None, regular expression, only lines matching it are published.
+        :param exclude: string/None, regular expression, lines matching it are not published.
+        :param backlog: bool, return the backlog lines which pass the filters.
+        :returns: dict, {'topic': string, 'backlog': [[seq, timestamp, text], ...]}
+        :raises ConsoleStreamerException: channel does not exist or a filter is not valid.
+        '''
+        if channel not in self.readers:
+            raise ConsoleStreamerException('console channel %s not found' % channel)
+        try:
+            subscription = {
+                'channel': channel,
+                'include': re.compile(include) if include else None,
+                'exclude': re.compile(exclude) if exclude else None
+            }
+        except re.error as e:
+            raise ConsoleStreamerException('console filter error: %s' % str(e))
+
+        with self._lock:
+            if client_id is None:
+                self._client_id += 1
+                client_id = self._client_id
+            topic = self._topic(channel, client_id)
+            self._subscriptions[topic] = subscription
+            lines = []
+            if backlog:
+                lines = [line for line in self._backlog[channel] if self._match(subscription, line[2])]
+        return {'topic': topic, 'backlog': lines}
+
+    def unsubscribe(self, topic):
+        '''
+        Stop publishing on a topic returned by subscribe().
+
+        :param topic: string, topic of the subscription.
+        :returns: string, "done"
+        '''
+        with self._lock:
+            self._subscriptions.pop(topic, None)
+        return 'done'
+
+    def get_subscriptions(self):
+        '''
+        :returns: dict, {topic: {'channel': string, 'include': string/None, 'exclude': string/None}}
+        '''
+        with self._lock:
+            return {
+                topic: {
+                    'channel': s['channel'],
+                    'include': s['include'].pattern if s['include'] else None,
+                    'exclude': s['exclude'].pattern if s['exclude'] else None
+                }
+                for topic, s in self._subscriptions.items()
+            }
+
+    def get_backlog(self, channel, count=0, after_seq=0):
+        '''
+        Get the backlog lines of a channel, for clients which do not subscribe.
+
+        :param channel: string, console channel.
+        :param count: int, max lines from the end, 0 for all.
+        :param after_seq: int, only lines with a larger seq.
+        :returns: list, [[seq, timestamp, text], ...]
+        :raises ConsoleStreamerException: channel does not exist.
+        '''
+        if channel not in self.readers:
+            raise ConsoleStreamerException('console channel %s not found' % channel)
+        with self._lock:
+            lines = [line for line in self._backlog[channel] if line[0] > after_seq]
+        return lines[-count:] if count > 0 else lines
+
+    def statistics(self):
+        '''
+        :returns: dict, {'published': int, 'subscriptions': int, 'errors': int, 'error': string/None,
+                         'channels': {channel: {'lines': int, 'backlog': int, 'received': int,
+                                                'overflow_bytes': int, 'error': string/None}}}
+        '''
+        with self._lock:
+            channels = {}
+            for channel, reader in self.readers.items():
+                reader_statistics = reader.statistics()
+                channels[channel] = {
+                    'lines': self._seq[channel],
+                    'backlog': len(self._backlog[channel]),
+                    'received': reader_statistics['received'],
+                    'overflow_bytes': reader_statistics['overflow_bytes'],
+                    'error': reader_statistics['error']
+                }
+            return {'published': self._published, 'subscriptions': len(self._subscriptions),
+                    'errors': self._errors, 'error': self._error, 'channels': channels}
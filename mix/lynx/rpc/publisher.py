@@ -13,14 +13,14 @@ class Publisher(object):
     def __init__(self, identity):
         self.identity = identity
 
-    def publish(self, msg, id_postfix=None, level=levels.DEBUG):
+    def publish(self, msg, id_postfix=None, level=levels.DEBUG, channel=PUB_CHANNEL):
         t = datetime.datetime.now()
         ts = datetime.datetime.strftime(t, '%m-%d_%H:%M:%S.%f')
         id_str = self.identity
         if id_postfix:
             id_str = id_str + '--' + id_postfix
         if hasattr(self, '_send'):
-            self._send(ts, id_str, msg, level)
+            self._send(ts, id_str, msg, level, channel)
 
 
 class NoOpPublisher(Publisher):
@@ -41,14 +41,14 @@ class TestPublisher(Publisher):
         else:
             self.msg_list = msg_list
 
-    def _send(self, ts, id_str, msg, level):
+    def _send(self, ts, id_str, msg, level, channel=PUB_CHANNEL):
         self.msg_list.append([ts, level, id_str, msg])
 
 
 class StdOutPublisher(Publisher):
 
     @staticmethod
-    def _send(ts, id_str, msg, level):
+    def _send(ts, id_str, msg, level, channel=PUB_CHANNEL):
         print('[%s\t[%d] %s:%s' % (ts, level, id_str, msg))
 
 
@@ -61,10 +61,10 @@ class ZmqPublisher(Publisher):
         self.publisher.bind(endpoint)
         self.lock = threading.Lock()
 
-    def _send(self, ts, id_str, msg, level):
-        # zmq socket is not thread safe
+    def _send(self, ts, id_str, msg, level, channel=PUB_CHANNEL):
+        # zmq socket is not thread safe; subscribers filter by channel, the first frame
         self.lock.acquire()
-        self.publisher.send_multipart([str(PUB_CHANNEL), str(ts),
+        self.publisher.send_multipart([str(channel), str(ts),
                                        str(level), str(id_str), str(msg)])
         self.lock.release()
 
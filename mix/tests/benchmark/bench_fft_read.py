@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of the FFT spectrum read of MIXFftAnalyzerSG.
+
+Compares MIXFftAnalyzerSG._read_fft_power, which drains the FFT RAM with one
+read_32bit_fix burst, against the previous read of two single word FIFO reads
+per spectrum point, kept here as legacy_read_fft_power. Both run on the AXI4
+emulators, the core AXI4LiteBus library emulator and the smartgiant
+AXI4LiteBusEmulator, with their recorders turned off.
+
+Usage:
+    python mix/tests/benchmark/bench_fft_read.py [-p 4096] [-n 20]
+    python -m mix.tests.benchmark.bench_fft_read [-p 4096] [-n 20]
+'''
+import os
+import sys
+import time
+import argparse
+
+# run as a script only the script folder is on sys.path, add the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
+from mix.driver.smartgiant.common.bus.axi4_lite_bus_emulator import AXI4LiteBusEmulator
+from mix.driver.smartgiant.common.ipcore.mix_fftanalyzer_sg import MIXFftAnalyzerSG, MIXFftAnalyzerSGDef
+
+
+def legacy_read_fft_power(axi4_bus, count):
+    fft_power_data = []
+    for i in range(count):
+        # The valid data of the FFT is 6 bytes, but FFT_RAM_RD register is 4 bytes. So read the FIFO twice.
+        read_data = axi4_bus.read_32bit_fix(MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER,
+                                            MIXFftAnalyzerSGDef.FFT_VALID_DATA_COUNT)
+        read_data += axi4_bus.read_32bit_fix(MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER,
+                                             MIXFftAnalyzerSGDef.FFT_VALID_DATA_COUNT)
+        fft_power_data.append(read_data[0] | read_data[1] << 32)
+    return fft_power_data
+
+
+def timeit(func, count):
+    func()
+    start = time.time()
+    for i in range(count):
+        func()
+    return (time.time() - start) / count * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FFT spectrum read benchmark')
+    parser.add_argument('-p', '--points', type=int, default=4096, help='spectrum points read')
+    parser.add_argument('-n', '--count', type=int, default=20, help='reads of each case')
+    args = parser.parse_args()
+
+    buses = [
+        ('core AXI4LiteBus lib emulator', AXI4LiteBus(None, MIXFftAnalyzerSGDef.REG_SIZE)),
+        ('smartgiant AXI4LiteBusEmulator',
+         AXI4LiteBusEmulator('axi4_mix_fftanalyzer_sg_emulator', MIXFftAnalyzerSGDef.REG_SIZE))
+    ]
+    # the emulator recorders keep at most 5000 actions, they are not timed
+    for name, axi4_bus in buses:
+        recorder = getattr(axi4_bus, '_recorder', None) or axi4_bus.base_lib._recorder
+        recorder.record = lambda content: None
+
+    print('%d points, per read    %12s %12s' % (args.points, 'legacy ms', 'current ms'))
+    for name, axi4_bus in buses:
+        analyzer = MIXFftAnalyzerSG(axi4_bus)
+        legacy = legacy_read_fft_power(axi4_bus, args.points)
+        current = analyzer._read_fft_power(args.points)
+        assert len(legacy) == len(current) == args.points
+        print('%-30s %12.2f %12.2f' % (name,
+                                       timeit(lambda: legacy_read_fft_power(axi4_bus, args.points), args.count),
+                                       timeit(lambda: analyzer._read_fft_power(args.points), args.count)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of the native library call path of AXI4LiteBus.
+
+Compares the calls of AXI4LiteBus with NativeBuffers and load_library against the
+previous code, which built a new ctypes array on every transfer and loaded the
+library again for every raised exception. The previous code is kept here as the
+LegacyAXI4LiteBus class.
+
+The bus runs on a stub liblynx-core-driver.so built with cc, every function of it
+returns at once, so the times are the python and ctypes cost of one call. The
+script runs itself again with the stub directory in LD_LIBRARY_PATH, so the stub
+is loaded by name like the real library.
+
+Usage:
+    python mix/tests/benchmark/bench_native_lib.py [-n 20000]
+    python -m mix.tests.benchmark.bench_native_lib [-n 20000]
+'''
+import os
+import sys
+import time
+import ctypes
+import struct
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# run as a script only the script folder is on sys.path, add the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+STUB_SOURCE = r'''
+#include <string.h>
+static int handle;
+void *axi4_lite_open(const char *dev_name, unsigned int reg_size) { return &handle; }
+void axi4_lite_close(void *bus) {}
+int axi4_lite_write_8bit_inc(void *bus, unsigned int addr, unsigned char *data, unsigned int len) { return 0; }
+int axi4_lite_read_32bit_fix(void *bus, unsigned int addr, unsigned int *data, unsigned int len) { return 0; }
+int axi4_lite_write_32bit_fix(void *bus, unsigned int addr, unsigned int *data, unsigned int len) { return 0; }
+int axi4_lite_read_8bit_inc(void *bus, unsigned int addr, unsigned char *data, unsigned int len) { return -1; }
+int get_error_reason(int code, char *reason, unsigned int len) {
+    strncpy(reason, "stub error", len);
+    return 0;
+}
+'''
+STUB_DIR_ENV = 'MIX_BENCH_STUB_DIR'
+DEV_NAME = '/dev/MIX_Bench_Stub'
+REG_SIZE = 0x8000
+
+
+def build_stub():
+    stub_dir = tempfile.mkdtemp(prefix='mix_bench_')
+    source = os.path.join(stub_dir, 'stub.c')
+    with open(source, 'w') as f:
+        f.write(STUB_SOURCE)
+    subprocess.check_call(['cc', '-shared', '-fPIC', '-O2', '-o',
+                           os.path.join(stub_dir, 'liblynx-core-driver.so'), source])
+    return stub_dir
+
+
+def timeit(func, count, repeat=5):
+    # best of repeat rounds, a single round is as noisy as the sub-microsecond cases
+    func()
+    best = None
+    for r in range(repeat):
+        start = time.time()
+        for i in range(count):
+            func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count * 1e6
+
+
+class LegacyAXI4LiteBus(object):
+    '''
+    Transfer methods of AXI4LiteBusBase before NativeBuffers and load_library.
+    '''
+
+    def __init__(self, dev_name, reg_size):
+        self._dev_name = dev_name
+        self._reg_size = reg_size
+        self.base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+        self._axi4_bus = self.base_lib.axi4_lite_open(dev_name, reg_size)
+
+    def write_8bit_inc(self, addr, data):
+        assert addr >= 0 and (addr + len(data)) <= self._reg_size
+        assert len(data) > 0
+        wr_data = (ctypes.c_ubyte * len(data))(*data)
+        result = self.base_lib.axi4_lite_write_8bit_inc(self._axi4_bus, addr, wr_data, len(data))
+        if result != 0:
+            raise LegacyAXI4LiteBusException(self._dev_name, result)
+
+    def write_32bit_fix(self, addr, data):
+        assert addr >= 0 and addr < self._reg_size
+        assert len(data) > 0
+        wr_data = (ctypes.c_uint * len(data))(*data)
+        result = self.base_lib.axi4_lite_write_32bit_fix(self._axi4_bus, addr, wr_data, len(data))
+        if result != 0:
+            raise LegacyAXI4LiteBusException(self._dev_name, result)
+
+    def read_32bit_fix(self, addr, rd_len):
+        assert addr >= 0 and addr < self._reg_size
+        assert rd_len > 0
+        rd_data = (ctypes.c_uint * rd_len)()
+        result = self.base_lib.axi4_lite_read_32bit_fix(self._axi4_bus, addr, rd_data, rd_len)
+        if result != 0:
+            raise LegacyAXI4LiteBusException(self._dev_name, result)
+        return list(struct.unpack('%dI' % rd_len, rd_data))
+
+    def read_8bit_inc(self, addr, rd_len):
+        assert addr >= 0 and (addr + rd_len) <= self._reg_size
+        assert rd_len > 0
+        rd_data = (ctypes.c_ubyte * rd_len)()
+        result = self.base_lib.axi4_lite_read_8bit_inc(self._axi4_bus, addr, rd_data, rd_len)
+        if result != 0:
+            raise LegacyAXI4LiteBusException(self._dev_name, result)
+        return list(struct.unpack('%dB' % rd_len, rd_data))
+
+
+class LegacyAXI4LiteBusException(Exception):
+    def __init__(self, dev_name, err_code):
+        reason = (128 * ctypes.c_char)()
+        base_lib = ctypes.cdll.LoadLibrary('liblynx-core-driver.so')
+        base_lib.get_error_reason(err_code, reason, len(reason))
+        self._err_reason = '[%s]: %s.' % (dev_name, ctypes.string_at(reason, -1).decode('utf-8'))
+
+
+def run(count):
+    from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus, AXI4LiteBusException
+
+    axi4_bus = AXI4LiteBus(DEV_NAME, REG_SIZE)
+    legacy_bus = LegacyAXI4LiteBus(DEV_NAME, REG_SIZE)
+    data = [i & 0xFF for i in range(256)]
+
+    def raise_error(bus, exception):
+        try:
+            bus.read_8bit_inc(0, 4)
+        except exception:
+            pass
+
+    cases = [
+        ('write_8bit_inc 256 bytes',
+         lambda: legacy_bus.write_8bit_inc(0, data),
+         lambda: axi4_bus.write_8bit_inc(0, data)),
+        ('write_32bit_fix 1 word',
+         lambda: legacy_bus.write_32bit_fix(0, [0x12345678]),
+         lambda: axi4_bus.write_32bit_fix(0, [0x12345678])),
+        ('read_32bit_fix 1 word',
+         lambda: legacy_bus.read_32bit_fix(0, 1),
+         lambda: axi4_bus.read_32bit_fix(0, 1)),
+        ('raise bus exception',
+         lambda: raise_error(legacy_bus, LegacyAXI4LiteBusException),
+         lambda: raise_error(axi4_bus, AXI4LiteBusException))
+    ]
+
+    print('%-30s %12s %12s' % ('per call', 'legacy us', 'current us'))
+    for name, legacy, current in cases:
+        print('%-30s %12.2f %12.2f' % (name, timeit(legacy, count), timeit(current, count)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AXI4LiteBus native call benchmark')
+    parser.add_argument('-n', '--count', type=int, default=20000, help='calls of each case')
+    args = parser.parse_args()
+
+    stub_dir = os.environ.get(STUB_DIR_ENV)
+    if stub_dir is None:
+        stub_dir = build_stub()
+        env = dict(os.environ)
+        env[STUB_DIR_ENV] = stub_dir
+        env['LD_LIBRARY_PATH'] = os.pathsep.join(filter(None, [stub_dir, env.get('LD_LIBRARY_PATH')]))
+        try:
+            return subprocess.call([sys.executable] + sys.argv, env=env)
+        finally:
+            shutil.rmtree(stub_dir, ignore_errors=True)
+    run(args.count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
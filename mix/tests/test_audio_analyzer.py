@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+'''
+AudioAnalyzer against the FPGA analyzer path of MIXFftAnalyzerSG.
+
+The same FFT RAM data is read by MIXFftAnalyzerSG through a fake AXI4 bus, analyze() and
+its _calculate_* run unchanged on it, and AudioAnalyzer.analyze_spectrum() takes the
+same data. vpp, frequency, thd, thdn and noisefloor must be the same.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+from __future__ import division
+import unittest
+
+from mix.driver.smartgiant.common.ipcore.mix_fftanalyzer_sg import MIXFftAnalyzerSG, MIXFftAnalyzerSGDef
+from mix.driver.smartgiant.common.utility.audio_analyzer import AudioAnalyzer, np
+
+
+class FftRamBus(object):
+    '''
+    AXI4 bus of the FFT analyzer ip which is always ready and holds fixed FFT RAM data.
+    '''
+
+    def __init__(self, power, decimation):
+        self._dev_name = 'fft_ram_bus'
+        self.decimation = decimation
+        self.words = []
+        for value in power:
+            self.words += [value & 0xFFFFFFFF, value >> 32]
+        self.ram_index = 0
+
+    def write_8bit_inc(self, addr, data):
+        if addr == MIXFftAnalyzerSGDef.FFT_START_REGISTER:
+            self.ram_index = 0
+
+    def read_8bit_inc(self, addr, rd_len):
+        if addr == MIXFftAnalyzerSGDef.DEC_PARAM_VALUE_REGISTER:
+            return [self.decimation]
+        # DEC_CTRL and FFT_STATE, decimation enabled and FFT ready
+        return [MIXFftAnalyzerSGDef.FFT_READY_STATE]
+
+    def read_32bit_inc(self, addr, rd_len):
+        assert addr == MIXFftAnalyzerSGDef.FFT_RAM_DCNT_REGISTER
+        return [len(self.words)]
+
+    def read_32bit_fix(self, addr, rd_len):
+        assert addr == MIXFftAnalyzerSGDef.FFT_RAM_RD_REGISTER
+        words = self.words[self.ram_index:self.ram_index + rd_len]
+        self.ram_index += rd_len
+        return words
+
+
+@unittest.skipIf(np is None, 'numpy is required by audio analyzer')
+class TestAudioAnalyzerFpgaPath(unittest.TestCase):
+
+    def fft_ram(self, sample_rate, size, frequency, seed):
+        # sine of 0.5 Vpp with 3 harmonics and noise, spectrum in 48 bit FFT RAM integers
+        rng = np.random.RandomState(seed)
+        t = np.arange(size) / sample_rate
+        samples = 0.25 * np.sin(2 * np.pi * frequency * t)
+        for order, amplitude in [(2, 1e-3), (3, 5e-4), (4, 2e-4)]:
+            samples += amplitude * np.sin(2 * np.pi * order * frequency * t + order)
+        samples += rng.normal(0, 1e-5, size)
+        power = AudioAnalyzer(sample_rate, size).spectrum(samples)
+        return [int(value) for value in np.round(power)]
+
+    def assert_same(self, sample_rate, size, frequency, decimation=1, bandwidth=20000, harmonic_count=5):
+        power = self.fft_ram(sample_rate / decimation, size, frequency, size + decimation)
+        self.assertLess(max(power), 1 << 48)
+
+        fft = MIXFftAnalyzerSG(FftRamBus(power, decimation), fft_point_number=size)
+        fft.analyze_config(sample_rate, decimation, bandwidth, harmonic_count)
+        fft.analyze()
+        expected = fft.get_results()
+
+        analyzer = AudioAnalyzer(sample_rate / decimation, size, bandwidth, harmonic_count, decimation)
+        result = analyzer.analyze_spectrum(power)
+        for name in ['vpp', 'frequency', 'thd', 'thdn', 'noisefloor']:
+            if expected[name] is None:
+                self.assertIsNone(result[name], name)
+            else:
+                self.assertAlmostEqual(result[name], expected[name], delta=abs(expected[name]) * 1e-9,
+                                       msg='%s %r != %r' % (name, result[name], expected[name]))
+        return result
+
+    def test_8k(self):
+        result = self.assert_same(192000, MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_8K, 1003)
+        self.assertAlmostEqual(result['frequency'], 1003, delta=0.1)
+        self.assertAlmostEqual(result['vpp'], 0.5, delta=1e-3)
+
+    def test_16k(self):
+        self.assert_same(192000, MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_16K, 997)
+
+    def test_auto_bandwidth_decimation(self):
+        self.assert_same(192000, MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_8K, 1003, 2, 'auto')
+
+    def test_second_harmonic_only(self):
+        self.assert_same(48000, MIXFftAnalyzerSGDef.FFT_POINT_NUMBER_8K, 440, harmonic_count=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+'''
+SGModuleDriver.calibrate_array against calibrate() of every sample.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import unittest
+
+from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver, ICIException
+from mix.driver.smartgiant.common.utility import calibration_lookup
+from mix.driver.smartgiant.common.utility.calibration_lookup import CalibrationLookup
+
+
+def cell(gain, offset, threshold, is_use=True):
+    return {'gain': gain, 'offset': offset, 'threshold': threshold, 'is_use': is_use}
+
+
+class TestCalibrateArray(unittest.TestCase):
+
+    samples = [-10.0, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 100.0]
+
+    def setUp(self):
+        # no eeprom, the calibration table is set up like load_calibration does
+        self.board = SGModuleDriver.__new__(SGModuleDriver)
+        self.board._cal_mode_flag = 'cal'
+        self.board._cal_common_error = None
+        self.board._calibration_table = {
+            'DCV': [cell(1.1, 0.1, 1.0), cell(1.2, 0.2, 2.0), cell(1.3, 0.3, 3.0)],
+            # the scalar scan stops at the first unused cell
+            'UNUSED': [cell(1.1, 0.1, 1.0), cell(9.9, 9.9, 2.0, False), cell(1.3, 0.3, 3.0)],
+            'FIRST_UNUSED': [cell(9.9, 9.9, 1.0, False), cell(1.2, 0.2, 2.0)],
+            'UNSORTED': [cell(1.1, 0.1, 2.0), cell(1.2, 0.2, 1.0), cell(1.3, 0.3, 3.0)],
+            'EMPTY': [],
+            # load_calibration leaves an errored range empty and records the error
+            'BAD_COUNT': []
+        }
+        self.board._range_err_table = {'BAD_COUNT': ICIException('Range BAD_COUNT count pos 0x0 is invalid')}
+        self.board._calibration_lookups = {}
+
+    def assert_same(self, range_name, samples=None):
+        samples = self.samples if samples is None else samples
+        expected = [self.board.calibrate(range_name, data) for data in samples]
+        result = self.board.calibrate_array(range_name, samples)
+        self.assertEqual(len(result), len(expected))
+        for data, value, expected_value in zip(samples, result, expected):
+            self.assertAlmostEqual(value, expected_value, places=12,
+                                   msg='%s %r: %r != %r' % (range_name, data, value, expected_value))
+
+    def test_used_cells(self):
+        self.assert_same('DCV')
+
+    def test_above_all_thresholds(self):
+        self.assert_same('DCV', [3.0, 4.0, 1e9])
+        self.assertAlmostEqual(self.board.calibrate_array('DCV', [4.0])[0], 1.3 * 4.0 + 0.3)
+
+    def test_unused_cell(self):
+        self.assert_same('UNUSED')
+        self.assert_same('FIRST_UNUSED')
+
+    def test_unsorted_thresholds(self):
+        self.assert_same('UNSORTED')
+
+    def test_empty_range(self):
+        self.assertEqual(self.board.calibrate_array('EMPTY', self.samples), self.samples)
+        self.assert_same('EMPTY')
+
+    def test_errored_range(self):
+        with self.assertRaises(ICIException):
+            self.board.calibrate('BAD_COUNT', 1.0)
+        with self.assertRaises(ICIException):
+            self.board.calibrate_array('BAD_COUNT', self.samples)
+
+    def test_common_error(self):
+        self.board._cal_common_error = ICIException('Read calibration cell error')
+        with self.assertRaises(ICIException):
+            self.board.calibrate_array('DCV', self.samples)
+
+    def test_raw_mode(self):
+        self.board._cal_mode_flag = 'raw'
+        self.assertEqual(self.board.calibrate_array('BAD_COUNT', self.samples), self.samples)
+
+    def test_numpy_array(self):
+        if calibration_lookup.np is None:
+            self.skipTest('numpy is not installed')
+        samples = calibration_lookup.np.array(self.samples)
+        result = self.board.calibrate_array('UNUSED', samples)
+        self.assertIsInstance(result, calibration_lookup.np.ndarray)
+        self.assert_same('UNUSED', samples)
+
+    def test_without_numpy(self):
+        np = calibration_lookup.np
+        calibration_lookup.np = None
+        try:
+            for range_name in ['DCV', 'UNUSED', 'FIRST_UNUSED', 'UNSORTED']:
+                self.assert_same(range_name)
+        finally:
+            calibration_lookup.np = np
+
+    def test_reloaded_range(self):
+        self.assert_same('DCV')
+        self.board._calibration_table['DCV'] = [cell(2.0, 0.0, 10.0)]
+        self.assert_same('DCV')
+
+    def test_lookup_cache(self):
+        items = self.board._calibration_table['DCV']
+        cache = {}
+        lookup = CalibrationLookup.for_table(cache, 'DCV', items)
+        self.assertIs(CalibrationLookup.for_table(cache, 'DCV', items), lookup)
+        # cells added to the same list
+        items.append(cell(1.4, 0.4, 4.0))
+        self.assertIsNot(CalibrationLookup.for_table(cache, 'DCV', items), lookup)
+
+
+if __name__ == '__main__':
+    unittest.main()
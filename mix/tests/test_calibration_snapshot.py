@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+'''
+SGModuleDriver.load_calibration through CalibrationSnapshot: hit, stale header and broken file.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import shutil
+import tempfile
+import unittest
+
+from mix.driver.core.module.mixmodulenvmem import NVMemFieldNames
+from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver, ICIException
+from mix.driver.smartgiant.common.utility.calibration_snapshot import CalibrationSnapshot
+
+
+class FakeNVMem(object):
+    '''
+    NVMemContent of one calibration cell, 0 bytes of calibration data.
+    '''
+
+    def __init__(self):
+        self.header = [0x20, 0x01, 0x02, 0x03]
+        self.fields = {
+            NVMemFieldNames.CAL_DATA_SIZE: [0],
+            NVMemFieldNames.CAL_DATA_START_ADDR: [0x400],
+            NVMemFieldNames.CAL_CHKSUM: [[0xAA] * 20]
+        }
+
+    def get_cal_header_bytes(self, cal_index):
+        return self.header
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+
+class TestCalibrationSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='mix_cal_snapshot_')
+        self.snapshot = CalibrationSnapshot(self.folder)
+        self.cell_reads = 0
+
+        # no eeprom, nvmem fields and the calibration cell read are faked
+        board = SGModuleDriver.__new__(SGModuleDriver)
+        board.calibration_snapshot = self.snapshot
+        board._range_table = {'DCV': 0}
+        board.nvmem = FakeNVMem()
+        board.read_serial_number = lambda: 'SN0001\x00\x00'
+        board.read_latest_calibration_index = lambda: 0
+        board.read_calibration_cell = self.read_calibration_cell
+        self.board = board
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def read_calibration_cell(self, cal_index):
+        self.cell_reads += 1
+        return bytearray()
+
+    def snapshot_path(self):
+        return self.snapshot._path('SN0001')
+
+    def test_hit(self):
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 1)
+        self.assertEqual(self.snapshot.statistics(), {'hits': 0, 'misses': 1})
+
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 1)
+        self.assertEqual(self.snapshot.statistics(), {'hits': 1, 'misses': 1})
+        self.assertEqual(self.board._calibration_table, {'DCV': []})
+        # the range error of the full read is restored with the module exception class
+        self.assertIsInstance(self.board._range_err_table['DCV'], ICIException)
+        self.assertEqual(self.board.cal_index, 0)
+
+    def test_stale_header(self):
+        self.board.load_calibration()
+        # a new calibration written to the module changes its header
+        self.board.nvmem.header = [0x20, 0x01, 0x02, 0x04]
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 2)
+        self.assertEqual(self.snapshot.statistics(), {'hits': 0, 'misses': 2})
+        # the snapshot was saved again for the new header
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 2)
+
+    def test_broken_file(self):
+        self.board.load_calibration()
+        with open(self.snapshot_path(), 'w') as f:
+            f.write('{"version": 1, "serial_number": "SN0001", "tab')
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 2)
+        self.assertEqual(self.board._calibration_table, {'DCV': []})
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 2)
+
+    def test_without_snapshot(self):
+        self.board.calibration_snapshot = None
+        self.board.load_calibration()
+        self.board.load_calibration()
+        self.assertEqual(self.cell_reads, 2)
+
+    def test_save_without_range_err(self):
+        self.snapshot.save('SN0002', 'checksum', {'DCV': []})
+        self.assertEqual(self.snapshot.load('SN0002', 'checksum'), {'table': {'DCV': []}, 'range_err': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
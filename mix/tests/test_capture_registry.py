@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+'''
+CaptureRegistry statistics and histogram, with and without numpy.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import random
+import unittest
+
+from mix.driver.smartgiant.common.utility import capture_registry
+from mix.driver.smartgiant.common.utility.capture_registry import CaptureRegistry, CaptureRegistryException
+
+
+class CaptureRegistryTestMixin(object):
+
+    def setUp(self):
+        self.registry = CaptureRegistry()
+        rng = random.Random(1)
+        # DC capture of 10 V with 10 nV noise
+        self.dc = [10.0 + rng.gauss(0, 1e-8) for i in range(100000)]
+
+    def put(self, values):
+        return self.registry.put(values)['handle']
+
+    def test_std_of_large_dc(self):
+        mean = sum(self.dc) / len(self.dc)
+        expected = (sum((value - mean) ** 2 for value in self.dc) / len(self.dc)) ** 0.5
+        result = self.registry.statistics(self.put(self.dc))
+        self.assertAlmostEqual(result['std'] / expected, 1.0, places=6)
+        self.assertAlmostEqual(result['mean'], 10.0, places=6)
+
+    def test_statistics(self):
+        result = self.registry.statistics(self.put([1.0, -3.0, 2.0, 0.0]))
+        self.assertEqual(result['count'], 4)
+        self.assertAlmostEqual(result['mean'], 0.0)
+        self.assertAlmostEqual(result['rms'], (14.0 / 4) ** 0.5)
+        self.assertAlmostEqual(result['std'], (14.0 / 4) ** 0.5)
+        self.assertEqual([result['min'], result['max'], result['peak'], result['vpp']], [-3.0, 2.0, 3.0, 5.0])
+
+    def test_empty(self):
+        handle = self.put([])
+        with self.assertRaises(CaptureRegistryException):
+            self.registry.statistics(handle)
+        with self.assertRaises(CaptureRegistryException):
+            self.registry.histogram(handle, 4)
+        result = self.registry.histogram(handle, 4, [0.0, 4.0])
+        self.assertEqual(result['counts'], [0, 0, 0, 0])
+        self.assertEqual(result['edges'], [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    def test_histogram(self):
+        result = self.registry.histogram(self.put([0.0, 0.5, 1.5, 2.0, 3.9, 4.0]), 4, [0.0, 4.0])
+        self.assertEqual(result['counts'], [2, 1, 1, 2])
+        self.assertEqual(len(result['edges']), 5)
+
+
+@unittest.skipIf(capture_registry.np is None, 'numpy is not installed')
+class TestCaptureRegistryNumpy(CaptureRegistryTestMixin, unittest.TestCase):
+    pass
+
+
+class TestCaptureRegistryWithoutNumpy(CaptureRegistryTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.np = capture_registry.np
+        capture_registry.np = None
+        super(TestCaptureRegistryWithoutNumpy, self).setUp()
+
+    def tearDown(self):
+        capture_registry.np = self.np
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+'''
+I2CArbiter grant order: priority, aging, sessions yielding after max_hold_time and nested transactions.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import time
+import threading
+import unittest
+
+from mix.driver.core.bus.i2c_arbiter import I2CArbiter, I2CArbiterDef
+
+
+class TestI2CArbiter(unittest.TestCase):
+
+    def setUp(self):
+        self.order = []
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(1)
+
+    def start_waiter(self, arbiter, priority, origin):
+        # queue one transaction of another thread and wait until it is queued
+        depth = arbiter.statistics()['queue_depth']
+
+        def run():
+            with arbiter.transaction(priority, origin):
+                self.order.append(origin)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+        deadline = time.time() + 1
+        while arbiter.statistics()['queue_depth'] == depth:
+            self.assertLess(time.time(), deadline, 'waiter %s is not queued' % origin)
+            time.sleep(0.001)
+
+    def join_waiters(self):
+        for thread in self.threads:
+            thread.join(1)
+            self.assertFalse(thread.is_alive())
+
+    def test_priority_order(self):
+        arbiter = I2CArbiter('i2c_test', aging_time=10)
+        with arbiter.transaction(I2CArbiterDef.PRIORITY_NORMAL, 'owner'):
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_LOW, 'low')
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_NORMAL, 'normal')
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_HIGH, 'high')
+            self.assertEqual(arbiter.statistics()['queue_depth_by_priority'], {'0': 1, '1': 1, '2': 1})
+        self.join_waiters()
+        self.assertEqual(self.order, ['high', 'normal', 'low'])
+        self.assertEqual(arbiter.statistics()['grants'], 4)
+
+    def test_aging(self):
+        arbiter = I2CArbiter('i2c_test', aging_time=0.1)
+        with arbiter.transaction(I2CArbiterDef.PRIORITY_NORMAL, 'owner'):
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_LOW, 'low')
+            # low waits two aging times, it is raised to the level of high
+            time.sleep(0.25)
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_HIGH, 'high')
+        self.join_waiters()
+        self.assertEqual(self.order, ['low', 'high'])
+
+    def test_session_yields_after_max_hold_time(self):
+        arbiter = I2CArbiter('i2c_test', max_hold_time=0.02)
+        with arbiter.session(I2CArbiterDef.PRIORITY_HIGH, 'session'):
+            with arbiter.transaction(I2CArbiterDef.PRIORITY_HIGH, 'session'):
+                pass
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_LOW, 'waiter')
+            time.sleep(0.05)
+            # the session gives the bus to the waiter before its next transaction
+            with arbiter.transaction(I2CArbiterDef.PRIORITY_HIGH, 'session'):
+                self.order.append('session')
+        self.join_waiters()
+        self.assertEqual(self.order, ['waiter', 'session'])
+        self.assertEqual(arbiter.statistics()['yields'], 1)
+
+    def test_session_keeps_bus_within_max_hold_time(self):
+        arbiter = I2CArbiter('i2c_test', max_hold_time=10)
+        with arbiter.session(I2CArbiterDef.PRIORITY_LOW, 'session'):
+            self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_HIGH, 'waiter')
+            with arbiter.transaction(I2CArbiterDef.PRIORITY_LOW, 'session'):
+                self.order.append('session')
+        self.join_waiters()
+        self.assertEqual(self.order, ['session', 'waiter'])
+        self.assertEqual(arbiter.statistics()['yields'], 0)
+
+    def test_nested_transactions(self):
+        arbiter = I2CArbiter('i2c_test', max_hold_time=0.01)
+        with arbiter.session(I2CArbiterDef.PRIORITY_NORMAL, 'session'):
+            with arbiter.transaction(I2CArbiterDef.PRIORITY_NORMAL, 'session'):
+                self.start_waiter(arbiter, I2CArbiterDef.PRIORITY_HIGH, 'waiter')
+                time.sleep(0.03)
+                # a transaction is never interrupted, not even by its nested transactions
+                with arbiter.transaction(I2CArbiterDef.PRIORITY_NORMAL, 'session'):
+                    self.order.append('nested')
+                self.order.append('outer')
+            self.assertEqual(self.order, ['nested', 'outer'])
+            self.assertEqual(arbiter.statistics()['yields'], 0)
+        self.join_waiters()
+        self.assertEqual(self.order, ['nested', 'outer', 'waiter'])
+        self.assertEqual(arbiter.statistics()['grants'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+'''
+NVMemCache reads, regions and write invalidation, and the cache regions of the module drivers.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import struct
+import hashlib
+import unittest
+
+from mix.driver.core.ic.nvmem_cache import NVMemCache
+from mix.driver.smartgiant.common.module.mix_board import MIXBoard, ICIDef
+from mix.driver.smartgiant.common.module.sg_module_driver import SGModuleDriver
+
+
+class FakeEEPROM(object):
+    '''
+    EEPROM on a bytearray image which records its reads.
+    '''
+    chip_size = 512
+
+    def __init__(self, image=None):
+        self.image = image if image is not None else bytearray(range(256)) * 2
+        self.reads = []
+
+    def read(self, addr, length):
+        self.reads.append((addr, length))
+        return list(self.image[addr:addr + length])
+
+    def write(self, addr, data):
+        self.image[addr:addr + len(data)] = bytearray(data)
+
+
+class TestNVMemCache(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeEEPROM()
+
+    def test_read_through(self):
+        cache = NVMemCache(self.device)
+        self.assertEqual(cache.read(0x03, 17), list(range(0x03, 0x14)))
+        self.assertEqual(cache.read(0x05, 4), [5, 6, 7, 8])
+        self.assertEqual(self.device.reads, [(0x00, 32)])
+        self.assertEqual(cache.statistics()['hits'], 1)
+
+    def test_write_invalidates(self):
+        cache = NVMemCache(self.device)
+        cache.read(0x00, 16)
+        cache.write(0x04, [0xAA])
+        self.assertEqual(cache.read(0x00, 16)[4], 0xAA)
+        self.assertEqual(len(self.device.reads), 2)
+
+    def test_regions(self):
+        cache = NVMemCache(self.device, regions=[[0x00, 0x40]])
+        cache.read(0x10, 4)
+        cache.read(0x10, 4)
+        cache.read(0x80, 4)
+        cache.read(0x80, 4)
+        self.assertEqual(self.device.reads, [(0x10, 16), (0x80, 4), (0x80, 4)])
+
+    def test_set_regions(self):
+        cache = NVMemCache(self.device)
+        cache.read(0x00, 64)
+        cache.set_regions([[0x00, 0x20]])
+        self.assertEqual(cache.statistics()['cached_bytes'], 32)
+        cache.read(0x00, 32)
+        cache.read(0x20, 4)
+        self.assertEqual(self.device.reads, [(0x00, 64), (0x20, 4)])
+
+
+class TestModuleNVMemCache(unittest.TestCase):
+
+    def test_mix_board(self):
+        board = MIXBoard(FakeEEPROM())
+        device = board._eeprom_device.device
+        # identity is read once, calibration cells every time
+        board.read_eeprom(ICIDef.SN_ADDR, ICIDef.SN_LEN)
+        board.read_eeprom(ICIDef.SN_ADDR, ICIDef.SN_LEN)
+        board.read_eeprom(ICIDef.CAL_AREA_ADDR, ICIDef.CAL_CELL_LEN)
+        board.read_eeprom(ICIDef.CAL_AREA_ADDR, ICIDef.CAL_CELL_LEN)
+        self.assertEqual(len(device.reads), 3)
+        self.assertEqual(board.get_nvmem_cache_statistics()['hits'], 2)
+        self.assertEqual(board.invalidate_nvmem_cache(), 'done')
+        self.assertEqual(board.get_nvmem_cache_statistics()['cached_bytes'], 0)
+
+    def test_sg_module_driver(self):
+        # version 3 nvmem with one calibration of 16 bytes
+        image = bytearray(512)
+        image[0x00] = 3
+        image[0x18] = 1
+        image[0x19:0x1D] = struct.pack('<I', 16)
+        image[0x2C:0x40] = hashlib.sha1(bytes(image[:0x2C])).digest()
+        board = SGModuleDriver(FakeEEPROM(image))
+        # read only area and calibration header, up to the calibration data at 0x40 + 0x1D
+        self.assertEqual(board._eeprom_device.regions, [(0x00, 0x5D)])
+        self.assertGreater(board.get_nvmem_cache_statistics()['hits'], 0)
+
+    def test_without_cache(self):
+        board = MIXBoard(FakeEEPROM())
+        board._eeprom_device = board._eeprom_device.device
+        self.assertEqual(board.get_nvmem_cache_statistics(), {})
+        self.assertEqual(board.invalidate_nvmem_cache(), 'done')
+
+
+if __name__ == '__main__':
+    unittest.main()
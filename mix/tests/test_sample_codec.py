@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+SampleCodec decode of dma data, including an empty dma channel, with and without numpy.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import struct
+import unittest
+
+from mix.driver.smartgiant.common.utility import sample_codec
+from mix.driver.smartgiant.common.utility.sample_codec import SampleCodec, to_list
+
+
+class SampleCodecTestMixin(object):
+
+    def setUp(self):
+        # bit[0-2] channel, bit[14-31] 18 bit signed value
+        self.codec = SampleCodec(4, 14, 18, True, 0, 3)
+        self.data = bytearray(struct.pack('<3I', (5 << 14) | 1, (0x3FFFF << 14) | 2, (7 << 14) | 1))
+
+    def test_decode(self):
+        self.assertEqual(to_list(self.codec.decode(self.data)), [5.0, -1.0, 7.0])
+        self.assertEqual(to_list(self.codec.decode(self.data, 8)), [5.0, -1.0])
+
+    def test_decode_channels(self):
+        channels = self.codec.decode_channels(list(self.data))
+        self.assertEqual(sorted(channels.keys()), [1, 2])
+        self.assertEqual(to_list(channels[1]), [5.0, 7.0])
+        self.assertEqual(to_list(channels[2]), [-1.0])
+
+    def test_empty_channel(self):
+        # read_channel_all_data of an empty channel returns None data with 0 length
+        self.assertEqual(to_list(self.codec.decode(None, 0)), [])
+        self.assertEqual(to_list(self.codec.decode(None)), [])
+        self.assertEqual(self.codec.decode_channels(None, 0), {})
+        # less than one word
+        self.assertEqual(to_list(self.codec.decode(self.data, 3)), [])
+
+
+@unittest.skipIf(sample_codec.np is None, 'numpy is not installed')
+class TestSampleCodecNumpy(SampleCodecTestMixin, unittest.TestCase):
+    pass
+
+
+class TestSampleCodecWithoutNumpy(SampleCodecTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.np = sample_codec.np
+        sample_codec.np = None
+        super(TestSampleCodecWithoutNumpy, self).setUp()
+
+    def tearDown(self):
+        sample_codec.np = self.np
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''
+UARTReader expect and read_until with str and unicode patterns, unicode is what rpc passes.
+
+Usage:
+    python -m unittest discover -s mix/tests -t .
+'''
+import re
+import Queue
+import unittest
+
+from mix.driver.core.bus.uart_reader import UARTReader, UARTReaderException
+
+
+class FakeUART(object):
+    '''
+    UART which returns the chunks fed to it from read_available.
+    '''
+
+    def __init__(self):
+        self.chunks = Queue.Queue()
+
+    def feed(self, data):
+        self.chunks.put([ord(c) for c in data])
+
+    def read_available(self, timeout):
+        try:
+            return self.chunks.get(True, timeout)
+        except Queue.Empty:
+            return []
+
+
+class TestUARTReaderExpect(unittest.TestCase):
+
+    def setUp(self):
+        self.uart = FakeUART()
+        self.reader = UARTReader(self.uart, poll_timeout=0.01)
+        self.reader.start()
+
+    def tearDown(self):
+        self.reader.stop()
+
+    def test_str_patterns(self):
+        self.uart.feed('test1 PASS\r\ntest2 FAIL\r\n')
+        self.assertEqual(self.reader.expect(['FAIL', 'PASS'], 1), [1, 'test1 PASS'])
+        self.assertEqual(self.reader.expect(['FAIL', 'PASS'], 1), [0, '\r\ntest2 FAIL'])
+
+    def test_unicode_patterns(self):
+        self.uart.feed('boot done\r\n] ')
+        self.assertEqual(self.reader.expect([u'error', u'done'], 1), [1, 'boot done'])
+        self.assertEqual(self.reader.read_until(u'] ', 1), '\r\n] ')
+
+    def test_unicode_regex(self):
+        self.uart.feed('ERR42 at ')
+        index, data = self.reader.expect([u'PASS', u'/ERR\\d+/'], 1)
+        self.assertEqual([index, data], [1, 'ERR42'])
+
+    def test_non_ascii_unicode_pattern(self):
+        # the pattern is searched as its utf-8 bytes, split over two chunks
+        self.uart.feed('temp 25\xc2')
+        self.uart.feed('\xb0C\r\n')
+        self.assertEqual(self.reader.expect([u'°C'], 1), [0, 'temp 25\xc2\xb0C'])
+
+    def test_compiled_regex(self):
+        self.uart.feed('progress 50% done')
+        self.assertEqual(self.reader.read_until(re.compile(r'\d+% done'), 1), 'progress 50% done')
+
+    def test_timeout(self):
+        self.uart.feed('nothing here')
+        with self.assertRaises(UARTReaderException):
+            self.reader.expect([u'PASS'], 0.05)
+        # nothing is read on timeout
+        self.assertEqual(self.reader.read(), 'nothing here')
+
+
+if __name__ == '__main__':
+    unittest.main()